@@ -14,6 +14,7 @@ logging.basicConfig(
 
 from flask_migrate import Migrate
 from config import StagingConfig
+from commands import init_commands
 from extensions.cors import init_cors
 from extensions.firebase import init_firebase
 from flask import Flask, send_from_directory
@@ -32,6 +33,8 @@ from routes.service import service_bp
 from routes.setup import setup_bp 
 from routes.waivers import waivers_bp
 from routes.feed_order import feed_order_bp
+from services.outbox import start_outbox_drainer
+from services.job_runner import start_job_runner
 
 # define db filename
 db_filename = "cucares.db"
@@ -57,6 +60,7 @@ env = os.environ.get("MY_ENV", "production")
 app.secret_key = os.environ["FLASK_SECRET_KEY"]
 init_cors(app, env)
 init_firebase()
+init_commands(app)
 
 if env == "staging":
     app.config.from_object(StagingConfig)
@@ -71,6 +75,17 @@ app.config["SQLALCHEMY_ECHO"] = os.environ.get('FLASK_ENV') == 'development'
 db.init_app(app)
 migrate = Migrate(app, db)
 
+# deliver queued email from a background thread in the web process. `flask` commands
+# (including `flask run`) skip it; run `flask drain-outbox` alongside instead, or set
+# OUTBOX_DRAINER=off when a separate drainer process is deployed.
+if os.environ.get("OUTBOX_DRAINER", "thread") == "thread" and not os.environ.get("FLASK_RUN_FROM_CLI"):
+    start_outbox_drainer(app)
+
+# run due scheduled jobs (carpool and feedback emails) the same way; `flask run-jobs`
+# is the separate-process equivalent
+if os.environ.get("JOB_RUNNER", "thread") == "thread" and not os.environ.get("FLASK_RUN_FROM_CLI"):
+    start_job_runner(app)
+
 # with app.app_context():
 #     # For app migrations don't create all tables
 #     # db.create_all()
@@ -0,0 +1,254 @@
+"""Flask CLI commands, run with `flask --app app <command>`"""
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import click
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from db import db, User, Opportunity, MultiOpportunity, UserOpportunity
+from services.carpool_service import create_driver_email_body, create_rider_email_body
+from services.job_runner import run_due_jobs, JOB_POLL_SECONDS
+from services.outbox import drain_outbox, run_outbox_drainer
+from utils.idempotency import prune_idempotency_keys
+from services.opportunity_service import reconcile_opportunity_counts, prune_tombstones
+from services.recurrence import expand_occurrences, occurrence_rows, insert_occurrences, materialize_due_series
+from services.search_service import rebuild_search_index
+
+def init_commands(app):
+    @app.cli.command("reconcile-opp-counts")
+    def reconcile_opp_counts_command():
+        """Recompute opportunity registration/attendance counters from user_opportunity."""
+        fixed = reconcile_opportunity_counts()
+        click.echo(f"Reconciled counters on {fixed} opportunities")
+
+    @app.cli.command("prune-tombstones")
+    def prune_tombstones_command():
+        """Delete delta-sync tombstones older than the retention window."""
+        removed = prune_tombstones()
+        click.echo(f"Removed {removed} tombstones")
+
+    @app.cli.command("prune-idempotency-keys")
+    def prune_idempotency_keys_command():
+        """Delete stored Idempotency-Key responses past their retention window."""
+        removed = prune_idempotency_keys()
+        click.echo(f"Removed {removed} idempotency keys")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index_command():
+        """Recreate the opportunity full-text search index from scratch."""
+        indexed = rebuild_search_index()
+        click.echo(f"Indexed {indexed} opportunities")
+
+
+    @app.cli.command("drain-outbox")
+    @click.option("--once", is_flag=True, help="deliver one batch and exit instead of polling")
+    def drain_outbox_command(once):
+        """Deliver queued outbound email, retrying failures with backoff."""
+        if once:
+            sent, failed = drain_outbox()
+            click.echo(f"Sent {sent} messages, {failed} failed")
+        else:
+            run_outbox_drainer(app)
+
+    @app.cli.command("run-jobs")
+    @click.option("--once", is_flag=True, help="run the jobs due now and exit instead of polling")
+    def run_jobs_command(once):
+        """Run scheduled jobs (carpool and feedback emails) as they come due."""
+        while True:
+            ran = run_due_jobs()
+            click.echo(f"Ran {ran} jobs")
+            if once:
+                return
+            db.session.remove()
+            time.sleep(JOB_POLL_SECONDS)
+
+    @app.cli.command("materialize-series")
+    def materialize_series_command():
+        """Write the occurrences of rolling multiopps that have come within the horizon."""
+        created = materialize_due_series()
+        click.echo(f"Materialized {created} occurrences")
+
+    @app.cli.command("fake-mailgun")
+    @click.option("--port", default=8025, help="port to listen on")
+    @click.option("--fail-every", default=0, help="answer every Nth request with a 500, to exercise retries")
+    def fake_mailgun_command(port, fail_every):
+        """Local stand-in for the Mailgun messages API; use MAILGUN_API_URL=http://localhost:<port>/v3."""
+        requests_seen = [0]
+
+        class FakeMailgunHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                requests_seen[0] += 1
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if fail_every and requests_seen[0] % fail_every == 0:
+                    self.send_response(500)
+                    self.end_headers()
+                    click.echo(f"[{requests_seen[0]}] {self.path} -> 500")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b'{"id": "<fake@mailgun>", "message": "Queued. Thank you."}')
+                click.echo(f"[{requests_seen[0]}] {self.path} -> 200 ({len(body)} bytes)")
+
+            def log_message(self, format, *args):
+                pass
+
+        click.echo(f"Fake Mailgun listening on http://localhost:{port}/v3")
+        ThreadingHTTPServer(("localhost", port), FakeMailgunHandler).serve_forever()
+
+    @app.cli.command("bench-email-render")
+    @click.option("--riders", default=200, help="riders in the carpool")
+    @click.option("--iterations", default=200, help="renders to time per email")
+    def bench_email_render_command(riders, iterations):
+        """Time the driver and rider carpool emails for a large ride, without touching the database."""
+        person = lambda i: SimpleNamespace(name=f"Volunteer {i}", email=f"volunteer{i}@example.invalid", phone=f"555-{i:04d}")
+        ride_riders = [
+            SimpleNamespace(id=i, pickup_location=f"Stop {i % 10}", notes="<running late>" if i % 7 == 0 else None, user=person(i))
+            for i in range(riders)
+        ]
+        ride = SimpleNamespace(driver=person(-1))
+        car = SimpleNamespace(color="blue", model="Civic", license_plate="A1B2")
+        opportunity = SimpleNamespace(name="Bench & Co. food drive", address="1 Main St")
+        time_data = {"formal": "November 1, 2026, 9:00 AM", "short": "11/1"}
+
+        for label, render in (
+            ("driver", lambda: create_driver_email_body(ride, ride_riders, opportunity, time_data)),
+            ("rider", lambda: create_rider_email_body(ride, ride_riders[0], car, ride_riders, opportunity, time_data)),
+        ):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                render()
+            per_message = (time.perf_counter() - start) / iterations
+            click.echo(f"{label:>6}: {per_message * 1000:.3f} ms per message ({riders} riders)")
+
+    @app.cli.command("bench-registration")
+    @click.option("--slots", default=50, help="total_slots on the throwaway opportunity")
+    @click.option("--attempts", default=300, help="registrations to fire at it")
+    @click.option("--workers", default=32, help="concurrent threads")
+    def bench_registration_command(slots, attempts, workers):
+        """Fire concurrent registrations at one opportunity and report overbooking and throughput.
+
+        Creates a throwaway opportunity and users and deletes them afterwards; point it at a
+        dev/staging database, never production.
+        """
+        for mode in ("unguarded", "guarded"):
+            result = _bench_registration(app, mode, slots, attempts, workers)
+            click.echo(
+                f"{mode:>9}: {result['registered']}/{slots} slots taken, "
+                f"{result['overbooked']} overbooked, {result['full']} turned away, "
+                f"{attempts / result['seconds']:.0f} req/s"
+            )
+
+    @app.cli.command("bench-occurrences")
+    @click.option("--sizes", default="10,100,1000", help="comma-separated occurrence counts per series")
+    def bench_occurrences_command(sizes):
+        """Time inserting a multiopp's occurrences row by row against the bulk insert.
+
+        Creates throwaway series and deletes them afterwards; point it at a dev/staging
+        database, never production.
+        """
+        for size in [int(size) for size in sizes.split(",")]:
+            timings = {mode: _bench_occurrences(mode, size) for mode in ("row-by-row", "bulk")}
+            click.echo(
+                f"{size:>5} occurrences: "
+                + ", ".join(f"{mode} {seconds * 1000:.1f} ms" for mode, seconds in timings.items())
+                + f" ({timings['row-by-row'] / timings['bulk']:.1f}x)"
+            )
+
+def _bench_occurrences(mode, size):
+    """
+    Insert one weekly series of `size` occurrences and return the seconds it took.
+    "row-by-row" is the old path (an ORM add and flush per occurrence); "bulk" is the
+    insert_occurrences() path series creation uses.
+    """
+    multiopp = MultiOpportunity(
+        name="bench-occurrences", address="bench", start_date=datetime.datetime.utcnow(),
+        days_of_week=[{"Monday": ["09:00"]}], week_frequency=1, week_recurrences=size
+    )
+    db.session.add(multiopp)
+    db.session.commit()
+
+    start = time.perf_counter()
+    rows = occurrence_rows(multiopp, expand_occurrences(
+        multiopp.start_date, multiopp.days_of_week, multiopp.week_recurrences, multiopp.week_frequency
+    ))
+    if mode == "bulk":
+        opp_ids = [opp.id for opp in insert_occurrences(rows)]
+    else:
+        opp_ids = []
+        for row in rows:
+            # as the old code did; Opportunity() would otherwise null out multiopp_id
+            opp = Opportunity(**row, multi_opportunity=multiopp)
+            db.session.add(opp)
+            db.session.flush()
+            opp_ids.append(opp.id)
+    db.session.commit()
+    seconds = time.perf_counter() - start
+
+    # occurrences have no feed positions, so a bulk delete is enough for them
+    db.session.execute(db.delete(Opportunity).where(Opportunity.id.in_(opp_ids)))
+    db.session.delete(multiopp)
+    db.session.commit()
+    return seconds
+
+def _bench_registration(app, mode, slots, attempts, workers):
+    """
+    One benchmark run. "unguarded" is the old read-then-insert path (check the counter,
+    then insert and bump it); "guarded" is the Opportunity.claim_slot() path the
+    /api/register-opp endpoint uses.
+    """
+    with app.app_context():
+        opp = Opportunity(
+            name="bench-registration", date=datetime.datetime.utcnow(), duration=60,
+            address="bench", total_slots=slots
+        )
+        users = [
+            User(name=f"bench-{i}", email=f"bench-{i}@example.invalid", phone="0", points=0)
+            for i in range(attempts)
+        ]
+        db.session.add(opp)
+        db.session.add_all(users)
+        db.session.commit()
+        opp_id = opp.id
+        user_ids = [user.id for user in users]
+
+    def register(user_id):
+        with app.app_context():
+            try:
+                if mode == "guarded":
+                    if not Opportunity.claim_slot(opp_id):
+                        db.session.rollback()
+                        return False
+                else:
+                    current = db.session.get(Opportunity, opp_id)
+                    if current.registered_count >= current.total_slots:
+                        return False
+                    Opportunity.adjust_counts(opp_id, registered=1)
+                db.session.add(UserOpportunity(user_id=user_id, opportunity_id=opp_id, registered=True))
+                db.session.commit()
+                return True
+            finally:
+                db.session.remove()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(register, user_ids))
+    seconds = time.perf_counter() - start
+
+    with app.app_context():
+        registered = db.session.scalar(
+            db.select(db.func.count()).select_from(UserOpportunity).where(UserOpportunity.opportunity_id == opp_id)
+        )
+        db.session.execute(db.delete(UserOpportunity).where(UserOpportunity.opportunity_id == opp_id))
+        # through the ORM, so the feed position hook drops its row too
+        db.session.delete(db.session.get(Opportunity, opp_id))
+        db.session.execute(db.delete(User).where(User.id.in_(user_ids)))
+        db.session.commit()
+
+    return {
+        "registered": registered,
+        "overbooked": max(0, registered - slots),
+        "full": outcomes.count(False),
+        "seconds": seconds,
+    }
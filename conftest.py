@@ -0,0 +1,4 @@
+# keeps the repository root on sys.path so tests import the app modules directly
+
+# worker/ holds one-off scripts that run against the real database on import
+collect_ignore = ["worker"]
@@ -1,9 +1,75 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import DateTime
+from sqlalchemy import DateTime, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
 import datetime
+import itertools
+import logging
 
 db = SQLAlchemy()
 
+logger = logging.getLogger(__name__)
+
+class TableVersion(db.Model):
+    """
+    Per-table write counter, bumped once a commit touching the table goes through. Used to
+    build ETags for polled endpoints. Kept in the database rather than in memory so writes
+    from every process (other web machines, the job runner, `flask` commands) move it.
+    """
+    __tablename__ = "table_version"
+    table_name = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+def table_versions(*tables):
+    rows = dict(db.session.execute(
+        db.select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(tables))
+    ).all())
+    return tuple(rows.get(table, 0) for table in tables)
+
+def _bump_versions_statement(dialect_name, tables):
+    # an upsert, so tables get their row on first write whatever created the schema
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    versions = TableVersion.__table__
+    statement = insert(versions).values([{"table_name": table, "version": 1} for table in sorted(tables)])
+    return statement.on_conflict_do_update(
+        index_elements=[versions.c.table_name],
+        set_={"version": versions.c.version + 1}
+    )
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_tables(session, flush_context):
+    # new/dirty/deleted still hold the pre-flush state here
+    written = session.info.setdefault("written_tables", set())
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            written.add(table)
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_written_tables(orm_execute_state):
+    # UPDATE/DELETE/INSERT statements bypass the unit of work (e.g. Opportunity.adjust_counts)
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            orm_execute_state.session.info.setdefault("written_tables", set()).add(table.name)
+
+@event.listens_for(Session, "after_commit")
+def _bump_table_versions(session):
+    written = session.info.pop("written_tables", None)
+    if not written:
+        return
+    try:
+        # its own short transaction, so the hot counter rows are never locked for the
+        # length of a request's transaction
+        with session.get_bind().begin() as connection:
+            connection.execute(_bump_versions_statement(connection.dialect.name, written))
+    except Exception as e:
+        logger.exception("Failed to bump table versions for %s: %s", sorted(written), e)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_tables(session):
+    session.info.pop("written_tables", None)
+
 # association model — used because a user is related to an opportunity in a more complex way
 class UserOpportunity(db.Model):
     __tablename__ = 'user_opportunity'
@@ -12,6 +78,8 @@ class UserOpportunity(db.Model):
     registered = db.Column(db.Boolean, default=False)
     attended = db.Column(db.Boolean, default=False)
     driving = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
 
     user = db.relationship("User", back_populates="user_opportunities")
     opportunity = db.relationship("Opportunity", back_populates="user_opportunities")
@@ -23,6 +91,30 @@ user_organization = db.Table(
     db.Column("organization_id", db.Integer, db.ForeignKey("organization.id"), primary_key=True)
 )
 
+# normalized copies of Opportunity.causes / Opportunity.tags, so they can be filtered on
+# through an index; kept in sync by services/opportunity_filters.py
+opportunity_cause = db.Table(
+    "opportunity_cause",
+    db.Column("opportunity_id", db.Integer, db.ForeignKey("opportunity.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("cause", db.String, primary_key=True),
+    db.Index("ix_opportunity_cause_cause", "cause", "opportunity_id")
+)
+
+opportunity_tag = db.Table(
+    "opportunity_tag",
+    db.Column("opportunity_id", db.Integer, db.ForeignKey("opportunity.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("tag", db.String, primary_key=True),
+    db.Index("ix_opportunity_tag_tag", "tag", "opportunity_id")
+)
+
+# normalized copy of Opportunity.visibility (the org ids allowed to see it; none means public)
+opportunity_visibility = db.Table(
+    "opportunity_visibility",
+    db.Column("opportunity_id", db.Integer, db.ForeignKey("opportunity.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("organization_id", db.Integer, db.ForeignKey("organization.id", ondelete="CASCADE"), primary_key=True),
+    db.Index("ix_opportunity_visibility_organization_id", "organization_id", "opportunity_id")
+)
+
 class ApprovedEmail(db.Model):
     __tablename__ = "approved_emails"
     
@@ -186,31 +278,18 @@ class User(db.Model):
         }
     
     def get_accepted_friends(self):
-        """Get all accepted friends for this user"""
-        # Get friendships where this user is the requester and they're accepted
-        requester_friendships = Friendship.query.filter_by(
-            requester_id=self.id, 
-            accepted=True
-        ).all()
-        
-        # Get friendships where this user is the receiver and they're accepted
-        receiver_friendships = Friendship.query.filter_by(
-            receiver_id=self.id, 
-            accepted=True
-        ).all()
-        
-        # Get the friend users
-        friends = []
-        for friendship in requester_friendships:
-            friend = User.query.get(friendship.receiver_id)
-            if friend:
-                friends.append(friend)
-        
-        for friendship in receiver_friendships:
-            friend = User.query.get(friendship.requester_id)
-            if friend:
-                friends.append(friend)
-        
+        """
+        Get all accepted friends for this user. Reads the friendship relationships, so
+        callers serializing many users can eager-load them (see GET /api/users).
+        """
+        friends = [
+            friendship.receiver for friendship in self.sent_friend_requests
+            if friendship.accepted and friendship.receiver
+        ]
+        friends += [
+            friendship.requester for friendship in self.received_friend_requests
+            if friendship.accepted and friendship.requester
+        ]
         return friends
 
 class Organization(db.Model):
@@ -277,6 +356,8 @@ class Organization(db.Model):
 
 class Opportunity(db.Model):
     __tablename__ = "opportunity"
+    # keyset pagination walks (date, id) for the date-ordered feeds
+    __table_args__ = (db.Index("ix_opportunity_date_id", "date", "id"),)
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String, nullable=False)
@@ -299,6 +380,12 @@ class Opportunity(db.Model):
     redirect_url = db.Column(db.String, nullable=True, default=None)
     actual_runtime = db.Column(db.Integer, nullable=True)
     allow_carpool = db.Column(db.Boolean, nullable=False, default=False)
+    # denormalized from user_opportunity, kept in step by adjust_counts()
+    registered_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    attended_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    # also bumped by bulk UPDATEs such as adjust_counts(), which delta sync relies on
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
 
     host_org_id = db.Column(db.Integer, db.ForeignKey("organization.id"))
     host_org = db.relationship("Organization", back_populates="opportunities_hosted")
@@ -336,6 +423,58 @@ class Opportunity(db.Model):
         self.multiopp_id = kwargs.get("multiopp_id", None)
         self.multi_opportunity = kwargs.get("multi_opportunity", None)
         self.allow_carpool = kwargs.get("allow_carpool", False)
+        self.registered_count = kwargs.get("registered_count", 0)
+        self.attended_count = kwargs.get("attended_count", 0)
+
+    @classmethod
+    def adjust_counts(cls, opportunity_id, registered=0, attended=0):
+        """Shift the registration/attendance counters in SQL so concurrent writers don't clobber each other"""
+        if not registered and not attended:
+            return
+        db.session.execute(
+            db.update(cls)
+            .where(cls.id == opportunity_id)
+            .values(
+                registered_count=cls.registered_count + registered,
+                attended_count=cls.attended_count + attended
+            )
+        )
+
+    @classmethod
+    def claim_slot(cls, opportunity_id):
+        """
+        Count one more registration, but only while the opportunity has room (or no slot
+        limit). The check and the increment are one UPDATE, so concurrent registrations
+        can't both take the last slot. Returns False if nothing was claimed.
+        """
+        result = db.session.execute(
+            db.update(cls)
+            .where(
+                cls.id == opportunity_id,
+                db.or_(cls.total_slots.is_(None), cls.registered_count < cls.total_slots)
+            )
+            .values(registered_count=cls.registered_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    @classmethod
+    def claim_slots(cls, opportunity_ids):
+        """
+        claim_slot() for several opportunities in one UPDATE. Returns True only if every one
+        had room; otherwise the caller must roll back, since the others were still claimed.
+        """
+        opportunity_ids = list(opportunity_ids)
+        result = db.session.execute(
+            db.update(cls)
+            .where(
+                cls.id.in_(opportunity_ids),
+                db.or_(cls.total_slots.is_(None), cls.registered_count < cls.total_slots)
+            )
+            .values(registered_count=cls.registered_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == len(opportunity_ids)
 
     def serialize(self):
         return {
@@ -375,6 +514,8 @@ class Opportunity(db.Model):
                 if self.multi_opportunity else None
             ),
             "allow_carpool": self.allow_carpool,
+            "registered_count": self.registered_count,
+            "attended_count": self.attended_count,
             "carpool_id": self.carpool.id if self.carpool else None,
             "involved_users": [
                 {
@@ -390,7 +531,199 @@ class Opportunity(db.Model):
                 for uo in self.user_opportunities
             ]
         }
-    
+
+    def serialize_card(self):
+        """Compact form for feed listings, built from columns only (no relationships)"""
+        return {
+            "id": self.id,
+            "is_multiopp": False,
+            "name": self.name,
+            "date": self.date,
+            "duration": self.duration,
+            "address": self.address,
+            "image": self.image,
+            "causes": self.causes or [],
+            "tags": self.tags or [],
+            "nonprofit": self.nonprofit,
+            "host_org_id": self.host_org_id,
+            "host_org_name": self.host_org_name,
+            "approved": self.approved,
+            "visibility": self.visibility or [],
+            "redirect_url": self.redirect_url,
+            "allow_carpool": self.allow_carpool,
+            "total_slots": self.total_slots,
+            "registered_count": self.registered_count,
+        }
+
+# Named eager-loading profiles for Opportunity.serialize(), so routes don't trigger
+# a lazy load per opportunity (carpool, multiopp) and per involved user.
+# "list" batches relationships with SELECT ... IN across the whole page of rows,
+# "detail" pulls everything for a single opportunity with joins.
+OPPORTUNITY_LOAD_PROFILES = {
+    "list": lambda: [
+        db.selectinload(Opportunity.user_opportunities)
+            .joinedload(UserOpportunity.user)
+            .load_only(User.id, User.name, User.email, User.phone, User.profile_image),
+        db.selectinload(Opportunity.carpool),
+        db.joinedload(Opportunity.multi_opportunity),
+    ],
+    "detail": lambda: [
+        db.joinedload(Opportunity.user_opportunities)
+            .joinedload(UserOpportunity.user)
+            .load_only(User.id, User.name, User.email, User.phone, User.profile_image),
+        db.joinedload(Opportunity.carpool),
+        db.joinedload(Opportunity.multi_opportunity),
+    ],
+}
+
+def opportunity_load_options(profile="list"):
+    """Loader options for the given profile, for use with query.options(*...)"""
+    return OPPORTUNITY_LOAD_PROFILES[profile]()
+
+class Tombstone(db.Model):
+    """A deleted opportunity or registration, kept so delta sync can tell clients to drop it"""
+    __tablename__ = "tombstone"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    table_name = db.Column(db.String, nullable=False)
+    opportunity_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, index=True)
+
+@event.listens_for(Session, "before_flush")
+def _record_tombstones(session, flush_context, instances):
+    # added here so the tombstones are written in the same flush as the deletes
+    for obj in list(session.deleted):
+        if isinstance(obj, Opportunity):
+            session.add(Tombstone(table_name=Opportunity.__tablename__, opportunity_id=obj.id))
+        elif isinstance(obj, UserOpportunity):
+            session.add(Tombstone(
+                table_name=UserOpportunity.__tablename__,
+                opportunity_id=obj.opportunity_id,
+                user_id=obj.user_id
+            ))
+
+class WaitlistEntry(db.Model):
+    """
+    A user queued for a full opportunity. Entries are promoted first-in first-out as slots
+    free up (see services/waitlist_service.py); promoted entries are kept with promoted_at
+    set.
+    """
+    __tablename__ = "waitlist_entry"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    opportunity_id = db.Column(db.Integer, db.ForeignKey("opportunity.id", ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    promoted_at = db.Column(db.DateTime, nullable=True)
+
+    # queue order and position lookups are range scans on (opportunity_id, id)
+    __table_args__ = (
+        db.UniqueConstraint("opportunity_id", "user_id", name="uq_waitlist_entry_opportunity_user"),
+        db.Index("ix_waitlist_entry_opportunity_id_id", "opportunity_id", "id"),
+        db.Index("ix_waitlist_entry_promoted_at", "promoted_at"),
+    )
+
+    def serialize(self):
+        return {
+            "opportunity_id": self.opportunity_id,
+            "user_id": self.user_id,
+            "created_at": self.created_at,
+            "promoted": self.promoted_at is not None
+        }
+
+class OutboundMessage(db.Model):
+    """
+    An email waiting to be delivered. Written in the same transaction as the change that
+    triggers it and delivered afterwards by the outbox drainer (services/outbox.py).
+    """
+    __tablename__ = "outbound_message"
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # Mailgun form fields, plus any attachments as [filename, content, content type]
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String, nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # when the drainer may next pick it up; pushed forward while a drainer holds it
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    last_error = db.Column(db.String, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index("ix_outbound_message_status_next_attempt_at", "status", "next_attempt_at"),)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "to": self.payload.get("data", {}).get("to"),
+            "subject": self.payload.get("data", {}).get("subject"),
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at,
+            "last_error": self.last_error,
+            "created_at": self.created_at,
+            "sent_at": self.sent_at
+        }
+
+class IdempotencyKey(db.Model):
+    """
+    A POST seen with an Idempotency-Key, and the response it got, so a retry of the same
+    request is answered from here instead of running again (see utils/idempotency.py)
+    """
+    __tablename__ = "idempotency_key"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
+    # the endpoint plus the caller, so keys from different users or routes never collide
+    scope = db.Column(db.String, primary_key=True)
+    key = db.Column(db.String, primary_key=True)
+    request_hash = db.Column(db.String, nullable=False)
+    status = db.Column(db.String, nullable=False, default=IN_PROGRESS)
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, index=True)
+
+class ScheduledJob(db.Model):
+    """
+    A job due at run_at, such as an opportunity's carpool or feedback email. Written by
+    scheduler.py and claimed and run by services/job_runner.py.
+    """
+    __tablename__ = "scheduled_job"
+    CARPOOL_EMAIL = "carpool_email"
+    FORM_EMAIL = "form_email"
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String, nullable=False)
+    opportunity_id = db.Column(db.Integer, db.ForeignKey("opportunity.id", ondelete="CASCADE"), nullable=False, index=True)
+    run_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String, nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    # the runner's poll is a range scan over pending jobs by due time
+    __table_args__ = (db.Index("ix_scheduled_job_status_run_at", "status", "run_at"),)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "opportunity_id": self.opportunity_id,
+            "run_at": self.run_at,
+            "status": self.status,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "result": self.result
+        }
+
 class Waiver(db.Model):
     __tablename__ = "waiver"
 
@@ -458,7 +791,14 @@ class MultiOpportunity(db.Model):
     start_date = db.Column(db.DateTime, nullable=False)
     days_of_week = db.Column(db.JSON, nullable=False, default=list)
     week_frequency = db.Column(db.Integer, nullable=True)
-    week_recurrences = db.Column(db.Integer, nullable=True, default=4)
+    # no default: NULL is how an open-ended rolling series is stored, so the route fills
+    # in DEFAULT_WEEK_RECURRENCES for the others
+    week_recurrences = db.Column(db.Integer, nullable=True)
+    allow_carpool = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # a rolling series only has occurrences up to materialized_until as rows; the job
+    # runner extends it (services/recurrence.py). Without week_recurrences it never ends.
+    rolling = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    materialized_until = db.Column(db.DateTime, nullable=True)
     address = db.Column(db.String, nullable=False)
     nonprofit = db.Column(db.String, nullable=True)
 
@@ -488,6 +828,9 @@ class MultiOpportunity(db.Model):
             "days_of_week": self.days_of_week,
             "week_frequency": self.week_frequency,
             "week_recurrences": self.week_recurrences,
+            "allow_carpool": self.allow_carpool,
+            "rolling": self.rolling,
+            "materialized_until": self.materialized_until.isoformat() if self.materialized_until else None,
 
             "opportunities": [
                 {
@@ -510,6 +853,28 @@ class MultiOpportunity(db.Model):
             ],    
     }
 
+    def serialize_card(self, next_date=None, upcoming_count=0):
+        """Compact form for feed listings; the upcoming occurrence summary is passed in by the caller"""
+        return {
+            "id": self.id,
+            "is_multiopp": True,
+            "name": self.name,
+            "address": self.address,
+            "image": self.image,
+            "causes": self.causes or [],
+            "tags": self.tags or [],
+            "nonprofit": self.nonprofit,
+            "host_org_id": self.host_org_id,
+            "host_org_name": self.host_org_name,
+            "approved": self.approved,
+            "visibility": self.visibility or [],
+            "days_of_week": self.days_of_week,
+            "week_frequency": self.week_frequency,
+            "total_slots": self.total_slots,
+            "next_date": next_date,
+            "upcoming_count": upcoming_count,
+        }
+
 class Carpool(db.Model):
     __tablename__ = "carpool"
     id = db.Column(db.Integer, primary_key=True)
@@ -568,6 +933,7 @@ class Ride(db.Model):
 
 class FeedOrder(db.Model):
     __tablename__ = "feed_order"
+    # order is no longer maintained: the feed order lives in feed_position
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     order = db.Column(db.JSON, nullable=False, default=list)
     invisible_multiopps = db.Column(db.JSON, nullable=False, default=list)
@@ -579,6 +945,78 @@ class FeedOrder(db.Model):
             "invisible_multiopps": self.invisible_multiopps
         }
 
+class FeedPosition(db.Model):
+    """
+    Where a feed item (a standalone opportunity or a multiopp) sits in the home feed.
+    Positions are fractional, so moving an item only rewrites its own row; see
+    services/feed_service.py.
+    """
+    __tablename__ = "feed_position"
+    OPPORTUNITY = "opportunity"
+    MULTIOPP = "multiopp"
+    # spacing between consecutive positions when appending or rebalancing
+    GAP = 1024.0
+
+    item_type = db.Column(db.String, primary_key=True)
+    item_id = db.Column(db.Integer, primary_key=True)
+    position = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (db.Index("ix_feed_position_position", "position", "item_type", "item_id"),)
+
+    def serialize(self):
+        return {
+            "id": self.item_id,
+            "is_multiopp": self.item_type == FeedPosition.MULTIOPP
+        }
+
+    @classmethod
+    def append_statement(cls, item_type, item_id):
+        """INSERT placing the item after the current last one, skipped if it already has a position"""
+        last = db.select(db.func.coalesce(db.func.max(cls.position), 0.0) + cls.GAP)
+        return db.insert(cls).from_select(
+            ["item_type", "item_id", "position"],
+            db.select(db.literal(item_type), db.literal(item_id), last.scalar_subquery())
+            .where(~db.exists().where(cls.item_type == item_type, cls.item_id == item_id))
+        )
+
+    @classmethod
+    def remove_statement(cls, item_type, item_id):
+        return db.delete(cls).where(cls.item_type == item_type, cls.item_id == item_id)
+
+def _feed_item(obj):
+    if isinstance(obj, MultiOpportunity):
+        return FeedPosition.MULTIOPP, obj.id
+    if isinstance(obj, Opportunity):
+        return FeedPosition.OPPORTUNITY, obj.id
+    return None
+
+@event.listens_for(Session, "after_flush")
+def _sync_feed_positions(session, flush_context):
+    # new feed items go to the end of the feed and deleted ones drop out of it, in the
+    # same transaction. Occurrences of a multiopp are not feed items of their own.
+    statements = []
+    for obj in session.new:
+        item = _feed_item(obj)
+        if item and not getattr(obj, "multiopp_id", None):
+            statements.append(FeedPosition.append_statement(*item))
+    for obj in session.dirty:
+        item = _feed_item(obj)
+        if isinstance(obj, Opportunity) and db.inspect(obj).attrs.multiopp_id.history.has_changes():
+            statements.append(
+                FeedPosition.remove_statement(*item) if obj.multiopp_id
+                else FeedPosition.append_statement(*item)
+            )
+    for obj in session.deleted:
+        item = _feed_item(obj)
+        if item:
+            statements.append(FeedPosition.remove_statement(*item))
+
+    if statements:
+        connection = session.connection()
+        for statement in statements:
+            connection.execute(statement)
+        session.info.setdefault("written_tables", set()).add(FeedPosition.__tablename__)
+
 class Car(db.Model):
     __tablename__ = "car"
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,26 @@
+"""add (date, id) index on opportunity for keyset pagination
+
+Revision ID: a1c4e8f2b7d3
+Revises: 2014702b0eb4, d03460c022c9
+Create Date: 2026-10-16 10:12:41.218034
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c4e8f2b7d3'
+down_revision = ('2014702b0eb4', 'd03460c022c9')
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('opportunity', schema=None) as batch_op:
+        batch_op.create_index('ix_opportunity_date_id', ['date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('opportunity', schema=None) as batch_op:
+        batch_op.drop_index('ix_opportunity_date_id')
@@ -0,0 +1,68 @@
+"""add opportunity_visibility table, backfilled from opportunity.visibility
+
+Revision ID: a6d2f8b4c3e7
+Revises: f4c1d7a3b8e6
+Create Date: 2026-10-17 14:02:19.663051
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f8b4c3e7'
+down_revision = 'f4c1d7a3b8e6'
+branch_labels = None
+depends_on = None
+
+
+def _org_ids(value):
+    # same normalization as services/opportunity_filters.py
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            parsed = None
+        value = parsed if isinstance(parsed, list) else value.split(',')
+    ids = []
+    for v in value:
+        try:
+            ids.append(int(str(v).strip()))
+        except ValueError:
+            continue
+    return list(dict.fromkeys(ids))
+
+
+def upgrade():
+    opportunity_visibility = op.create_table('opportunity_visibility',
+    sa.Column('opportunity_id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['opportunity_id'], ['opportunity.id'], name='fk_opportunity_visibility_opportunity_id', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['organization_id'], ['organization.id'], name='fk_opportunity_visibility_organization_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('opportunity_id', 'organization_id')
+    )
+    with op.batch_alter_table('opportunity_visibility', schema=None) as batch_op:
+        batch_op.create_index('ix_opportunity_visibility_organization_id', ['organization_id', 'opportunity_id'], unique=False)
+
+    bind = op.get_bind()
+    opportunity = sa.table('opportunity', sa.column('id', sa.Integer), sa.column('visibility', sa.JSON))
+    organization = sa.table('organization', sa.column('id', sa.Integer))
+    org_ids = {row.id for row in bind.execute(sa.select(organization.c.id))}
+    rows = [
+        {'opportunity_id': row.id, 'organization_id': org_id}
+        for row in bind.execute(sa.select(opportunity.c.id, opportunity.c.visibility))
+        for org_id in _org_ids(row.visibility)
+        if org_id in org_ids
+    ]
+    if rows:
+        op.bulk_insert(opportunity_visibility, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('opportunity_visibility', schema=None) as batch_op:
+        batch_op.drop_index('ix_opportunity_visibility_organization_id')
+
+    op.drop_table('opportunity_visibility')
@@ -0,0 +1,37 @@
+"""add registered_count and attended_count to opportunity
+
+Revision ID: b7e2d9c4a1f5
+Revises: a1c4e8f2b7d3
+Create Date: 2026-10-16 11:03:27.554102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d9c4a1f5'
+down_revision = 'a1c4e8f2b7d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('opportunity', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('registered_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('attended_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # backfill from the association table
+    op.execute(
+        'UPDATE opportunity SET '
+        'registered_count = (SELECT COUNT(*) FROM user_opportunity uo '
+        'WHERE uo.opportunity_id = opportunity.id AND uo.registered = TRUE), '
+        'attended_count = (SELECT COUNT(*) FROM user_opportunity uo '
+        'WHERE uo.opportunity_id = opportunity.id AND uo.attended = TRUE)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('opportunity', schema=None) as batch_op:
+        batch_op.drop_column('attended_count')
+        batch_op.drop_column('registered_count')
@@ -0,0 +1,57 @@
+"""add created_at/updated_at to opportunity and user_opportunity, and tombstone table
+
+Revision ID: c3f8a6d1e2b9
+Revises: b7e2d9c4a1f5
+Create Date: 2026-10-16 14:22:41.318907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f8a6d1e2b9'
+down_revision = 'b7e2d9c4a1f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing rows keep NULL timestamps; clients start delta sync after a full load anyway
+    with op.batch_alter_table('opportunity', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_opportunity_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('user_opportunity', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_user_opportunity_updated_at'), ['updated_at'], unique=False)
+
+    op.create_table('tombstone',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('opportunity_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tombstone_deleted_at'), ['deleted_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tombstone_deleted_at'))
+
+    op.drop_table('tombstone')
+
+    with op.batch_alter_table('user_opportunity', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_opportunity_updated_at'))
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('created_at')
+
+    with op.batch_alter_table('opportunity', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_opportunity_updated_at'))
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('created_at')
@@ -0,0 +1,44 @@
+"""add scheduled_job table
+
+Revision ID: c6e1a9f3b5d8
+Revises: f2a8c5d1e7b4
+Create Date: 2026-10-17 18:20:37.551846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e1a9f3b5d8'
+down_revision = 'f2a8c5d1e7b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scheduled_job',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('opportunity_id', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['opportunity_id'], ['opportunity.id'], name='fk_scheduled_job_opportunity_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('scheduled_job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_scheduled_job_opportunity_id'), ['opportunity_id'], unique=False)
+        batch_op.create_index('ix_scheduled_job_status_run_at', ['status', 'run_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('scheduled_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_scheduled_job_status_run_at')
+        batch_op.drop_index(batch_op.f('ix_scheduled_job_opportunity_id'))
+
+    op.drop_table('scheduled_job')
@@ -0,0 +1,37 @@
+"""add allow_carpool, rolling and materialized_until to multi_opportunity
+
+Revision ID: d4b8e2f6a1c9
+Revises: c6e1a9f3b5d8
+Create Date: 2026-10-18 10:42:15.208317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4b8e2f6a1c9'
+down_revision = 'c6e1a9f3b5d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('multi_opportunity', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('allow_carpool', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column('rolling', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column('materialized_until', sa.DateTime(), nullable=True))
+
+    # existing series allowed carpools if their occurrences did
+    op.execute(
+        'UPDATE multi_opportunity SET allow_carpool = EXISTS ('
+        'SELECT 1 FROM opportunity o '
+        'WHERE o.multiopp_id = multi_opportunity.id AND o.allow_carpool = TRUE)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('multi_opportunity', schema=None) as batch_op:
+        batch_op.drop_column('materialized_until')
+        batch_op.drop_column('rolling')
+        batch_op.drop_column('allow_carpool')
@@ -0,0 +1,65 @@
+"""add feed_position table, backfilled from feed_order.order
+
+Revision ID: d5a9e3b7c1f4
+Revises: c3f8a6d1e2b9
+Create Date: 2026-10-16 16:48:05.902461
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a9e3b7c1f4'
+down_revision = 'c3f8a6d1e2b9'
+branch_labels = None
+depends_on = None
+
+GAP = 1024.0
+
+
+def upgrade():
+    feed_position = op.create_table('feed_position',
+    sa.Column('item_type', sa.String(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('item_type', 'item_id')
+    )
+    with op.batch_alter_table('feed_position', schema=None) as batch_op:
+        batch_op.create_index('ix_feed_position_position', ['position', 'item_type', 'item_id'], unique=False)
+
+    # same reconciliation the old GET /api/feed-order did: keep the stored order for items
+    # that still exist, then append standalone opportunities and multiopps missing from it
+    bind = op.get_bind()
+    feed_order = sa.table('feed_order', sa.column('id', sa.Integer), sa.column('order', sa.JSON))
+    opportunity = sa.table('opportunity', sa.column('id', sa.Integer), sa.column('multiopp_id', sa.Integer))
+    multi_opportunity = sa.table('multi_opportunity', sa.column('id', sa.Integer))
+
+    stored = bind.execute(sa.select(feed_order.c.order).order_by(feed_order.c.id).limit(1)).scalar() or []
+    opp_ids = [row.id for row in bind.execute(
+        sa.select(opportunity.c.id).where(opportunity.c.multiopp_id.is_(None)).order_by(opportunity.c.id)
+    )]
+    multiopp_ids = [row.id for row in bind.execute(sa.select(multi_opportunity.c.id).order_by(multi_opportunity.c.id))]
+
+    valid = {('opportunity', i) for i in opp_ids} | {('multiopp', i) for i in multiopp_ids}
+    order = []
+    for item in stored:
+        key = ('multiopp' if item.get('is_multiopp') else 'opportunity', item.get('id'))
+        if key in valid and key not in order:
+            order.append(key)
+    seen = set(order)
+    order += [('opportunity', i) for i in opp_ids if ('opportunity', i) not in seen]
+    order += [('multiopp', i) for i in multiopp_ids if ('multiopp', i) not in seen]
+
+    if order:
+        op.bulk_insert(feed_position, [
+            {'item_type': item_type, 'item_id': item_id, 'position': (i + 1) * GAP}
+            for i, (item_type, item_id) in enumerate(order)
+        ])
+
+
+def downgrade():
+    with op.batch_alter_table('feed_position', schema=None) as batch_op:
+        batch_op.drop_index('ix_feed_position_position')
+
+    op.drop_table('feed_position')
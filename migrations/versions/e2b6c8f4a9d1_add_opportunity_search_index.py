@@ -0,0 +1,50 @@
+"""add opportunity full-text search index (FTS5 on SQLite, tsvector + GIN on Postgres)
+
+Revision ID: e2b6c8f4a9d1
+Revises: d5a9e3b7c1f4
+Create Date: 2026-10-17 09:12:36.447120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6c8f4a9d1'
+down_revision = 'd5a9e3b7c1f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE opportunity_search USING fts5("
+            "name, description, nonprofit, host_org_name, tags, causes, tokenize='porter unicode61')"
+        )
+        # the JSON arrays are indexed as their text; the tokenizer drops the punctuation
+        op.execute(
+            "INSERT INTO opportunity_search (rowid, name, description, nonprofit, host_org_name, tags, causes) "
+            "SELECT id, COALESCE(name, ''), COALESCE(description, ''), COALESCE(nonprofit, ''), "
+            "COALESCE(host_org_name, ''), COALESCE(tags, ''), COALESCE(causes, '') FROM opportunity"
+        )
+    else:
+        op.execute(
+            "CREATE TABLE opportunity_search ("
+            "opportunity_id INTEGER PRIMARY KEY REFERENCES opportunity (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        op.execute("CREATE INDEX ix_opportunity_search_document ON opportunity_search USING GIN (document)")
+        op.execute(
+            "INSERT INTO opportunity_search (opportunity_id, document) "
+            "SELECT id, "
+            "setweight(to_tsvector('english', COALESCE(name, '')), 'A') || "
+            "setweight(to_tsvector('english', COALESCE(tags::text, '') || ' ' || COALESCE(causes::text, '')), 'B') || "
+            "setweight(to_tsvector('english', COALESCE(nonprofit, '') || ' ' || COALESCE(host_org_name, '')), 'C') || "
+            "setweight(to_tsvector('english', COALESCE(description, '')), 'D') "
+            "FROM opportunity"
+        )
+
+
+def downgrade():
+    op.execute("DROP TABLE opportunity_search")
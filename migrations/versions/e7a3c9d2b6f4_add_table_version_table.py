@@ -0,0 +1,28 @@
+"""add table_version table
+
+Revision ID: e7a3c9d2b6f4
+Revises: d4b8e2f6a1c9
+Create Date: 2026-10-19 09:12:44.613205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a3c9d2b6f4'
+down_revision = 'd4b8e2f6a1c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('table_version',
+    sa.Column('table_name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+
+
+def downgrade():
+    op.drop_table('table_version')
@@ -0,0 +1,41 @@
+"""add waitlist_entry table
+
+Revision ID: e9c4b2a7d6f3
+Revises: a6d2f8b4c3e7
+Create Date: 2026-10-17 15:31:08.204517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9c4b2a7d6f3'
+down_revision = 'a6d2f8b4c3e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('waitlist_entry',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('opportunity_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('promoted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['opportunity_id'], ['opportunity.id'], name='fk_waitlist_entry_opportunity_id', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_waitlist_entry_user_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('opportunity_id', 'user_id', name='uq_waitlist_entry_opportunity_user')
+    )
+    with op.batch_alter_table('waitlist_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_waitlist_entry_opportunity_id_id', ['opportunity_id', 'id'], unique=False)
+        batch_op.create_index('ix_waitlist_entry_promoted_at', ['promoted_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('waitlist_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_waitlist_entry_promoted_at')
+        batch_op.drop_index('ix_waitlist_entry_opportunity_id_id')
+
+    op.drop_table('waitlist_entry')
@@ -0,0 +1,75 @@
+"""add opportunity_cause and opportunity_tag tables, backfilled from the JSON columns
+
+Revision ID: f4c1d7a3b8e6
+Revises: e2b6c8f4a9d1
+Create Date: 2026-10-17 11:35:52.180394
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c1d7a3b8e6'
+down_revision = 'e2b6c8f4a9d1'
+branch_labels = None
+depends_on = None
+
+
+def _values(value):
+    # same normalization as services/opportunity_filters.py
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            parsed = None
+        value = parsed if isinstance(parsed, list) else value.split(',')
+    return list(dict.fromkeys(str(v).strip() for v in value if str(v).strip()))
+
+
+def upgrade():
+    opportunity_cause = op.create_table('opportunity_cause',
+    sa.Column('opportunity_id', sa.Integer(), nullable=False),
+    sa.Column('cause', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['opportunity_id'], ['opportunity.id'], name='fk_opportunity_cause_opportunity_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('opportunity_id', 'cause')
+    )
+    with op.batch_alter_table('opportunity_cause', schema=None) as batch_op:
+        batch_op.create_index('ix_opportunity_cause_cause', ['cause', 'opportunity_id'], unique=False)
+
+    opportunity_tag = op.create_table('opportunity_tag',
+    sa.Column('opportunity_id', sa.Integer(), nullable=False),
+    sa.Column('tag', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['opportunity_id'], ['opportunity.id'], name='fk_opportunity_tag_opportunity_id', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('opportunity_id', 'tag')
+    )
+    with op.batch_alter_table('opportunity_tag', schema=None) as batch_op:
+        batch_op.create_index('ix_opportunity_tag_tag', ['tag', 'opportunity_id'], unique=False)
+
+    opportunity = sa.table('opportunity',
+        sa.column('id', sa.Integer),
+        sa.column('causes', sa.JSON),
+        sa.column('tags', sa.JSON)
+    )
+    causes, tags = [], []
+    for row in op.get_bind().execute(sa.select(opportunity.c.id, opportunity.c.causes, opportunity.c.tags)):
+        causes += [{'opportunity_id': row.id, 'cause': cause} for cause in _values(row.causes)]
+        tags += [{'opportunity_id': row.id, 'tag': tag} for tag in _values(row.tags)]
+    if causes:
+        op.bulk_insert(opportunity_cause, causes)
+    if tags:
+        op.bulk_insert(opportunity_tag, tags)
+
+
+def downgrade():
+    with op.batch_alter_table('opportunity_tag', schema=None) as batch_op:
+        batch_op.drop_index('ix_opportunity_tag_tag')
+
+    op.drop_table('opportunity_tag')
+    with op.batch_alter_table('opportunity_cause', schema=None) as batch_op:
+        batch_op.drop_index('ix_opportunity_cause_cause')
+
+    op.drop_table('opportunity_cause')
@@ -1,49 +1,102 @@
+from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
 from utils.auth import require_auth
-from db import db, FeedOrder, Opportunity, MultiOpportunity
+from utils.cache import etag_response
+from utils.helper import PaginationError, paginate_request
+from db import db, FeedOrder, FeedPosition, Opportunity, MultiOpportunity
+from services.feed_service import feed_item_type, move_feed_item, ordered_feed_query, replace_feed_order
 
 feed_order_bp = Blueprint("feed_order", __name__)
 
-def get_valid_ids():
-    opp_ids = {r.id for r in Opportunity.query.filter_by(multiopp_id=None).with_entities(Opportunity.id).all()}
-    multiopp_ids = {r.id for r in MultiOpportunity.query.with_entities(MultiOpportunity.id).all()}
-    return opp_ids, multiopp_ids
-
-def sync_order(stored, opp_ids, multiopp_ids):
-    # remove deleted entries
-    cleaned = [
-        item for item in stored
-        if (not item["is_multiopp"] and item["id"] in opp_ids)
-        or (item["is_multiopp"] and item["id"] in multiopp_ids)
-    ]
-    # append new entries not yet in the stored order
-    stored_opp_ids = {item["id"] for item in cleaned if not item["is_multiopp"]}
-    stored_multiopp_ids = {item["id"] for item in cleaned if item["is_multiopp"]}
-    new_entries = (
-        [{"id": i, "is_multiopp": False} for i in opp_ids - stored_opp_ids] +
-        [{"id": i, "is_multiopp": True} for i in multiopp_ids - stored_multiopp_ids]
-    )
-    return cleaned + new_entries
+# opportunities from up to a day ago stay on the feed, same as /api/opps/current
+FEED_LEEWAY = timedelta(days=1)
+
+def invisible_multiopp_ids():
+    feed_order = FeedOrder.query.first()
+    return feed_order.invisible_multiopps or [] if feed_order else []
+
+def parse_feed_item(item):
+    """(item_type, item_id) for a {"id", "is_multiopp"} object from a request body"""
+    return feed_item_type(item["is_multiopp"]), item["id"]
 
 @feed_order_bp.route("/api/feed-order", methods=["GET"])
 @require_auth
+@etag_response("feed_order", "feed_position")
 def get_feed_order():
-    opp_ids, multiopp_ids = get_valid_ids()
-    feed_order = FeedOrder.query.first()
+    order = [position.serialize() for position in ordered_feed_query()]
+    return jsonify({"order": order, "invisible_multiopps": invisible_multiopp_ids()}), 200
+
+@feed_order_bp.route("/api/feed", methods=["GET"])
+@require_auth
+@etag_response("feed_order", "feed_position", "opportunity", "multi_opportunity", max_age=300)
+def get_feed():
+    """
+    One page of the home feed: the stored feed order applied to current standalone
+    opportunities and visible multiopps, returned as compact cards. Runs the same five
+    queries whatever the page size: feed order, page of positions, opportunities,
+    multiopps and their upcoming summary (etag_response adds its version lookup).
+    """
+    try:
+        cutoff = datetime.utcnow() - FEED_LEEWAY
 
-    if not feed_order or feed_order.order == []:
-        order = (
-            [{"id": i, "is_multiopp": False} for i in opp_ids] +
-            [{"id": i, "is_multiopp": True} for i in multiopp_ids]
+        invisible = invisible_multiopp_ids()
+        feed_items = FeedPosition.query.filter(db.or_(
+            db.and_(
+                FeedPosition.item_type == FeedPosition.MULTIOPP,
+                FeedPosition.item_id.not_in(invisible)
+            ),
+            db.and_(
+                FeedPosition.item_type == FeedPosition.OPPORTUNITY,
+                FeedPosition.item_id.in_(db.select(Opportunity.id).where(Opportunity.date >= cutoff))
+            )
+        ))
+        positions, pagination = paginate_request(
+            feed_items,
+            [(FeedPosition.position, "asc"), (FeedPosition.item_type, "asc"), (FeedPosition.item_id, "asc")],
+            request.args
         )
-    else:
-        order = sync_order(feed_order.order, opp_ids, multiopp_ids)
-        if order != feed_order.order:
-            feed_order.order = order
-            db.session.commit()
+        page = [position.serialize() for position in positions]
+
+        page_opp_ids = [item["id"] for item in page if not item["is_multiopp"]]
+        page_multiopp_ids = [item["id"] for item in page if item["is_multiopp"]]
+        opps = {
+            opp.id: opp
+            for opp in Opportunity.query.filter(Opportunity.id.in_(page_opp_ids))
+        } if page_opp_ids else {}
+        multiopps = {
+            multiopp.id: multiopp
+            for multiopp in MultiOpportunity.query.filter(MultiOpportunity.id.in_(page_multiopp_ids))
+        } if page_multiopp_ids else {}
+        upcoming = {
+            row.multiopp_id: row
+            for row in db.session.execute(
+                db.select(
+                    Opportunity.multiopp_id,
+                    db.func.min(Opportunity.date).label("next_date"),
+                    db.func.count().label("upcoming_count")
+                )
+                .where(Opportunity.multiopp_id.in_(page_multiopp_ids), Opportunity.date >= cutoff)
+                .group_by(Opportunity.multiopp_id)
+            )
+        } if page_multiopp_ids else {}
+
+        items = []
+        for item in page:
+            if item["is_multiopp"] and item["id"] in multiopps:
+                summary = upcoming.get(item["id"])
+                items.append(multiopps[item["id"]].serialize_card(
+                    summary.next_date if summary else None,
+                    summary.upcoming_count if summary else 0
+                ))
+            elif not item["is_multiopp"] and item["id"] in opps:
+                items.append(opps[item["id"]].serialize_card())
+
+        return jsonify({"items": items, "pagination": pagination}), 200
 
-    invisible = feed_order.invisible_multiopps if feed_order else []
-    return jsonify({"order": order, "invisible_multiopps": invisible}), 200
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"message": "Failed to fetch feed", "error": str(e)}), 500
 
 @feed_order_bp.route("/api/feed-order", methods=["PUT"])
 @require_auth
@@ -55,15 +108,43 @@ def update_feed_order():
     if any(not isinstance(item, dict) or "id" not in item or "is_multiopp" not in item for item in order):
         return jsonify({"error": "each item must have 'id' and 'is_multiopp'"}), 400
 
-    feed_order = FeedOrder.query.first()
-    if not feed_order:
-        feed_order = FeedOrder(order=order)
-        db.session.add(feed_order)
-    else:
-        feed_order.order = order
+    replace_feed_order([parse_feed_item(item) for item in order])
+    db.session.commit()
+
+    order = [position.serialize() for position in ordered_feed_query()]
+    return jsonify({"order": order, "invisible_multiopps": invisible_multiopp_ids()}), 200
+
+@feed_order_bp.route("/api/feed-order/move", methods=["PUT"])
+@require_auth
+def move_feed_order_item():
+    """
+    Move one feed item next to another: body {"id", "is_multiopp", "after": {"id", "is_multiopp"},
+    "before": {...}}, with at least one of after/before. Only the moved item's row is written.
+    """
+    body = request.get_json()
+    if not isinstance(body, dict) or "id" not in body or "is_multiopp" not in body:
+        return jsonify({"error": "id and is_multiopp are required"}), 400
+    neighbours = {}
+    for key in ("after", "before"):
+        item = body.get(key)
+        if item is None:
+            continue
+        if not isinstance(item, dict) or "id" not in item or "is_multiopp" not in item:
+            return jsonify({"error": f"{key} must have 'id' and 'is_multiopp'"}), 400
+        neighbours[key] = parse_feed_item(item)
+    if not neighbours:
+        return jsonify({"error": "after or before is required"}), 400
+
+    try:
+        position = move_feed_item(*parse_feed_item(body), **neighbours)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    if position is None:
+        return jsonify({"error": "Item is not in the feed"}), 404
 
     db.session.commit()
-    return jsonify(feed_order.serialize()), 200
+    return jsonify({**position.serialize(), "position": position.position}), 200
 
 @feed_order_bp.route("/api/feed-order/invisible-multiopps", methods=["GET"])
 @require_auth
@@ -5,6 +5,7 @@ from flask import Blueprint, request, jsonify
 from utils.auth import require_auth
 from db import db, Opportunity, UserOpportunity, User, Organization, Friendship
 from services.s3_client import s3, S3_BUCKET
+from utils.cache import invalidate_cache, OPPS_CACHE
 import os 
 from werkzeug.utils import secure_filename
 
@@ -100,6 +101,7 @@ def marked_as_attended():
         user_opp_map = {uo.user_id: uo for uo in user_opps}
 
         first_user = True
+        newly_attended = 0
         for user_id in user_ids:
             uo = user_opp_map.get(user_id)
 
@@ -116,15 +118,18 @@ def marked_as_attended():
                 uo.attended = True
                 uo.driving = driving
                 uo.user.points += duration  # Award points to the User
+                newly_attended += 1
                 messages.append({"user_id": user_id, "message": "Attendance updated & points awarded"})
             else:
                 messages.append({"user_id": user_id, "message": "User already marked as attended"})
 
         # Update opportunity metadata
+        Opportunity.adjust_counts(opportunity_id, attended=newly_attended)
         opp.actual_runtime = duration
         opp.attendance_marked = True
 
         db.session.commit()
+        invalidate_cache(OPPS_CACHE)
         return jsonify({"results": messages}), 200
 
     except Exception as e:
@@ -280,6 +285,7 @@ def generate_random_schema():
 
         # Final commit
         db.session.commit()
+        invalidate_cache(OPPS_CACHE)
 
         
         return jsonify({
@@ -1,11 +1,19 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from operator import and_
 import traceback
 from flask import Blueprint, jsonify, make_response, request, Response
+from sqlalchemy.exc import IntegrityError
 from utils.auth import require_auth
-from db import db, Opportunity, MultiOpportunity
-from services.carpool_service import add_carpool
-from services.email_service import add_email
+from db import db, User, Opportunity, MultiOpportunity, UserOpportunity, WaitlistEntry
+from services.carpool_service import add_carpools
+from services.feed_service import append_multiopp_occurrences
+from services.gcal_service import generate_series_ics, queue_calendar_invite
+from services.search_service import index_opportunities
+from services.opportunity_filters import sync_opportunity_filters
+from services.recurrence import materialize_series, virtual_occurrences, series_week_recurrences
+from utils.cache import invalidate_cache, OPPS_CACHE
+from utils.idempotency import idempotent
+from utils.helper import iter_keyset, stream_json_response
 import json
 import os
 from dotenv import load_dotenv
@@ -16,105 +24,33 @@ env = os.environ.get("MY_ENV", "production")
 
 multiopp_bp = Blueprint("multiopp", __name__)
 
-def generate_opportunities_from_multiopp(multiopp: MultiOpportunity, data: dict):
-    """Generate individual opportunities from a MultiOpportunity recurrence pattern."""
-    from datetime import datetime, timedelta
-    import pytz
-
-    all_opps = []
-    start_date = multiopp.start_date
-
-    eastern = pytz.timezone("US/Eastern")
-
-    # Flatten day/time mapping list into (weekday, [(time_str, duration), ...]) pairs
-    day_time_pairs = []
-    for entry in multiopp.days_of_week:
-        for weekday, time_list in entry.items():
-            day_time_pairs.append((weekday, time_list))
+# how far ahead rolling series list their not-yet-materialized occurrences
+MULTIOPP_VIRTUAL_WEEKS = 26
+MAX_VIRTUAL_WEEKS = 104
 
-    total_weeks = multiopp.week_recurrences or 4
-    week_frequency = multiopp.week_frequency or 1
-
-    for week_index in range(total_weeks):
-        # Handle every Nth week (e.g., every 2 weeks)
-        if week_frequency > 1 and week_index % week_frequency != 0:
-            continue
-
-        base_week_start = start_date + timedelta(weeks=week_index)
-
-        for weekday_name, time_list in day_time_pairs:
-            weekday_index = [
-                "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"
-            ].index(weekday_name)
-            day_date = base_week_start + timedelta(days=(weekday_index - base_week_start.weekday()) % 7)
-
-            for time_entry in time_list:
-                # Each entry is a tuple or list: (start_time_str, duration)
-                if isinstance(time_entry, (list, tuple)) and len(time_entry) == 2:
-                    start_time_str, duration = time_entry
-                else:
-                    start_time_str, duration = time_entry, 60
-
-                # Parse "HH:MM" or ISO "T" time
-                start_time = (
-                    datetime.fromisoformat(start_time_str).time()
-                    if "T" in start_time_str
-                    else datetime.strptime(start_time_str, "%H:%M").time()
-                )
-
-                # Combine with date (naive datetime)
-                naive_dt = datetime.combine(day_date.date(), start_time)
-
-                # ✅ Localize to Eastern time, then convert to UTC for DB storage
-                localized_dt = eastern.localize(naive_dt)
-                dt_utc = localized_dt.astimezone(pytz.utc)
-                allow_carpool = data.get('allow_carpool').lower() == "true"
-
-                opp = Opportunity(
-                    name=data["name"],
-                    description=data.get("description"),
-                    causes=data.get("causes", []),
-                    tags=data.get("tags", []),
-                    address=data["address"],
-                    nonprofit=data.get("nonprofit"),
-                    image=data.get("image"),
-                    approved=data.get("approved", False),
-                    host_org_name=data.get("host_org_name"),
-                    qualifications=data.get("qualifications", []),
-                    visibility=data.get("visibility", []),
-                    host_org_id=data.get("host_org_id"),
-                    host_user_id=data.get("host_user_id"),
-                    redirect_url=data.get("redirect_url"),
-                    total_slots=data.get("total_slots"),
-                    allow_carpool=allow_carpool,
-
-                    # Recurrence-specific fields
-                    date=dt_utc,  # store in UTC
-                    duration=duration,
-                    recurring="recurring",
-                    comments=[],
-                    attendance_marked=False,
-                    actual_runtime=None,
-
-                    # Relationship
-                    multiopp_id=multiopp.id,
-                    multi_opportunity=multiopp,
-                )
-
-                db.session.add(opp)
-                all_opps.append(opp)
-                db.session.flush() 
+def generate_opportunities_from_multiopp(multiopp: MultiOpportunity):
+    """Generate individual opportunities from a MultiOpportunity recurrence pattern."""
+    all_opps = materialize_series(multiopp)
+    db.session.commit()
+    return all_opps
 
-                add_email(opp)
+def _as_bool(value):
+    # form fields arrive as "true"/"false" strings, JSON bodies as booleans
+    return str(value).lower() == "true"
 
-                if allow_carpool:
-                    add_carpool(opp, 'multiopp')
+def _virtual_until():
+    """End of the virtual occurrences listed for rolling series, from ?virtual_weeks="""
+    weeks = min(request.args.get("virtual_weeks", MULTIOPP_VIRTUAL_WEEKS, type=int), MAX_VIRTUAL_WEEKS)
+    return datetime.now(timezone.utc) + timedelta(weeks=max(weeks, 0))
 
-    db.session.commit()
-    return all_opps
+def _serialize_with_virtual(multiopp, virtual_until):
+    serialized = multiopp.serialize()
+    serialized["virtual_occurrences"] = virtual_occurrences(multiopp, virtual_until)
+    return serialized
 
 @multiopp_bp.route("/api/multiopps", methods=["POST"])
 @require_auth
+@idempotent()
 def create_multiopp():
     try: 
         if request.is_json:
@@ -133,7 +69,7 @@ def create_multiopp():
             if "visibility" in data:
                 data["visibility"] = json.loads(request.form["visibility"])
 
-
+        rolling = _as_bool(data.get("rolling", False))
 
         # Step 1: Create MultiOpportunity (recurrence definition)
         multiopp = MultiOpportunity(
@@ -155,14 +91,19 @@ def create_multiopp():
             start_date=datetime.fromisoformat(data["start_date"]),
             days_of_week=data["days_of_week"],
             week_frequency=data.get("week_frequency"),
-            week_recurrences=data.get("week_recurrences", 4)
+            # a rolling series without week_recurrences runs until it is deleted
+            week_recurrences=series_week_recurrences(data.get("week_recurrences"), rolling),
+            allow_carpool=_as_bool(data.get("allow_carpool")),
+            rolling=rolling
         )
 
         db.session.add(multiopp)
         db.session.commit()
 
-        # Step 2: Generate the actual individual Opportunities
-        generated_opps = generate_opportunities_from_multiopp(multiopp, data)
+        # Step 2: Generate the actual individual Opportunities (for a rolling series, only
+        # those within the horizon; the job runner adds the rest as they come into range)
+        generated_opps = generate_opportunities_from_multiopp(multiopp)
+        invalidate_cache(OPPS_CACHE)
 
         # Step 3: Return serialized MultiOpportunity and its generated Opportunities
         return jsonify({
@@ -203,18 +144,27 @@ def update_multiopp(multiopp_id):
 
         opportunities = Opportunity.query.filter_by(multiopp_id=multiopp_id).all()
         
+        allow_carpool = _as_bool(data.get("allow_carpool"))
+        new_carpools = []
         for opp in opportunities:
             for field in update_fields:
                 if field in data:
                     setattr(opp, field, data[field])
-            
-            db.session.flush()
-            
-            if not opp.allow_carpool and data["allow_carpool"]:
+
+            if not opp.allow_carpool and allow_carpool:
                 setattr(opp,'allow_carpool', True)
-                add_carpool(opp, 'multiopp')
-        
+                new_carpools.append(opp)
+
+        # occurrences a rolling series materializes later follow the series
+        if allow_carpool:
+            multiopp.allow_carpool = True
+
+        db.session.flush()
+        add_carpools(new_carpools)
+
+        index_opportunities(opportunities)
         db.session.commit()
+        invalidate_cache(OPPS_CACHE)
         
         return jsonify({
             "message": "MultiOpportunity and opportunities updated successfully",
@@ -235,8 +185,16 @@ def update_multiopp(multiopp_id):
 @multiopp_bp.route("/api/multiopps", methods=["GET"])
 # @require_auth
 def get_all_multiopps():
-    multiopps = MultiOpportunity.query.all()
-    return jsonify([m.serialize() for m in multiopps]), 200
+    multiopps = MultiOpportunity.query.options(
+        db.selectinload(MultiOpportunity.opportunities)
+            .selectinload(Opportunity.user_opportunities)
+            .joinedload(UserOpportunity.user)
+    )
+    virtual_until = _virtual_until()
+    return stream_json_response(
+        iter_keyset(multiopps, [(MultiOpportunity.id, 'asc')]),
+        lambda m: _serialize_with_virtual(m, virtual_until)
+    )
 
 
 # 🟢 GET SINGLE multiopp by ID
@@ -244,7 +202,7 @@ def get_all_multiopps():
 @require_auth
 def get_multiopp(multiopp_id):
     multiopp = MultiOpportunity.query.get_or_404(multiopp_id)
-    return jsonify(multiopp.serialize()), 200
+    return jsonify(_serialize_with_virtual(multiopp, _virtual_until())), 200
 
 
 # 🔴 DELETE multiopp by ID
@@ -253,8 +211,19 @@ def get_multiopp(multiopp_id):
 def delete_multiopp(multiopp_id):
     multiopp = MultiOpportunity.query.get_or_404(multiopp_id)
 
+    # detach the occurrences here rather than leaving it to ON DELETE SET NULL, so their
+    # updated_at moves and delta sync picks them up. As standalone opportunities they
+    # join the end of the feed.
+    append_multiopp_occurrences(multiopp_id)
+    db.session.execute(
+        db.update(Opportunity)
+        .where(Opportunity.multiopp_id == multiopp_id)
+        .values(multiopp_id=None)
+        .execution_options(synchronize_session=False)
+    )
     db.session.delete(multiopp)
     db.session.commit()
+    invalidate_cache(OPPS_CACHE)
     return jsonify({"message": f"MultiOpportunity {multiopp_id} deleted successfully."})
 
 @multiopp_bp.route("/api/multiopps/<int:multiopp_id>/visibility", methods=["PUT"])
@@ -279,10 +248,129 @@ def update_multiopp_visibility(multiopp_id):
     except (ValueError, TypeError):
         return jsonify({"error": "Invalid format for 'visibility'. Must be JSON array or object."}), 400
 
+    # occurrences carry their own copy, which is what visibility filtering reads
+    opportunities = Opportunity.query.filter_by(multiopp_id=multiopp_id).all()
+    for opp in opportunities:
+        opp.visibility = multiopp.visibility
+    sync_opportunity_filters(opportunities)
+
     db.session.commit()
+    invalidate_cache(OPPS_CACHE)
 
     return jsonify({"multiopp": multiopp.serialize()}), 200
 
+def queue_series_gcal_invite(multiopp, opps, user):
+    """One invite carrying a calendar event for each registered occurrence"""
+    events = []
+    for opp in opps:
+        # UTC
+        start = opp.date.replace(tzinfo=timezone.utc)
+        events.append((opp.name, start, start + timedelta(minutes=opp.duration), opp.description, opp.address))
+
+    ics = generate_series_ics(
+        events,
+        organizer_email="campuscares.us@gmail.com",
+        attendee_email=user.email
+    )
+
+    queue_calendar_invite(
+        to_email=user.email,
+        subject='Invitation: ' + multiopp.name,
+        body_text=f'Thanks for signing up! This email includes calendar invites for the {len(opps)} events you registered for.',
+        ics_content=ics
+    )
+
+@multiopp_bp.route("/api/multiopps/<int:multiopp_id>/register", methods=["POST"])
+@require_auth
+@idempotent()
+def register_user_for_multiopp(multiopp_id):
+    """
+    Register a user for several occurrences of a multiopp in one transaction. Either every
+    selected occurrence has room and the user is registered for all of them, or nothing
+    changes and the full ones are listed.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    user_id = data.get("user_id")
+    opportunity_ids = data.get("opportunity_ids")
+    driving = data.get("driving", False)
+
+    if not user_id or not opportunity_ids or not isinstance(opportunity_ids, list):
+        return jsonify({"error": "user_id and a list of opportunity_ids are required"}), 400
+    try:
+        opportunity_ids = list(dict.fromkeys(int(opp_id) for opp_id in opportunity_ids))
+    except (ValueError, TypeError):
+        return jsonify({"error": "opportunity_ids must be integers"}), 400
+
+    multiopp = MultiOpportunity.query.get(multiopp_id)
+    if not multiopp:
+        return jsonify({"error": "MultiOpportunity not found."}), 404
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    opps = (
+        Opportunity.query
+        .filter(Opportunity.id.in_(opportunity_ids), Opportunity.multiopp_id == multiopp_id)
+        .order_by(Opportunity.date)
+        .all()
+    )
+    missing = set(opportunity_ids) - {opp.id for opp in opps}
+    if missing:
+        return jsonify({
+            "error": "Some opportunities are not occurrences of this multiopp",
+            "opportunity_ids": sorted(missing)
+        }), 404
+
+    already = set(db.session.scalars(
+        db.select(UserOpportunity.opportunity_id)
+        .where(UserOpportunity.user_id == user_id, UserOpportunity.opportunity_id.in_(opportunity_ids))
+    ))
+    new_opps = [opp for opp in opps if opp.id not in already]
+    if not new_opps:
+        return jsonify({"message": "User already registered", "registered": []}), 200
+    new_ids = [opp.id for opp in new_opps]
+
+    try:
+        if not Opportunity.claim_slots(new_ids):
+            db.session.rollback()
+            full = db.session.scalars(
+                db.select(Opportunity.id)
+                .where(
+                    Opportunity.id.in_(new_ids),
+                    Opportunity.total_slots.isnot(None),
+                    Opportunity.registered_count >= Opportunity.total_slots
+                )
+            ).all()
+            return jsonify({"error": "Some opportunities are full", "full": True, "opportunity_ids": full}), 409
+
+        db.session.execute(db.insert(UserOpportunity), [
+            {
+                "user_id": user_id,
+                "opportunity_id": opp_id,
+                "registered": True,
+                "attended": False,
+                "driving": driving
+            }
+            for opp_id in new_ids
+        ])
+        WaitlistEntry.query.filter(
+            WaitlistEntry.user_id == user_id,
+            WaitlistEntry.opportunity_id.in_(new_ids)
+        ).delete(synchronize_session=False)
+        queue_series_gcal_invite(multiopp, new_opps, user)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            # a concurrent request registered the user for one of these first
+            return jsonify({"error": "Registration changed while registering, please retry"}), 409
+        invalidate_cache(OPPS_CACHE)
+
+        return jsonify({"message": "Registration successful", "registered": new_ids}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 @multiopp_bp.route("/api/multiopps/<int:multiopp_id>/mappings", methods=["GET"])
 @require_auth
 def get_multiopp_mappings_compact(multiopp_id):
@@ -503,6 +591,7 @@ def remap_opportunity_slots_compact(multiopp_id):
     try:
         multiopp.days_of_week = multiopp_days
         db.session.commit()
+        invalidate_cache(OPPS_CACHE)
     except Exception as e:
         db.session.rollback()
         return jsonify({"error":"Database error while committing changes","details": str(e)}), 500
@@ -1,21 +1,28 @@
 import logging
 
 from flask import Blueprint, request, jsonify, make_response
-from utils.auth import require_auth
-from db import db, User, Organization, Opportunity, UserOpportunity
+from sqlalchemy.exc import IntegrityError
+from utils.auth import authenticated_user, require_auth
+from db import db, User, Organization, Opportunity, UserOpportunity, WaitlistEntry, opportunity_load_options
 from datetime import datetime, timedelta, timezone
-from utils.helper import paginate, save_opportunity_image
+from utils.helper import PaginationError, decode_cursor, encode_cursor, paginate_request, stream_paginated, save_opportunity_image
+from utils.cache import cached_response, etag_response, invalidate_cache, OPPS_CACHE
+from utils.idempotency import idempotent
 from scheduler import cancel_scheduled_email
 from services.carpool_service import add_carpool
+from services.opportunity_service import opportunity_changes_since, TOMBSTONE_RETENTION_DAYS
+from services.search_service import index_opportunities, remove_from_index, search_opportunities
+from services.opportunity_filters import apply_cause_tag_filters, sync_opportunity_filters, visible_to_user
+from services.waitlist_service import find_entry, promote_waitlist, waitlist_position
 from services.email_service import (
     add_email,
-    send_approve_opp_email,
+    queue_approve_opp_email,
     should_notify_host_late_unregister,
-    send_host_late_unregister_email,
+    queue_host_late_unregister_email,
 )
 import json
 import io, csv
-from services.gcal_service import generate_ics, send_calendar_invite
+from services.gcal_service import queue_gcal_invite
 import pytz
 import os
 from dotenv import load_dotenv
@@ -28,31 +35,10 @@ logger = logging.getLogger(__name__)
 
 opps_bp = Blueprint("opps", __name__)
 
-def send_gcal_invite(opp, user):
-    # UTC
-    start = opp.date.replace(tzinfo=timezone.utc) 
-    end = start + timedelta(minutes=opp.duration)
-
-    ics = generate_ics(
-        event_title=opp.name,
-        start_dt=start,
-        end_dt=end,
-        description=opp.description,
-        location=opp.address,
-        organizer_email="campuscares.us@gmail.com",
-        attendee_email=user.email
-    )
-
-    send_calendar_invite(
-        to_email=user.email,
-        subject='Invitation: ' + opp.name,
-        body_text='Thanks for signing up! This email includes a calendar invite for the event.',
-        ics_content=ics
-    )
-
 # Opportunity Endpoints
 @opps_bp.route('/api/opps', methods=['POST'])
 @require_auth
+@idempotent()
 def create_opportunity():
     """Create a new opportunity with optional file upload"""
     try:
@@ -118,6 +104,13 @@ def create_opportunity():
         localized_dt = eastern.localize(parsed_date)
         gmt_date = localized_dt.astimezone(pytz.utc)
 
+        # form fields arrive as strings; the calendar invite does date math on duration
+        # and claim_slot compares against total_slots
+        try:
+            duration = int(data['duration'])
+            total_slots = int(data['total_slots']) if data.get('total_slots') not in (None, '') else None
+        except (TypeError, ValueError):
+            return jsonify({'message': 'duration and total_slots must be whole numbers'}), 400
 
         # admin users can create approved opps
         if host_user.admin:
@@ -133,12 +126,12 @@ def create_opportunity():
             name=data['name'],
             description=data.get('description'),
             date=gmt_date, 
-            duration=data['duration'],
+            duration=duration,
             causes=data.get('causes'),
             tags=data.get('tags', []),
             address=data.get('address'),
             nonprofit=data.get('nonprofit'),
-            total_slots=data.get('total_slots'),
+            total_slots=total_slots,
             image=data.get('image'),
             host_org_id=data['host_org_id'],
             host_user_id=data['host_user_id'],
@@ -163,7 +156,7 @@ def create_opportunity():
 
         # Send email to have admin approve opportunity
         if not host_user.admin:
-            send_approve_opp_email(host_user, new_opportunity)
+            queue_approve_opp_email(host_user, new_opportunity)
 
         if allow_carpool:
             add_carpool(new_opportunity, 'opp')
@@ -176,9 +169,12 @@ def create_opportunity():
                         attended=False  # Match your model field spelling
                     )
         db.session.add(user_opportunity)
+        new_opportunity.registered_count = 1
+        index_opportunities([new_opportunity])
+        sync_opportunity_filters([new_opportunity])
+        queue_gcal_invite(new_opportunity, host_user)
         db.session.commit()
-
-        send_gcal_invite(new_opportunity, host_user)
+        invalidate_cache(OPPS_CACHE)
             
         return jsonify(new_opportunity.serialize()), 201
     
@@ -194,21 +190,21 @@ def create_opportunity():
 def get_opportunities():
     """Get all opportunities with pagination"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10000))
-        
-        opportunities = Opportunity.query.order_by(Opportunity.id.desc())
-        paginated_opps = paginate(opportunities, page, per_page)
+        opportunities = apply_cause_tag_filters(
+            Opportunity.query.options(*opportunity_load_options("list")),
+            request.args
+        )
         
-        return jsonify({
-            'opportunities': [opp.serialize() for opp in paginated_opps.items],
-            'pagination': {
-                'page': paginated_opps.page,
-                'per_page': paginated_opps.per_page,
-                'total': paginated_opps.total
-            }
-        })
+        return stream_paginated(
+            opportunities,
+            [(Opportunity.id, 'desc')],
+            request.args,
+            'opportunities',
+            lambda opp: opp.serialize()
+        )
     
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             'message': 'Failed to fetch opportunities',
@@ -217,12 +213,11 @@ def get_opportunities():
 
 @opps_bp.route('/api/opps/current', methods=['GET'])
 # @require_auth
+@etag_response("opportunity", "user_opportunity", "user", "multi_opportunity", "carpool", max_age=300)
+@cached_response(OPPS_CACHE)
 def get_current_opportunities():
     """Get current opportunities (whose dates are not older than yesterday) with pagination"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10000))
-
         # Current UTC datetime
         current_datetime = datetime.utcnow()
 
@@ -232,23 +227,26 @@ def get_current_opportunities():
         # Filter: include all opps whose date >= (yesterday at this time)
         current_opportunities = (
             Opportunity.query
+            .options(*opportunity_load_options("list"))
             .filter(Opportunity.date >= leeway_start)
-            .order_by(Opportunity.date.asc())
         )
+        current_opportunities = apply_cause_tag_filters(current_opportunities, request.args)
 
-        paginated_opps = paginate(current_opportunities, page, per_page)
+        opps, pagination = paginate_request(
+            current_opportunities,
+            [(Opportunity.date, 'asc'), (Opportunity.id, 'asc')],
+            request.args
+        )
 
         return jsonify({
-            "opportunities": [opp.serialize() for opp in paginated_opps.items],
-            "pagination": {
-                "page": paginated_opps.page,
-                "per_page": paginated_opps.per_page,
-                "total": paginated_opps.total,
-            },
+            "opportunities": [opp.serialize() for opp in opps],
+            "pagination": pagination,
             "current_datetime": current_datetime.isoformat(),
             "leeway_start": leeway_start.isoformat()
         })
 
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             "message": "Failed to fetch current opportunities",
@@ -260,25 +258,23 @@ def get_current_opportunities():
 def get_approved_opportunities():
     """Get approved opportunities with pagination"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10000))
-        
         # Filter opportunities where approved is True
-        approved_opportunities = Opportunity.query.filter(
+        approved_opportunities = Opportunity.query.options(
+            *opportunity_load_options("list")
+        ).filter(
             Opportunity.approved == True
-        ).order_by(Opportunity.id.desc())
+        )
+        approved_opportunities = apply_cause_tag_filters(approved_opportunities, request.args)
         
-        paginated_opps = paginate(approved_opportunities, page, per_page)
+        opps, pagination = paginate_request(approved_opportunities, [(Opportunity.id, 'desc')], request.args)
         
         return jsonify({
-            'opportunities': [opp.serialize() for opp in paginated_opps.items],
-            'pagination': {
-                'page': paginated_opps.page,
-                'per_page': paginated_opps.per_page,
-                'total': paginated_opps.total
-            }
+            'opportunities': [opp.serialize() for opp in opps],
+            'pagination': pagination
         })
     
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             'message': 'Failed to fetch approved opportunities',
@@ -290,25 +286,23 @@ def get_approved_opportunities():
 def get_unapproved_opportunities():
     """Get unapproved opportunities with pagination"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10000))
-        
         # Filter opportunities where approved is False
-        unapproved_opportunities = Opportunity.query.filter(
+        unapproved_opportunities = Opportunity.query.options(
+            *opportunity_load_options("list")
+        ).filter(
             Opportunity.approved == False
-        ).order_by(Opportunity.id.desc())
+        )
+        unapproved_opportunities = apply_cause_tag_filters(unapproved_opportunities, request.args)
         
-        paginated_opps = paginate(unapproved_opportunities, page, per_page)
+        opps, pagination = paginate_request(unapproved_opportunities, [(Opportunity.id, 'desc')], request.args)
         
         return jsonify({
-            'opportunities': [opp.serialize() for opp in paginated_opps.items],
-            'pagination': {
-                'page': paginated_opps.page,
-                'per_page': paginated_opps.per_page,
-                'total': paginated_opps.total
-            }
+            'opportunities': [opp.serialize() for opp in opps],
+            'pagination': pagination
         })
     
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             'message': 'Failed to fetch unapproved opportunities',
@@ -320,36 +314,155 @@ def get_unapproved_opportunities():
 def get_active_opportunities():
     """Get active opportunities (start date is no more than 24 hours behind current date) with pagination"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10000))
-        
         # Calculate the cutoff time (24 hours ago from now)
         cutoff_time = datetime.now() - timedelta(hours=24)
         
         # Filter opportunities where date is >= cutoff_time (within last 24 hours)
-        active_opportunities = Opportunity.query.filter(
+        active_opportunities = Opportunity.query.options(
+            *opportunity_load_options("list")
+        ).filter(
             Opportunity.date >= cutoff_time
-        ).order_by(Opportunity.date.asc())  # Order by date ascending (earliest first)
+        )
+        active_opportunities = apply_cause_tag_filters(active_opportunities, request.args)
         
-        paginated_opps = paginate(active_opportunities, page, per_page)
+        # Order by date ascending (earliest first)
+        opps, pagination = paginate_request(
+            active_opportunities,
+            [(Opportunity.date, 'asc'), (Opportunity.id, 'asc')],
+            request.args
+        )
         
         return jsonify({
-            'opportunities': [opp.serialize() for opp in paginated_opps.items],
-            'pagination': {
-                'page': paginated_opps.page,
-                'per_page': paginated_opps.per_page,
-                'total': paginated_opps.total
-            },
+            'opportunities': [opp.serialize() for opp in opps],
+            'pagination': pagination,
             'cutoff_time': cutoff_time.isoformat(),
             'message': f'Active opportunities from the last 24 hours (since {cutoff_time.strftime("%Y-%m-%d %H:%M:%S")})'
         })
     
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             'message': 'Failed to fetch active opportunities',
             'error': str(e)
         }), 500
 
+@opps_bp.route('/api/users/<int:user_id>/visible-opps', methods=['GET'])
+@require_auth
+def get_visible_opportunities(user_id):
+    """
+    Current opportunities (same window as /api/opps/current) that the user is allowed to see,
+    with visibility evaluated in the database. Supports the cause/tag filters and pagination
+    of the other list endpoints. Only the user themselves or an admin may ask.
+
+    This trims what a client downloads; it is not an access control on restricted
+    opportunities, which /api/opps/current, /search, /changes and /api/feed still return
+    to everyone for the client to filter.
+    """
+    try:
+        viewer = authenticated_user()
+        if viewer is None or (viewer.id != user_id and not viewer.admin):
+            return jsonify({'message': "Not allowed to list another user's opportunities"}), 403
+
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({'message': 'User not found'}), 404
+
+        leeway_start = datetime.utcnow() - timedelta(days=1)
+        visible_opportunities = visible_to_user(
+            Opportunity.query
+            .options(*opportunity_load_options("list"))
+            .filter(Opportunity.date >= leeway_start),
+            user
+        )
+        visible_opportunities = apply_cause_tag_filters(visible_opportunities, request.args)
+
+        opps, pagination = paginate_request(
+            visible_opportunities,
+            [(Opportunity.date, 'asc'), (Opportunity.id, 'asc')],
+            request.args
+        )
+
+        return jsonify({
+            'opportunities': [opp.serialize() for opp in opps],
+            'pagination': pagination
+        })
+
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'message': 'Failed to fetch visible opportunities',
+            'error': str(e)
+        }), 500
+
+@opps_bp.route('/api/opps/search', methods=['GET'])
+@require_auth
+def search_opportunities_endpoint():
+    """
+    Full-text search over name, description, nonprofit, host org, tags and causes, best
+    match first. Upcoming opportunities only unless `upcoming=false`; paginated with `limit`/`cursor`.
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'message': 'q is required'}), 400
+
+        opps, pagination = search_opportunities(query, request.args)
+
+        return jsonify({
+            'opportunities': [opp.serialize() for opp in opps],
+            'pagination': pagination
+        })
+
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'message': 'Failed to search opportunities',
+            'error': str(e)
+        }), 500
+
+@opps_bp.route('/api/opps/changes', methods=['GET'])
+@require_auth
+def get_opportunity_changes():
+    """
+    Delta sync: opportunities created, updated or deleted since the `since` token, plus a
+    token for the next call. Without `since` only a fresh token is returned; fetch it before
+    loading the full list so nothing that changes in between is missed.
+    """
+    try:
+        # taken before querying, so anything committed while this request runs is re-sent next time
+        now = datetime.utcnow()
+        next_token = encode_cursor([now])
+
+        if not request.args.get('since'):
+            return jsonify({'opportunities': [], 'deleted': [], 'next_token': next_token})
+
+        try:
+            since, = decode_cursor(request.args['since'], [(Opportunity.updated_at, 'asc')])
+        except ValueError:
+            return jsonify({'message': 'Invalid sync token'}), 400
+
+        if since < now - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+            return jsonify({
+                'message': 'Sync token expired, reload the full opportunity list'
+            }), 410
+
+        changed, deleted_ids = opportunity_changes_since(since)
+
+        return jsonify({
+            'opportunities': [opp.serialize() for opp in changed],
+            'deleted': deleted_ids,
+            'next_token': next_token
+        })
+
+    except Exception as e:
+        return jsonify({
+            'message': 'Failed to fetch opportunity changes',
+            'error': str(e)
+        }), 500
+
 @opps_bp.route('/api/opps/<int:opp_id>/phone', methods=['GET'])
 @require_auth
 def get_involved_users_phone_numbers(opp_id):
@@ -408,7 +521,7 @@ def get_opportunity_attendance(opp_id):
 def get_opportunity(opp_id):
     """Get a single opportunity"""
     try:
-        opp = Opportunity.query.get_or_404(opp_id)
+        opp = Opportunity.query.options(*opportunity_load_options("detail")).get_or_404(opp_id)
         return jsonify(opp.serialize())
     
     except Exception as e:
@@ -423,11 +536,11 @@ def check_opportunity_full(opp_id):
     try:
         opportunity = Opportunity.query.get_or_404(opp_id)
         
-        # Count the number of users involved in this opportunity
-        involved_users_count = UserOpportunity.query.filter_by(opportunity_id=opp_id).count()
-        
-        # Check if fully booked
-        is_full = involved_users_count >= opportunity.total_slots
+        # Check if fully booked, using the denormalized registration counter
+        is_full = (
+            opportunity.total_slots is not None
+            and opportunity.registered_count >= int(opportunity.total_slots)
+        )
         
         return jsonify({
             'is_full': is_full
@@ -439,6 +552,81 @@ def check_opportunity_full(opp_id):
             'error': str(e)
         }), 500
 
+@opps_bp.route('/api/opps/<int:opp_id>/waitlist', methods=['POST'])
+@require_auth
+def join_waitlist(opp_id):
+    """Queue a user for a full opportunity; they are registered automatically when a slot frees up"""
+    data = request.get_json()
+    user_id = data.get('user_id')
+
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+
+    opportunity = Opportunity.query.get(opp_id)
+    if not opportunity:
+        return jsonify({"error": "Opportunity not found"}), 404
+    if not User.query.get(user_id):
+        return jsonify({"error": "User not found"}), 404
+
+    if UserOpportunity.query.filter_by(user_id=user_id, opportunity_id=opp_id).first():
+        return jsonify({"message": "User already registered"}), 200
+    if opportunity.total_slots is None or opportunity.registered_count < int(opportunity.total_slots):
+        return jsonify({"error": "Opportunity is not full, register instead", "full": False}), 409
+
+    entry = find_entry(opp_id, user_id)
+    if entry:
+        return jsonify({"message": "User already on waitlist", "position": waitlist_position(entry)}), 200
+
+    try:
+        # promoted entries are kept, so one left from an earlier promotion (the user has
+        # since unregistered) would block the unique constraint
+        WaitlistEntry.query.filter(
+            WaitlistEntry.opportunity_id == opp_id,
+            WaitlistEntry.user_id == user_id,
+            WaitlistEntry.promoted_at.isnot(None)
+        ).delete(synchronize_session=False)
+        entry = WaitlistEntry(opportunity_id=opp_id, user_id=user_id)
+        db.session.add(entry)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            # a concurrent request queued the same user first
+            entry = find_entry(opp_id, user_id)
+            if entry:
+                return jsonify({"message": "User already on waitlist", "position": waitlist_position(entry)}), 200
+            raise
+
+        return jsonify({"message": "Joined waitlist", "position": waitlist_position(entry)}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@opps_bp.route('/api/opps/<int:opp_id>/waitlist/<int:user_id>', methods=['GET'])
+@require_auth
+def get_waitlist_position(opp_id, user_id):
+    """A user's place in an opportunity's waitlist"""
+    entry = find_entry(opp_id, user_id)
+    if not entry:
+        registered = UserOpportunity.query.filter_by(user_id=user_id, opportunity_id=opp_id).first()
+        return jsonify({"on_waitlist": False, "registered": bool(registered)}), 404
+    return jsonify({"on_waitlist": True, "position": waitlist_position(entry)}), 200
+
+@opps_bp.route('/api/opps/<int:opp_id>/waitlist/<int:user_id>', methods=['DELETE'])
+@require_auth
+def leave_waitlist(opp_id, user_id):
+    """Remove a user from an opportunity's waitlist"""
+    entry = find_entry(opp_id, user_id)
+    if not entry:
+        return jsonify({"error": "User is not on the waitlist"}), 404
+    try:
+        db.session.delete(entry)
+        db.session.commit()
+        return jsonify({"message": "Left waitlist"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 @opps_bp.route('/api/opps/<int:opp_id>', methods=['PUT'])
 @require_auth
 def update_opportunity(opp_id):
@@ -536,6 +724,11 @@ def update_opportunity(opp_id):
                             user_id=old_host_user_id, opportunity_id=opp.id
                         ).first()
                         if old_uo:
+                            Opportunity.adjust_counts(
+                                opp.id,
+                                registered=-int(bool(old_uo.registered)),
+                                attended=-int(bool(old_uo.attended))
+                            )
                             db.session.delete(old_uo)
 
                         # Add or update new UserOpportunity
@@ -550,7 +743,13 @@ def update_opportunity(opp_id):
                                 attended=True
                             )
                             db.session.add(new_uo)
+                            Opportunity.adjust_counts(opp.id, registered=1, attended=1)
                         else:
+                            Opportunity.adjust_counts(
+                                opp.id,
+                                registered=int(not new_uo.registered),
+                                attended=int(not new_uo.attended)
+                            )
                             new_uo.registered = True
                             new_uo.attended = True
             
@@ -564,8 +763,14 @@ def update_opportunity(opp_id):
         if data.get('allow_carpool') and not init_allow_carpool:
             add_carpool(opp, 'opp')
         
+        index_opportunities([opp])
+        sync_opportunity_filters([opp])
+        # raising total_slots lets waitlisted users in
+        promote_waitlist(opp.id)
+
         # Commit all changes
         db.session.commit()
+        invalidate_cache(OPPS_CACHE)
         return jsonify(opp.serialize())
     
     
@@ -582,10 +787,11 @@ def delete_opportunity(opp_id):
     """Delete an opportunity"""
     try:
         opp = Opportunity.query.get_or_404(opp_id)
+        cancel_scheduled_email(opp_id)
         db.session.delete(opp)
+        remove_from_index([opp_id])
         db.session.commit()
-
-        cancel_scheduled_email(opp_id)
+        invalidate_cache(OPPS_CACHE)
 
         return jsonify({
             'message': 'Opportunity deleted successfully'
@@ -601,6 +807,7 @@ def delete_opportunity(opp_id):
 # Registration Endpoints
 @opps_bp.route('/api/register-opp', methods=['POST'])
 @require_auth
+@idempotent()
 def register_user_for_opportunity():
     data = request.get_json()
     user_id = data.get('user_id')
@@ -616,6 +823,13 @@ def register_user_for_opportunity():
         return jsonify({"message": "User already registered"}), 200
 
     try:
+        # take a slot and insert the registration in one transaction: if either fails, both roll back
+        if not Opportunity.claim_slot(opportunity_id):
+            db.session.rollback()
+            if not Opportunity.query.get(opportunity_id):
+                return jsonify({"error": "Opportunity not found"}), 404
+            return jsonify({"error": "Opportunity is full", "full": True}), 409
+
         user_opportunity = UserOpportunity(
             user_id=user_id,
             opportunity_id=opportunity_id,
@@ -624,12 +838,21 @@ def register_user_for_opportunity():
             driving=driving
         )
         db.session.add(user_opportunity)
-        db.session.commit()
+        # registering directly (e.g. after total_slots was raised) takes them off the waitlist
+        WaitlistEntry.query.filter_by(user_id=user_id, opportunity_id=opportunity_id).delete(synchronize_session=False)
 
         user = User.query.get_or_404(user_id)
         opp = Opportunity.query.get_or_404(opportunity_id)
-
-        send_gcal_invite(opp, user)
+        queue_gcal_invite(opp, user)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            # a concurrent request registered the same user first
+            if UserOpportunity.query.filter_by(user_id=user_id, opportunity_id=opportunity_id).first():
+                return jsonify({"message": "User already registered"}), 200
+            raise
+        invalidate_cache(OPPS_CACHE)
 
         return jsonify({"message": "Registration successful"}), 201
     except Exception as e:
@@ -675,25 +898,32 @@ def unregister_user_from_opportunity():
         opp_start = opportunity.date
         host_user_id = opportunity.host_user_id
         # Remove the association
-        db.session.delete(existing)
-        db.session.commit()
-        logger.info(
-            "unregister-opp ok opp_id=%s user_id=%s host_user_id=%s",
+        Opportunity.adjust_counts(
             opportunity_id,
-            user_id,
-            host_user_id,
+            registered=-int(bool(existing.registered)),
+            attended=-int(bool(existing.attended))
         )
+        db.session.delete(existing)
+        db.session.flush()
+        # the freed slot goes to the head of the waitlist in the same transaction
+        promoted = promote_waitlist(opportunity_id)
         if host_user_id and should_notify_host_late_unregister(opp_start):
             host = User.query.get(host_user_id)
             if host and host.email:
                 logger.info(
-                    "unregister-opp late-notify: sending Mailgun to host email=%s",
+                    "unregister-opp late-notify: queueing email to host email=%s",
                     host.email,
                 )
-                try:
-                    send_host_late_unregister_email(host, opportunity, user)
-                except Exception as e:
-                    logger.exception("unregister-opp late-notify Mailgun failed: %s", e)
+                queue_host_late_unregister_email(host, opportunity, user)
+        db.session.commit()
+        invalidate_cache(OPPS_CACHE)
+        logger.info(
+            "unregister-opp ok opp_id=%s user_id=%s host_user_id=%s promoted=%s",
+            opportunity_id,
+            user_id,
+            host_user_id,
+            promoted,
+        )
         return jsonify({"message": "Unregistration successful"}), 200
     except Exception as e:
         db.session.rollback()
@@ -727,8 +957,8 @@ def get_opps_csv():
             duration = opp.duration
             actual_runtime = opp.actual_runtime if opp.actual_runtime is not None else ''
             total_slots = opp.total_slots if opp.total_slots is not None else ''
-            total_attended = sum(1 for uo in (opp.user_opportunities or []) if getattr(uo, 'attended', False))
-            total_registered = sum(1 for uo in (opp.user_opportunities or []) if getattr(uo, 'registered', False))
+            total_attended = opp.attended_count
+            total_registered = opp.registered_count
             address = opp.address or ''
             date = opp.date.isoformat() if getattr(opp, 'date', None) else ''
             num_comments = len(opp.comments or [])
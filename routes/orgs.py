@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify 
 from utils.auth import require_auth
 from db import db, User, Organization
-from utils.helper import paginate
+from utils.helper import PaginationError, paginate_request, stream_paginated
 
 orgs_bp = Blueprint("orgs", __name__)
 
@@ -64,21 +64,21 @@ def create_organization():
 def get_organizations():
     """Get all organizations with pagination"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10000))
-        
-        organizations = Organization.query.order_by(Organization.id.desc())
-        paginated_orgs = paginate(organizations, page, per_page)
+        organizations = Organization.query.options(
+            db.selectinload(Organization.users),
+            db.selectinload(Organization.opportunities_hosted)
+        )
         
-        return jsonify({
-            'organizations': [org.serialize() for org in paginated_orgs.items],
-            'pagination': {
-                'page': paginated_orgs.page,
-                'per_page': paginated_orgs.per_page,
-                'total': paginated_orgs.total
-            }
-        })
+        return stream_paginated(
+            organizations,
+            [(Organization.id, 'desc')],
+            request.args,
+            'organizations',
+            lambda org: org.serialize()
+        )
     
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             'message': 'Failed to fetch organizations',
@@ -90,21 +90,16 @@ def get_organizations():
 def get_approved_organizations():
     """Get all approved organizations with pagination"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10000))
-        
-        organizations = Organization.query.filter_by(approved=True).order_by(Organization.id.desc())
-        paginated_orgs = paginate(organizations, page, per_page)
+        organizations = Organization.query.filter_by(approved=True)
+        orgs, pagination = paginate_request(organizations, [(Organization.id, 'desc')], request.args)
         
         return jsonify({
-            'organizations': [org.serialize() for org in paginated_orgs.items],
-            'pagination': {
-                'page': paginated_orgs.page,
-                'per_page': paginated_orgs.per_page,
-                'total': paginated_orgs.total
-            }
+            'organizations': [org.serialize() for org in orgs],
+            'pagination': pagination
         })
     
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             'message': 'Failed to fetch organizations',
@@ -117,21 +112,16 @@ def get_approved_organizations():
 def get_unapproved_organizations():
     """Get all unapproved organizations with pagination"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10000))
-        
-        organizations = Organization.query.filter_by(approved=False).order_by(Organization.id.desc())
-        paginated_orgs = paginate(organizations, page, per_page)
+        organizations = Organization.query.filter_by(approved=False)
+        orgs, pagination = paginate_request(organizations, [(Organization.id, 'desc')], request.args)
         
         return jsonify({
-            'organizations': [org.serialize() for org in paginated_orgs.items],
-            'pagination': {
-                'page': paginated_orgs.page,
-                'per_page': paginated_orgs.per_page,
-                'total': paginated_orgs.total
-            }
+            'organizations': [org.serialize() for org in orgs],
+            'pagination': pagination
         })
     
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             'message': 'Failed to fetch organizations',
@@ -1,9 +1,10 @@
 from flask import Blueprint, request, jsonify, make_response
 from utils.auth import require_auth
-from db import db, User, Organization
+from db import db, User, Organization, Opportunity, UserOpportunity, Friendship
 from datetime import datetime
 import os
-from utils.helper import paginate, allowed_file
+from utils.helper import PaginationError, paginate_request, stream_paginated, allowed_file
+from utils.cache import etag_response, invalidate_cache, OPPS_CACHE
 from werkzeug.utils import secure_filename
 from services.s3_client import s3, S3_BUCKET
 import csv, io
@@ -207,21 +208,27 @@ def get_user_emails_subscribed():
 def get_users():
     """Get all users with full details - requires authentication"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10000))
-        
-        users = User.query.order_by(User.id.desc())
-        paginated_users = paginate(users, page, per_page)
+        # everything User.serialize touches, so a page costs a fixed number of queries
+        users = User.query.options(
+            db.selectinload(User.organizations).selectinload(Organization.users),
+            db.selectinload(User.organizations).selectinload(Organization.opportunities_hosted),
+            db.selectinload(User.opportunities_hosted),
+            db.selectinload(User.user_opportunities).joinedload(UserOpportunity.opportunity),
+            db.selectinload(User.car),
+            db.selectinload(User.sent_friend_requests).joinedload(Friendship.receiver),
+            db.selectinload(User.received_friend_requests).joinedload(Friendship.requester)
+        )
         
-        return jsonify({
-            'users': [user.serialize() for user in paginated_users.items],
-            'pagination': {
-                'page': paginated_users.page,
-                'per_page': paginated_users.per_page,
-                'total': paginated_users.total
-            }
-        })
+        return stream_paginated(
+            users,
+            [(User.id, 'desc')],
+            request.args,
+            'users',
+            lambda user: user.serialize()
+        )
     
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             'message': 'Failed to fetch users',
@@ -233,30 +240,23 @@ def get_users():
 def get_users_netid():
     """Get all users' netids - requires authentication"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10000))
-
-        # Correct query — select users ordered by id DESC
-        users_query = User.query.order_by(User.id.desc())
-
-        # Paginate the actual query
-        paginated_users = paginate(users_query, page, per_page)
+        # Select only the columns we return, paginated by id DESC
+        users_query = User.query.options(db.load_only(User.id, User.email))
+        users, pagination = paginate_request(users_query, [(User.id, 'desc')], request.args)
 
         # Serialize just netid values
         users_list = [
             {"id": user.id, "email": user.email}
-            for user in paginated_users.items
+            for user in users
         ]
 
         return jsonify({
             "users": users_list,
-            "pagination": {
-                "page": paginated_users.page,
-                "per_page": paginated_users.per_page,
-                "total": paginated_users.total
-            }
+            "pagination": pagination
         })
 
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             "message": "Failed to fetch users",
@@ -311,6 +311,7 @@ def check_user_exists(email):
 
 @users_bp.route('/api/users/minimal', methods=['GET'])
 @require_auth
+@etag_response("user", "organization")
 def get_users_light():
     # Query only light user info and org IDs efficiently
     users = (
@@ -432,6 +433,8 @@ def update_user(user_id):
                     setattr(user, field, data[field])
         
         db.session.commit()
+        # involved users are embedded in the cached opportunity feed
+        invalidate_cache(OPPS_CACHE)
         return jsonify(user.serialize())
     
     except Exception as e:
@@ -447,8 +450,41 @@ def delete_user(user_id):
     """Delete a user"""
     try:
         user = User.query.get_or_404(user_id)
+        # their registrations go with them through ON DELETE CASCADE, so take them off the
+        # affected opportunities' counters first, and touch those for delta sync to pick up
+        registered = (
+            db.select(db.func.count())
+            .where(
+                UserOpportunity.user_id == user_id,
+                UserOpportunity.opportunity_id == Opportunity.id,
+                UserOpportunity.registered == True
+            )
+            .scalar_subquery()
+        )
+        attended = (
+            db.select(db.func.count())
+            .where(
+                UserOpportunity.user_id == user_id,
+                UserOpportunity.opportunity_id == Opportunity.id,
+                UserOpportunity.attended == True
+            )
+            .scalar_subquery()
+        )
+        db.session.execute(
+            db.update(Opportunity)
+            .where(Opportunity.id.in_(
+                db.select(UserOpportunity.opportunity_id).where(UserOpportunity.user_id == user_id)
+            ))
+            .values(
+                registered_count=Opportunity.registered_count - registered,
+                attended_count=Opportunity.attended_count - attended,
+                updated_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
         db.session.delete(user)
         db.session.commit()
+        invalidate_cache(OPPS_CACHE)
         return jsonify({
             'message': 'User deleted successfully'
         }), 200
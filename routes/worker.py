@@ -1,170 +1,76 @@
 from flask import Blueprint, request, jsonify
-from services.carpool_service import create_driver_email_body, create_rider_email_body
-from services.email_service import create_feedback_email_body
+from services.event_emails import send_carpool_emails, send_form_emails
 from utils.auth import require_api_key
-import requests
-from utils.helper import format_datetime
-import os
+from utils.idempotency import idempotent
 
 ## Routes that Cloudflare Worker calls and Fly.io stores
-
-MAILGUN_API_KEY = os.environ["MG_API_KEY"]
-DOMAIN = "mg.campuscares.us"
+## Emails are now sent by local scheduled jobs (services/job_runner.py); these stay for
+## sends the Worker had already scheduled
 
 worker_bp = Blueprint("carpool", __name__)
 
+def _worker_default_key(data):
+    # the Worker doesn't send Idempotency-Key; one send per opportunity per key TTL
+    # is what its retries need
+    opportunity_id = data.get('opportunity_id')
+    return f"opportunity:{opportunity_id}" if opportunity_id else None
+
+def _opportunity_id(data):
+    opportunity_id = (data or {}).get('opportunity_id')
+    if not opportunity_id:
+        return None, (jsonify({'error': 'Missing opportunity_id'}), 400)
+    # Convert to int explicitly
+    try:
+        return int(opportunity_id), None
+    except (ValueError, TypeError):
+        return None, (jsonify({'error': 'Invalid opportunity_id format'}), 400)
+
 @worker_bp.route('/api/send-carpool-email', methods=['POST'])
 @require_api_key
+@idempotent(default_key=_worker_default_key)
 def send_carpool_email_endpoint():
     """
     HTTP endpoint that Cloudflare Worker calls to send emails.
     This keeps your Fly.io app active only when needed.
     """
     try:
-        data = request.get_json()
-        opportunity_id = data.get('opportunity_id')
-        
-        if not opportunity_id:
-            return jsonify({'error': 'Missing opportunity_id'}), 400
-        
-        # Convert to int explicitly
-        try:
-            opportunity_id = int(opportunity_id)
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Invalid opportunity_id format'}), 400
-        
-        # Import your models
-        from shared import Opportunity, Carpool, Ride, Car
-        
-        opportunity = Opportunity.query.get(opportunity_id)
-        if not opportunity:
-            return jsonify({'error': 'Opportunity not found'}), 404
-        
-        time_data = format_datetime(opportunity.date, opportunity.multiopp_id)
-        print(f"OPP: {opportunity}")
-        print(f"MULTIOPP ID: {opportunity.multiopp_id}")
-        carpool = Carpool.query.filter_by(opportunity_id=opportunity_id).first()
-        
-        if not carpool:
-            return jsonify({'error': 'No carpool found'}), 404
-        
-        rides = Ride.query.filter_by(carpool_id=carpool.id).all()
-        
-        emails_sent = 0
-        
-        for ride in rides:
-            car = Car.query.filter_by(user_id=ride.driver_id).first()
-            riders = ride.ride_riders
-            subject = f"[{time_data['short']}] Carpool Information for {opportunity.name}"
+        opportunity_id, error = _opportunity_id(request.get_json())
+        if error:
+            return error
 
-            # Send driver email
-            body, plain_body = create_driver_email_body(ride, riders, opportunity, time_data)
-            response = requests.post(
-                f"https://api.mailgun.net/v3/{DOMAIN}/messages",
-                auth=("api", MAILGUN_API_KEY),
-                data={
-                    "from": f"CampusCares <postmaster@{DOMAIN}>",
-                    "to": ride.driver.email,
-                    "subject": subject,
-                    "text": plain_body,
-                    "html": body
-                }
-            )
-            
-            if response.status_code == 200:
-                emails_sent += 1
-
-            # Send rider emails
-            for rider in riders:
-                body, plain_body = create_rider_email_body(ride, rider, car, riders, opportunity, time_data)
-                response = requests.post(
-                    f"https://api.mailgun.net/v3/{DOMAIN}/messages",
-                    auth=("api", MAILGUN_API_KEY),
-                    data={
-                        "from": f"CampusCares <postmaster@{DOMAIN}>",
-                        "to": rider.user.email,
-                        "subject": subject,
-                        "text": plain_body,
-                        "html": body
-                    }
-                )
-                
-                if response.status_code == 200:
-                    emails_sent += 1
+        result = send_carpool_emails(opportunity_id)
         
         return jsonify({
             'success': True,
-            'emails_sent': emails_sent,
+            **result,
             'opportunity_id': opportunity_id
         }), 200
-        
+
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         print(f"Error sending carpool email: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @worker_bp.route('/api/send-form-email', methods=['POST'])
 @require_api_key
+@idempotent(default_key=_worker_default_key)
 def send_form_email_endpoint():
     try:
-        data = request.get_json()
-        opportunity_id = data.get('opportunity_id')
-        
-        if not opportunity_id:
-            return jsonify({'error': 'Missing opportunity_id'}), 400
-        
-        # Convert to int explicitly
-        try:
-            opportunity_id = int(opportunity_id)
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Invalid opportunity_id format'}), 400
-        
-        # Import your models
-        from shared import Opportunity, UserOpportunity, User
-        
-        opportunity = Opportunity.query.get(opportunity_id)
-
-        if not opportunity:
-            return jsonify({'error': 'Opportunity not found'}), 404
-        
-        users = (
-            User.query
-            .join(UserOpportunity, User.id == UserOpportunity.user_id)
-            .filter(
-                UserOpportunity.opportunity_id == opportunity_id,
-                UserOpportunity.registered == True
-            )
-            .all()
-        )
-        
-        print(f"OPP: {opportunity}")
-        print(f"MULTIOPP ID: {opportunity.multiopp_id}")
-
-        emails_sent = 0
+        opportunity_id, error = _opportunity_id(request.get_json())
+        if error:
+            return error
 
-        for user in users:
-            body, plain_body = create_feedback_email_body(user, opportunity)
-            response = requests.post(
-                f"https://api.mailgun.net/v3/{DOMAIN}/messages",
-                auth=("api", MAILGUN_API_KEY),
-                data={
-                    "from": f"CampusCares <postmaster@{DOMAIN}>",
-                    "to": user.email,
-                    "subject": "Thank You for Volunteering - We'd Love Your Feedback!",
-                    "text": plain_body,
-                    "html": body
-                }
-            )
-            
-            if response.status_code == 200:
-                emails_sent += 1
+        result = send_form_emails(opportunity_id)
         
         return jsonify({
             'success': True,
-            'emails_sent': emails_sent,
+            **result,
             'opportunity_id': opportunity_id
         }), 200
         
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         print(f"Error sending form email: {str(e)}")
         return jsonify({'error': str(e)}), 500
-
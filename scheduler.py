@@ -1,106 +1,116 @@
-import requests
 import os
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-from dotenv import load_dotenv
-load_dotenv()
+from datetime import timedelta, timezone
+from db import db, ScheduledJob
 
-CLOUDFLARE_WORKER_URL = os.environ["CLOUDFLARE_WORKER_URL"]
+# carpool details go out this long before the event starts
+CARPOOL_EMAIL_LEAD_HOURS = float(os.environ.get("CARPOOL_EMAIL_LEAD_HOURS", 7))
+
+def _as_naive_utc(dt):
+    # run_at is stored as naive UTC, like the other timestamps
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def _schedule(kind, opportunity_id, run_at):
+    # rescheduling replaces the pending job rather than adding a second send
+    db.session.execute(
+        db.delete(ScheduledJob).where(
+            ScheduledJob.kind == kind,
+            ScheduledJob.opportunity_id == opportunity_id,
+            ScheduledJob.status == ScheduledJob.PENDING
+        )
+    )
+    job = ScheduledJob(kind=kind, opportunity_id=opportunity_id, run_at=_as_naive_utc(run_at))
+    db.session.add(job)
+    print(f"[INFO] Scheduled {kind} for opportunity {opportunity_id} at {job.run_at.isoformat()}")
+    return job
+
+def schedule_jobs(kind, runs):
+    """
+    Bulk form of _schedule: one DELETE and one multi-row INSERT for every
+    (opportunity_id, run_at) pair in `runs`, whatever its length. Added to the current
+    session like the single-job functions.
+    """
+    runs = [(opportunity_id, _as_naive_utc(run_at)) for opportunity_id, run_at in runs]
+    if not runs:
+        return 0
+    db.session.execute(
+        db.delete(ScheduledJob).where(
+            ScheduledJob.kind == kind,
+            ScheduledJob.opportunity_id.in_([opportunity_id for opportunity_id, _ in runs]),
+            ScheduledJob.status == ScheduledJob.PENDING
+        )
+    )
+    db.session.execute(
+        db.insert(ScheduledJob),
+        [
+            {"kind": kind, "opportunity_id": opportunity_id, "run_at": run_at}
+            for opportunity_id, run_at in runs
+        ]
+    )
+    print(f"[INFO] Scheduled {len(runs)} {kind} jobs")
+    return len(runs)
 
 def schedule_carpool_email(opportunity_id, event_dt):
     """
-    Schedule the carpool email for a given opportunity via Cloudflare Workers.
+    Schedule the carpool email for a given opportunity. The job is added to the current
+    session and is picked up by the job runner once the caller commits.
 
     Parameters
     ----------
     opportunity_id : int
         The ID of the opportunity.
     event_dt : datetime.datetime
-        The datetime of the event (can be naive or aware).
+        The datetime of the event (can be naive UTC or aware).
     """
-    
-    # dt_send_time = event_dt - timedelta(hours=7)
-    iso = event_dt.isoformat()
-    print(f"[INFO] Event date time: {event_dt.isoformat()}")
-    print(f"[INFO] Event send time: {iso}")
-    
-    try:
-        response = requests.post(
-            f"{CLOUDFLARE_WORKER_URL}/api/schedule-email",
-            json={
-                "opportunity_id": opportunity_id,
-                "event_datetime": iso,
-                "email_type": "carpool"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        result = response.json()
-        
-        print(f"[SUCCESS] Scheduled email for opportunity {opportunity_id}")
-        print(f"[DEBUG] Send time: {result.get('send_time')}")
-        
-        return result
-        
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to schedule email: {str(e)}")
-        raise
+    return _schedule(
+        ScheduledJob.CARPOOL_EMAIL,
+        opportunity_id,
+        _as_naive_utc(event_dt) - timedelta(hours=CARPOOL_EMAIL_LEAD_HOURS)
+    )
+
+def schedule_carpool_emails(events):
+    """
+    Schedule the carpool emails for many opportunities at once.
+
+    Parameters
+    ----------
+    events : iterable of (int, datetime.datetime)
+        (opportunity ID, event datetime) pairs.
+    """
+    lead = timedelta(hours=CARPOOL_EMAIL_LEAD_HOURS)
+    return schedule_jobs(
+        ScheduledJob.CARPOOL_EMAIL,
+        [(opportunity_id, _as_naive_utc(event_dt) - lead) for opportunity_id, event_dt in events]
+    )
 
 def schedule_form_email(opportunity_id, event_end_dt):
     """
-    Schedule feedback form email
+    Schedule feedback form email for when the event ends
     """
-    
-    iso = event_end_dt.isoformat()
-    print(f"[INFO] Event end date time: {event_end_dt.isoformat()}")
-    print(f"[INFO] Event send time: {iso}")
-    
-    try:
-        response = requests.post(
-            f"{CLOUDFLARE_WORKER_URL}/api/schedule-email",
-            json={
-                "opportunity_id": opportunity_id,
-                "event_datetime": iso,
-                "email_type": "form"
-            },
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        result = response.json()
-        
-        print(f"[SUCCESS] Scheduled email for opportunity {opportunity_id}")
-        print(f"[DEBUG] Send time: {result.get('send_time')}")
-        
-        return result
-        
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to schedule email: {str(e)}")
-        raise
+    return _schedule(ScheduledJob.FORM_EMAIL, opportunity_id, event_end_dt)
+
+def schedule_form_emails(events):
+    """
+    Schedule the feedback form emails for many opportunities at once, from
+    (opportunity ID, event end datetime) pairs.
+    """
+    return schedule_jobs(ScheduledJob.FORM_EMAIL, events)
 
 def cancel_scheduled_email(opportunity_id):
     """
-    Cancel a scheduled email for a given opportunity.
+    Cancel the pending emails for a given opportunity, in the current session.
 
     Parameters
     ----------
     opportunity_id : int
         The ID of the opportunity.
     """
-    try:
-        response = requests.delete(
-            f"{CLOUDFLARE_WORKER_URL}/api/cancel-email",
-            params={"opportunity_id": opportunity_id},
-            timeout=10
+    result = db.session.execute(
+        db.delete(ScheduledJob).where(
+            ScheduledJob.opportunity_id == opportunity_id,
+            ScheduledJob.status == ScheduledJob.PENDING
         )
-        
-        response.raise_for_status()
-        result = response.json()
-        
-        print(f"[SUCCESS] Cancelled email for opportunity {opportunity_id}")
-        return result
-        
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to cancel email: {str(e)}")
-        raise
\ No newline at end of file
+    )
+    print(f"[SUCCESS] Cancelled {result.rowcount} scheduled emails for opportunity {opportunity_id}")
+    return result.rowcount
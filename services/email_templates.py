@@ -0,0 +1,26 @@
+"""
+Email templates, in templates/email/. Each email is a <name>.html and <name>.txt pair
+rendered from the same context; HTML is auto-escaped, plain text is not. Every template
+is compiled once at import and kept in the environment's cache.
+"""
+import os
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "email")
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(enabled_extensions=("html",), default_for_string=False),
+    undefined=StrictUndefined,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=True,
+    # templates only change on deploy, so never stat the files again
+    auto_reload=False,
+)
+
+_templates = {name: _env.get_template(name) for name in _env.list_templates()}
+
+def render_email(email, **context):
+    """(html, plain text) for the named email"""
+    return _templates[f"{email}.html"].render(context), _templates[f"{email}.txt"].render(context)
@@ -0,0 +1,135 @@
+"""
+The per-event fan-out emails: carpool details before an event and the feedback form after
+it. Sent by scheduled jobs (services/job_runner.py) and by the legacy Cloudflare Worker
+callbacks in routes/worker.py.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from db import Opportunity, Carpool, Ride, Car, User, UserOpportunity
+from services.carpool_service import create_driver_email_body, create_rider_email_body
+from services.email_service import create_feedback_batch_email_body, feedback_recipient_variables, MAILGUN_BATCH_LIMIT
+from services.outbox import MAILGUN_API_URL, MAILGUN_API_KEY, MAILGUN_DOMAIN, DEFAULT_SENDER
+from utils import http_client
+from utils.helper import format_datetime
+
+# Mailgun sends in flight at once for one carpool fan-out
+CARPOOL_EMAIL_CONCURRENCY = int(os.environ.get("CARPOOL_EMAIL_CONCURRENCY", 8))
+
+def _send_mailgun(to, subject, plain_body, body):
+    """Send one email; True if Mailgun accepted it"""
+    try:
+        response = http_client.post(
+            f"{MAILGUN_API_URL}/{MAILGUN_DOMAIN}/messages",
+            auth=("api", MAILGUN_API_KEY),
+            data={
+                "from": DEFAULT_SENDER,
+                "to": to,
+                "subject": subject,
+                "text": plain_body,
+                "html": body
+            }
+        )
+    except requests.exceptions.RequestException as e:
+        print(f"[ERROR] Failed to send email to {to}: {e}")
+        return False
+    return response.status_code == 200
+
+def send_carpool_emails(opportunity_id):
+    """
+    Email every driver and rider in the opportunity's carpool. Raises LookupError if the
+    opportunity or its carpool is gone; otherwise returns per-recipient results.
+    """
+    opportunity = Opportunity.query.get(opportunity_id)
+    if not opportunity:
+        raise LookupError('Opportunity not found')
+
+    time_data = format_datetime(opportunity.date, opportunity.multiopp_id)
+    carpool = Carpool.query.filter_by(opportunity_id=opportunity_id).first()
+    if not carpool:
+        raise LookupError('No carpool found')
+
+    rides = Ride.query.filter_by(carpool_id=carpool.id).all()
+
+    # render every message here, where the session is, then send them concurrently
+    messages = []
+    for ride in rides:
+        car = Car.query.filter_by(user_id=ride.driver_id).first()
+        riders = ride.ride_riders
+        subject = f"[{time_data['short']}] Carpool Information for {opportunity.name}"
+
+        # driver email
+        body, plain_body = create_driver_email_body(ride, riders, opportunity, time_data)
+        messages.append((ride.driver.email, subject, plain_body, body))
+
+        # rider emails
+        for rider in riders:
+            body, plain_body = create_rider_email_body(ride, rider, car, riders, opportunity, time_data)
+            messages.append((rider.user.email, subject, plain_body, body))
+
+    with ThreadPoolExecutor(max_workers=CARPOOL_EMAIL_CONCURRENCY) as pool:
+        results = list(pool.map(lambda message: _send_mailgun(*message), messages))
+
+    return {
+        'emails_sent': sum(results),
+        'failed_recipients': [message[0] for message, ok in zip(messages, results) if not ok],
+    }
+
+def send_form_emails(opportunity_id):
+    """
+    Send the feedback form to everyone registered for the opportunity, in Mailgun batches.
+    Raises LookupError if the opportunity is gone; otherwise returns per-recipient results.
+    """
+    opportunity = Opportunity.query.get(opportunity_id)
+    if not opportunity:
+        raise LookupError('Opportunity not found')
+
+    users = (
+        User.query
+        .join(UserOpportunity, User.id == UserOpportunity.user_id)
+        .filter(
+            UserOpportunity.opportunity_id == opportunity_id,
+            UserOpportunity.registered == True
+        )
+        .all()
+    )
+
+    recipients = [user for user in users if user.email]
+    # one render for every batch; Mailgun fills in each volunteer's name
+    body, plain_body = create_feedback_batch_email_body(opportunity)
+
+    emails_sent = 0
+    failed_recipients = []
+
+    for start in range(0, len(recipients), MAILGUN_BATCH_LIMIT):
+        batch = recipients[start:start + MAILGUN_BATCH_LIMIT]
+        recipient_variables = feedback_recipient_variables(batch)
+        try:
+            # recipient-variables also makes Mailgun send each address its own copy
+            response = http_client.post(
+                f"{MAILGUN_API_URL}/{MAILGUN_DOMAIN}/messages",
+                auth=("api", MAILGUN_API_KEY),
+                data={
+                    "from": DEFAULT_SENDER,
+                    "to": list(recipient_variables),
+                    "subject": "Thank You for Volunteering - We'd Love Your Feedback!",
+                    "text": plain_body,
+                    "html": body,
+                    "recipient-variables": json.dumps(recipient_variables)
+                }
+            )
+            ok = response.status_code == 200
+        except requests.exceptions.RequestException as e:
+            print(f"[ERROR] Feedback batch for opportunity {opportunity_id} failed: {e}")
+            ok = False
+
+        if ok:
+            emails_sent += len(recipient_variables)
+        else:
+            failed_recipients.extend(recipient_variables)
+
+    return {
+        'emails_sent': emails_sent,
+        'failed_recipients': failed_recipients,
+    }
@@ -0,0 +1,133 @@
+"""Home feed ordering on top of feed_position's fractional positions"""
+from db import db, FeedPosition, Opportunity
+
+# once two neighbours are closer than this, float precision is running out and every
+# position is respread GAP apart again
+MIN_POSITION_GAP = 1e-6
+
+def feed_item_type(is_multiopp):
+    return FeedPosition.MULTIOPP if is_multiopp else FeedPosition.OPPORTUNITY
+
+def ordered_feed_query():
+    return FeedPosition.query.order_by(FeedPosition.position, FeedPosition.item_type, FeedPosition.item_id)
+
+def _position_of(item_type, item_id):
+    return db.session.scalar(
+        db.select(FeedPosition.position)
+        .where(FeedPosition.item_type == item_type, FeedPosition.item_id == item_id)
+    )
+
+def _neighbour_position(item, position, above):
+    """Position of the closest item above (or below) `position`, ignoring `item` itself"""
+    column = FeedPosition.position
+    return db.session.scalar(
+        db.select(db.func.min(column) if above else db.func.max(column))
+        .where(column > position if above else column < position)
+        .where(db.not_(db.and_(FeedPosition.item_type == item.item_type, FeedPosition.item_id == item.item_id)))
+    )
+
+def _bounds(item, after, before):
+    """Positions the moved item has to fit between; either may be None"""
+    lower = upper = None
+    if after is not None:
+        lower = _position_of(*after)
+        if lower is None:
+            raise ValueError(f"{after[0]} {after[1]} is not in the feed")
+    if before is not None:
+        upper = _position_of(*before)
+        if upper is None:
+            raise ValueError(f"{before[0]} {before[1]} is not in the feed")
+    if after is not None and before is not None:
+        # feed order is (position, item_type, item_id), so `after` has to rank below `before`
+        if (lower, *after) >= (upper, *before):
+            raise ValueError("after must come before before in the feed")
+    if before is None and lower is not None:
+        upper = _neighbour_position(item, lower, above=True)
+    if after is None and upper is not None:
+        lower = _neighbour_position(item, upper, above=False)
+    return lower, upper
+
+def move_feed_item(item_type, item_id, after=None, before=None):
+    """
+    Move a feed item so it sits right after `after` and/or right before `before`, each an
+    (item_type, item_id) pair. Only the moved row is written, unless the gap has become
+    too small to split, in which case the whole feed is rebalanced first.
+    Returns the moved FeedPosition, or None if the item is not in the feed.
+    Raises ValueError if a neighbour is not in the feed or `after` does not rank below
+    `before`.
+    """
+    item = FeedPosition.query.get((item_type, item_id))
+    if item is None:
+        return None
+
+    lower, upper = _bounds(item, after, before)
+    if lower is not None and upper is not None and upper - lower < MIN_POSITION_GAP:
+        # respread once; afterwards any two distinct items are at least GAP apart
+        rebalance_feed()
+        lower, upper = _bounds(item, after, before)
+
+    if lower is None and upper is None:
+        return item
+    if lower is None:
+        item.position = upper - FeedPosition.GAP
+    elif upper is None:
+        item.position = lower + FeedPosition.GAP
+    else:
+        item.position = (lower + upper) / 2
+    return item
+
+def rebalance_feed():
+    """Respread every position GAP apart, keeping the current order"""
+    rows = db.session.execute(
+        ordered_feed_query().with_entities(FeedPosition.item_type, FeedPosition.item_id).statement
+    ).all()
+    if not rows:
+        return
+    db.session.execute(
+        db.update(FeedPosition),
+        [
+            {"item_type": row.item_type, "item_id": row.item_id, "position": (i + 1) * FeedPosition.GAP}
+            for i, row in enumerate(rows)
+        ]
+    )
+
+def replace_feed_order(order):
+    """
+    Reorder the whole feed to match `order`, a list of (item_type, item_id) pairs.
+    Items in the feed but missing from `order` keep their relative order after the listed
+    ones; listed items that aren't in the feed are ignored.
+    """
+    current = [
+        (row.item_type, row.item_id)
+        for row in db.session.execute(
+            ordered_feed_query().with_entities(FeedPosition.item_type, FeedPosition.item_id).statement
+        )
+    ]
+    existing = set(current)
+    listed = list(dict.fromkeys(item for item in order if item in existing))
+    listed_set = set(listed)
+    new_order = listed + [item for item in current if item not in listed_set]
+    if not new_order:
+        return
+    db.session.execute(
+        db.update(FeedPosition),
+        [
+            {"item_type": item_type, "item_id": item_id, "position": (i + 1) * FeedPosition.GAP}
+            for i, (item_type, item_id) in enumerate(new_order)
+        ]
+    )
+
+def append_multiopp_occurrences(multiopp_id):
+    """
+    Give the occurrences of a multiopp their own feed positions, at the end of the feed in
+    date order. Call before detaching them from a multiopp that is being deleted.
+    """
+    last = db.select(db.func.coalesce(db.func.max(FeedPosition.position), 0.0)).scalar_subquery()
+    rank = db.func.row_number().over(order_by=(Opportunity.date, Opportunity.id))
+    db.session.execute(
+        db.insert(FeedPosition).from_select(
+            ["item_type", "item_id", "position"],
+            db.select(db.literal(FeedPosition.OPPORTUNITY), Opportunity.id, last + rank * FeedPosition.GAP)
+            .where(Opportunity.multiopp_id == multiopp_id)
+        )
+    )
@@ -1,10 +1,33 @@
 from datetime import datetime, timedelta, timezone
 import uuid
-import requests
-import os 
+from services.outbox import enqueue_email
 
-MAILGUN_DOMAIN = "mg.campuscares.us"
-MAILGUN_API_KEY = os.getenv("MG_API_KEY")
+def _fmt(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def _vevent(event_title, start_dt, end_dt, description, location, organizer_email, attendee_email):
+    return f"""BEGIN:VEVENT
+UID:{uuid.uuid4()}
+DTSTAMP:{_fmt(datetime.now(timezone.utc))}
+DTSTART:{_fmt(start_dt)}
+DTEND:{_fmt(end_dt)}
+SUMMARY:{event_title}
+DESCRIPTION:{description}
+LOCATION:{location}
+ORGANIZER:mailto:{organizer_email}
+ATTENDEE;CN=Volunteer;RSVP=TRUE:mailto:{attendee_email}
+END:VEVENT
+"""
+
+def _vcalendar(vevents):
+    return (
+        "BEGIN:VCALENDAR\n"
+        "VERSION:2.0\n"
+        "PRODID:-//PPAC//Volunteer Events//EN\n"
+        "METHOD:REQUEST\n"
+        + "".join(vevents)
+        + "END:VCALENDAR\n"
+    )
 
 def generate_ics(
     event_title,
@@ -15,46 +38,54 @@ def generate_ics(
     organizer_email,
     attendee_email
 ):
-    uid = str(uuid.uuid4())
-
-    def fmt(dt):
-        return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-
-    ics = f"""BEGIN:VCALENDAR
-VERSION:2.0
-PRODID:-//PPAC//Volunteer Events//EN
-METHOD:REQUEST
-BEGIN:VEVENT
-UID:{uid}
-DTSTAMP:{fmt(datetime.now(timezone.utc))}
-DTSTART:{fmt(start_dt)}
-DTEND:{fmt(end_dt)}
-SUMMARY:{event_title}
-DESCRIPTION:{description}
-LOCATION:{location}
-ORGANIZER:mailto:{organizer_email}
-ATTENDEE;CN=Volunteer;RSVP=TRUE:mailto:{attendee_email}
-END:VEVENT
-END:VCALENDAR
-"""
-    return ics
+    return _vcalendar([
+        _vevent(event_title, start_dt, end_dt, description, location, organizer_email, attendee_email)
+    ])
 
-def send_calendar_invite(
+def generate_series_ics(
+    events,  # (event_title, start_dt, end_dt, description, location) per occurrence
+    organizer_email,
+    attendee_email
+):
+    """One calendar file holding an event per occurrence, so a series needs a single invite"""
+    return _vcalendar([
+        _vevent(title, start, end, description, location, organizer_email, attendee_email)
+        for title, start, end, description, location in events
+    ])
+
+def queue_calendar_invite(
     to_email,
     subject,
     body_text,
     ics_content
 ):
-    return requests.post(
-        f"https://api.mailgun.net/v3/{MAILGUN_DOMAIN}/messages",
-        auth=("api", MAILGUN_API_KEY),
-        files=[
-            ("attachment", ("event.ics", ics_content, "text/calendar"))
-        ],
-        data={
-            "from": "CampusCares <postmaster@mg.campuscares.us>",
-            "to": [to_email],
-            "subject": subject,
-            "text": body_text,
-        },
-    )
\ No newline at end of file
+    """Queue the invite in the outbox; it is sent once the caller commits"""
+    return enqueue_email(
+        to=[to_email],
+        subject=subject,
+        text=body_text,
+        attachments=[("event.ics", ics_content, "text/calendar")]
+    )
+
+def queue_gcal_invite(opp, user):
+    """Queue a calendar invite for one registration; sent once the caller commits"""
+    # UTC
+    start = opp.date.replace(tzinfo=timezone.utc) 
+    end = start + timedelta(minutes=opp.duration)
+
+    ics = generate_ics(
+        event_title=opp.name,
+        start_dt=start,
+        end_dt=end,
+        description=opp.description,
+        location=opp.address,
+        organizer_email="campuscares.us@gmail.com",
+        attendee_email=user.email
+    )
+
+    queue_calendar_invite(
+        to_email=user.email,
+        subject='Invitation: ' + opp.name,
+        body_text='Thanks for signing up! This email includes a calendar invite for the event.',
+        ics_content=ics
+    )
@@ -0,0 +1,136 @@
+"""
+Runs the jobs in scheduled_job once they are due.
+
+run_due_jobs() claims due jobs with SELECT ... FOR UPDATE SKIP LOCKED, so several runners
+never pick the same job on Postgres. SQLite ignores the lock clause; there the claim is the
+conditional pending -> running UPDATE, which only one runner can win. A job left running
+past JOB_LOCK_SECONDS (its runner died) is picked up again. Failed jobs are retried up to
+JOB_MAX_ATTEMPTS times.
+
+start_job_runner() polls from an APScheduler background thread in the web process;
+`flask run-jobs` does the same from its own process. The same thread also extends rolling
+multiopps to their horizon every SERIES_MATERIALIZE_SECONDS.
+"""
+import datetime
+import logging
+import os
+from apscheduler.schedulers.background import BackgroundScheduler
+from db import db, ScheduledJob
+from services.event_emails import send_carpool_emails, send_form_emails
+from services.recurrence import materialize_due_series
+
+logger = logging.getLogger(__name__)
+
+JOB_POLL_SECONDS = int(os.environ.get("JOB_POLL_SECONDS", 30))
+JOB_BATCH_SIZE = int(os.environ.get("JOB_BATCH_SIZE", 20))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+JOB_RETRY_SECONDS = 5 * 60
+JOB_LOCK_SECONDS = 30 * 60
+SERIES_MATERIALIZE_SECONDS = int(os.environ.get("SERIES_MATERIALIZE_SECONDS", 60 * 60))
+
+JOB_HANDLERS = {
+    ScheduledJob.CARPOOL_EMAIL: send_carpool_emails,
+    ScheduledJob.FORM_EMAIL: send_form_emails,
+}
+
+def _claim_due_jobs(now, batch_size):
+    stale = now - datetime.timedelta(seconds=JOB_LOCK_SECONDS)
+    candidates = (
+        ScheduledJob.query
+        .filter(
+            ScheduledJob.run_at <= now,
+            db.or_(
+                ScheduledJob.status == ScheduledJob.PENDING,
+                db.and_(ScheduledJob.status == ScheduledJob.RUNNING, ScheduledJob.locked_at < stale)
+            )
+        )
+        .order_by(ScheduledJob.run_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    claimed = []
+    for job in candidates:
+        result = db.session.execute(
+            db.update(ScheduledJob)
+            .where(
+                ScheduledJob.id == job.id,
+                ScheduledJob.status == job.status,
+                db.or_(ScheduledJob.locked_at.is_(None), ScheduledJob.locked_at < stale)
+            )
+            .values(status=ScheduledJob.RUNNING, locked_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            claimed.append(job.id)
+    db.session.commit()
+    return claimed
+
+def run_job(job):
+    """Run one claimed job and record the outcome; the caller commits"""
+    attempts = job.attempts + 1
+    try:
+        result = JOB_HANDLERS[job.kind](job.opportunity_id)
+    except LookupError as e:
+        # the opportunity or its carpool is gone; nothing to retry
+        job.status = ScheduledJob.DONE
+        job.result = {"skipped": str(e)}
+    except Exception as e:
+        db.session.rollback()
+        job.last_error = str(e)[:1000]
+        if attempts >= JOB_MAX_ATTEMPTS:
+            job.status = ScheduledJob.FAILED
+            logger.exception("job %s (%s) failed for good: %s", job.id, job.kind, e)
+        else:
+            job.status = ScheduledJob.PENDING
+            job.run_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=JOB_RETRY_SECONDS)
+            logger.warning("job %s (%s) failed, retrying: %s", job.id, job.kind, e)
+    else:
+        job.status = ScheduledJob.DONE
+        job.result = result
+        job.last_error = None
+    job.attempts = attempts
+    job.locked_at = None
+
+def run_due_jobs(batch_size=JOB_BATCH_SIZE):
+    """Claim and run the jobs that are due. Returns the number run."""
+    claimed = _claim_due_jobs(datetime.datetime.utcnow(), batch_size)
+    for job_id in claimed:
+        job = db.session.get(ScheduledJob, job_id)
+        run_job(job)
+        db.session.commit()
+    return len(claimed)
+
+def _poll(app):
+    with app.app_context():
+        try:
+            run_due_jobs()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("job runner poll failed: %s", e)
+        finally:
+            db.session.remove()
+
+def _materialize(app):
+    with app.app_context():
+        try:
+            materialize_due_series()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("series materialization failed: %s", e)
+        finally:
+            db.session.remove()
+
+def start_job_runner(app, poll_seconds=JOB_POLL_SECONDS):
+    """Poll for due jobs from a background APScheduler thread in this process"""
+    runner = BackgroundScheduler(daemon=True)
+    runner.add_job(
+        _poll, "interval", args=[app], seconds=poll_seconds,
+        id="run-due-jobs", max_instances=1, coalesce=True
+    )
+    runner.add_job(
+        _materialize, "interval", args=[app], seconds=SERIES_MATERIALIZE_SECONDS,
+        id="materialize-series", max_instances=1, coalesce=True
+    )
+    runner.start()
+    return runner
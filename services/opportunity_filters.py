@@ -0,0 +1,103 @@
+"""
+Cause/tag and visibility filtering for opportunity lists, backed by the opportunity_cause,
+opportunity_tag and opportunity_visibility tables
+"""
+import json
+from db import db, Opportunity, Organization, opportunity_cause, opportunity_tag, opportunity_visibility, user_organization
+
+def _values(value):
+    """Causes/tags as a list of strings. Multipart requests store them as a JSON or comma-separated string."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            parsed = None
+        value = parsed if isinstance(parsed, list) else value.split(",")
+    return list(dict.fromkeys(str(v).strip() for v in value if str(v).strip()))
+
+def _arg_values(args, name):
+    return list(dict.fromkeys(
+        v.strip() for arg in args.getlist(name) for v in arg.split(",") if v.strip()
+    ))
+
+def _org_ids(value):
+    ids = []
+    for v in _values(value):
+        try:
+            ids.append(int(v))
+        except ValueError:
+            continue
+    return list(dict.fromkeys(ids))
+
+def sync_opportunity_filters(opps):
+    """
+    Rewrite the cause, tag and visibility rows of the given opportunities from their JSON
+    columns. Flush first so they have ids.
+    """
+    ids = [opp.id for opp in opps]
+    if not ids:
+        return
+    causes = [{"opportunity_id": opp.id, "cause": cause} for opp in opps for cause in _values(opp.causes)]
+    tags = [{"opportunity_id": opp.id, "tag": tag} for opp in opps for tag in _values(opp.tags)]
+    visibility = [
+        {"opportunity_id": opp.id, "organization_id": org_id}
+        for opp in opps for org_id in _org_ids(opp.visibility)
+    ]
+    if visibility:
+        # ids of deleted organizations would violate the foreign key
+        existing = set(db.session.scalars(
+            db.select(Organization.id).where(Organization.id.in_({row["organization_id"] for row in visibility}))
+        ))
+        visibility = [row for row in visibility if row["organization_id"] in existing]
+
+    for table, rows in ((opportunity_cause, causes), (opportunity_tag, tags), (opportunity_visibility, visibility)):
+        db.session.execute(db.delete(table).where(table.c.opportunity_id.in_(ids)))
+        if rows:
+            db.session.execute(db.insert(table), rows)
+
+def visible_to_user(query, user):
+    """
+    Narrow an Opportunity query to what `user` may see: public opportunities (no visibility
+    rows), ones restricted to an organization they belong to, and ones they host.
+    Admins see everything.
+    """
+    if user.admin:
+        return query
+    restricted = db.exists().where(opportunity_visibility.c.opportunity_id == Opportunity.id)
+    member_of = (
+        db.select(opportunity_visibility.c.opportunity_id)
+        .join(user_organization, user_organization.c.organization_id == opportunity_visibility.c.organization_id)
+        .where(user_organization.c.user_id == user.id)
+    )
+    return query.filter(db.or_(
+        ~restricted,
+        Opportunity.id.in_(member_of),
+        Opportunity.host_user_id == user.id
+    ))
+
+def _matching_ids(table, column, values, match_all):
+    ids = db.select(table.c.opportunity_id).where(column.in_(values))
+    if match_all:
+        ids = ids.group_by(table.c.opportunity_id).having(db.func.count() == len(values))
+    return Opportunity.id.in_(ids)
+
+def apply_cause_tag_filters(query, args):
+    """
+    Narrow an Opportunity query by the `cause` and `tag` query parameters (repeatable or
+    comma-separated). With `match=all` (the default) an opportunity needs every listed cause
+    and tag; with `match=any` one of them is enough.
+    """
+    causes = _arg_values(args, "cause")
+    tags = _arg_values(args, "tag")
+    if not causes and not tags:
+        return query
+
+    match_all = args.get("match", "all").lower() != "any"
+    conditions = []
+    if causes:
+        conditions.append(_matching_ids(opportunity_cause, opportunity_cause.c.cause, causes, match_all))
+    if tags:
+        conditions.append(_matching_ids(opportunity_tag, opportunity_tag.c.tag, tags, match_all))
+    return query.filter(db.and_(*conditions) if match_all else db.or_(*conditions))
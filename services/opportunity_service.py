@@ -0,0 +1,73 @@
+import datetime
+from db import db, Opportunity, UserOpportunity, Tombstone, opportunity_load_options
+
+# changes are re-sent from this far before the token, so a transaction that committed just
+# after the previous poll but stamped its rows just before it is not missed
+SYNC_OVERLAP_SECONDS = 10
+# tombstones older than this are pruned; tokens older than this can't be served
+TOMBSTONE_RETENTION_DAYS = 30
+
+def reconcile_opportunity_counts():
+    """
+    Recompute Opportunity.registered_count / attended_count from user_opportunity for every
+    opportunity whose counters have drifted (e.g. after rows were edited by hand).
+    Returns the number of opportunities that were corrected.
+    """
+    registered = (
+        db.select(db.func.count())
+        .where(UserOpportunity.opportunity_id == Opportunity.id, UserOpportunity.registered == True)
+        .scalar_subquery()
+    )
+    attended = (
+        db.select(db.func.count())
+        .where(UserOpportunity.opportunity_id == Opportunity.id, UserOpportunity.attended == True)
+        .scalar_subquery()
+    )
+
+    result = db.session.execute(
+        db.update(Opportunity)
+        .where(db.or_(Opportunity.registered_count != registered, Opportunity.attended_count != attended))
+        .values(registered_count=registered, attended_count=attended)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+def opportunity_changes_since(since):
+    """
+    Opportunities created or updated after `since` (including ones whose registrations
+    changed or were removed) and the ids of opportunities deleted after `since`.
+    """
+    since = since - datetime.timedelta(seconds=SYNC_OVERLAP_SECONDS)
+
+    changed_registrations = db.select(UserOpportunity.opportunity_id).where(UserOpportunity.updated_at > since)
+    removed_registrations = db.select(Tombstone.opportunity_id).where(
+        Tombstone.table_name == UserOpportunity.__tablename__,
+        Tombstone.deleted_at > since
+    )
+    changed = (
+        Opportunity.query
+        .options(*opportunity_load_options("list"))
+        .filter(db.or_(
+            Opportunity.updated_at > since,
+            Opportunity.id.in_(changed_registrations),
+            Opportunity.id.in_(removed_registrations)
+        ))
+        .order_by(Opportunity.id)
+        .all()
+    )
+
+    deleted_ids = db.session.scalars(
+        db.select(Tombstone.opportunity_id)
+        .where(Tombstone.table_name == Opportunity.__tablename__, Tombstone.deleted_at > since)
+        .distinct()
+    ).all()
+
+    return changed, deleted_ids
+
+def prune_tombstones(days=TOMBSTONE_RETENTION_DAYS):
+    """Delete tombstones older than `days`. Returns the number removed."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    result = db.session.execute(db.delete(Tombstone).where(Tombstone.deleted_at < cutoff))
+    db.session.commit()
+    return result.rowcount
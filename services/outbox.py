@@ -0,0 +1,136 @@
+"""
+Transactional outbox for outbound email.
+
+Request handlers call enqueue_email() before they commit, so the message is stored in the
+same transaction as the change that caused it and never waits on Mailgun. The drainer
+(drain_outbox(), run by a background thread in the web process or by
+`flask drain-outbox`) delivers due messages through the shared HTTP client, retries
+failures with exponential backoff and marks a message dead after OUTBOX_MAX_ATTEMPTS.
+
+Point MAILGUN_API_URL at `flask fake-mailgun` to exercise all of this locally.
+"""
+import datetime
+import logging
+import os
+import threading
+from db import db, OutboundMessage
+from utils import http_client
+
+logger = logging.getLogger(__name__)
+
+MAILGUN_API_URL = os.environ.get("MAILGUN_API_URL", "https://api.mailgun.net/v3")
+MAILGUN_DOMAIN = "mg.campuscares.us"
+MAILGUN_API_KEY = os.getenv("MG_API_KEY")
+DEFAULT_SENDER = f"CampusCares <postmaster@{MAILGUN_DOMAIN}>"
+
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 50))
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", 5))
+# first retry waits this long, doubling up to OUTBOX_MAX_BACKOFF_SECONDS
+OUTBOX_BASE_BACKOFF_SECONDS = 30
+OUTBOX_MAX_BACKOFF_SECONDS = 6 * 60 * 60
+# how long a drainer holds a claimed message before another drainer may retry it
+OUTBOX_LEASE_SECONDS = 5 * 60
+
+def enqueue_email(to, subject, text, html=None, attachments=None, sender=DEFAULT_SENDER):
+    """
+    Add an email to the outbox in the current session; it goes out once the caller commits.
+    `attachments` is a list of (filename, content, content type).
+    """
+    data = {"from": sender, "to": to, "subject": subject, "text": text}
+    if html is not None:
+        data["html"] = html
+    message = OutboundMessage(payload={
+        "data": data,
+        "attachments": [list(attachment) for attachment in attachments or []]
+    })
+    db.session.add(message)
+    return message
+
+def _backoff(attempts):
+    seconds = min(OUTBOX_BASE_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS)
+    return datetime.timedelta(seconds=seconds)
+
+def _claim(message, now):
+    """Push the message's next attempt past the lease; False if another drainer got there first"""
+    result = db.session.execute(
+        db.update(OutboundMessage)
+        .where(
+            OutboundMessage.id == message.id,
+            OutboundMessage.status == OutboundMessage.PENDING,
+            OutboundMessage.next_attempt_at == message.next_attempt_at
+        )
+        .values(next_attempt_at=now + datetime.timedelta(seconds=OUTBOX_LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def deliver(payload):
+    response = http_client.post(
+        f"{MAILGUN_API_URL}/{MAILGUN_DOMAIN}/messages",
+        auth=("api", MAILGUN_API_KEY),
+        data=payload["data"],
+        files=[
+            ("attachment", tuple(attachment)) for attachment in payload.get("attachments") or []
+        ] or None
+    )
+    response.raise_for_status()
+    return response
+
+def drain_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """Deliver up to batch_size due messages. Returns (sent, failed)."""
+    now = datetime.datetime.utcnow()
+    due = (
+        OutboundMessage.query
+        .filter(OutboundMessage.status == OutboundMessage.PENDING, OutboundMessage.next_attempt_at <= now)
+        .order_by(OutboundMessage.next_attempt_at)
+        .limit(batch_size)
+        .all()
+    )
+    claimed = [message for message in due if _claim(message, now)]
+    db.session.commit()
+
+    sent = failed = 0
+    for message in claimed:
+        try:
+            deliver(message.payload)
+        except Exception as e:
+            failed += 1
+            message.attempts += 1
+            message.last_error = str(e)[:1000]
+            if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                message.status = OutboundMessage.DEAD
+                logger.error("outbox message %s dead after %s attempts: %s", message.id, message.attempts, e)
+            else:
+                message.next_attempt_at = datetime.datetime.utcnow() + _backoff(message.attempts)
+                logger.warning("outbox message %s failed (attempt %s): %s", message.id, message.attempts, e)
+        else:
+            sent += 1
+            message.attempts += 1
+            message.status = OutboundMessage.SENT
+            message.sent_at = datetime.datetime.utcnow()
+            message.last_error = None
+        db.session.commit()
+    return sent, failed
+
+def run_outbox_drainer(app, stop_event=None, poll_seconds=OUTBOX_POLL_SECONDS):
+    """Drain the outbox until stop_event is set, sleeping between empty batches"""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                sent, failed = drain_outbox()
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("outbox drain failed: %s", e)
+                sent = failed = 0
+            finally:
+                db.session.remove()
+        if not sent and not failed:
+            stop_event.wait(poll_seconds)
+
+def start_outbox_drainer(app):
+    """Run the drainer on a daemon thread in this process"""
+    thread = threading.Thread(target=run_outbox_drainer, args=(app,), name="outbox-drainer", daemon=True)
+    thread.start()
+    return thread
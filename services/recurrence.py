@@ -0,0 +1,237 @@
+"""
+Occurrences of a MultiOpportunity. expand_occurrences() turns the recurrence rule into
+dates without touching the session; insert_occurrences() writes a whole series with a
+single INSERT.
+
+A rolling series keeps only the next MULTIOPP_HORIZON_WEEKS of occurrences in the
+opportunity table. materialized_until marks how far it has been written;
+materialize_due_series() (run by the job runner and by `flask materialize-series`) moves
+that forward, and virtual_occurrences() stands in for the rest when listing.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+import pytz
+from db import db, Opportunity, MultiOpportunity
+from services.carpool_service import add_carpools
+from services.email_service import add_emails
+from services.opportunity_filters import sync_opportunity_filters
+from services.search_service import index_opportunities
+
+EASTERN = pytz.timezone("US/Eastern")
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DEFAULT_DURATION = 60
+# weeks of a non-rolling series created without week_recurrences
+DEFAULT_WEEK_RECURRENCES = 4
+
+# how far ahead a rolling series' occurrences exist as rows
+MULTIOPP_HORIZON_WEEKS = int(os.environ.get("MULTIOPP_HORIZON_WEEKS", 8))
+
+def _parse_time(start_time_str):
+    # "HH:MM" or an ISO datetime, of which only the time is used
+    if "T" in start_time_str:
+        return datetime.fromisoformat(start_time_str).time()
+    return datetime.strptime(start_time_str, "%H:%M").time()
+
+def _as_utc(dt):
+    # stored timestamps are naive UTC
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+def series_week_recurrences(week_recurrences, rolling):
+    """
+    week_recurrences to store for a new series. A rolling series without one is
+    open-ended and keeps NULL; any other series defaults to DEFAULT_WEEK_RECURRENCES.
+    """
+    if week_recurrences:
+        return int(week_recurrences)
+    return None if rolling else DEFAULT_WEEK_RECURRENCES
+
+def parse_days_of_week(days_of_week):
+    """
+    Flatten the days_of_week mapping list into (weekday index, start time, duration)
+    slots, parsing each time once. Entries are "HH:MM" or [start time, duration].
+    """
+    slots = []
+    for entry in days_of_week:
+        for weekday_name, time_list in entry.items():
+            weekday_index = WEEKDAYS.index(weekday_name)
+            for time_entry in time_list:
+                if isinstance(time_entry, (list, tuple)) and len(time_entry) == 2:
+                    start_time_str, duration = time_entry
+                else:
+                    start_time_str, duration = time_entry, DEFAULT_DURATION
+                slots.append((weekday_index, _parse_time(start_time_str), duration))
+    return slots
+
+def expand_occurrences(start_date, days_of_week, week_recurrences=None, week_frequency=None, after=None, until=None):
+    """
+    (date, duration) for every occurrence of the rule, in generation order. Times are
+    US/Eastern wall-clock times; the dates returned are aware UTC datetimes, as stored.
+
+    `after` and `until` keep only occurrences with after <= date < until. Without
+    week_recurrences the rule runs for DEFAULT_WEEK_RECURRENCES weeks, or indefinitely
+    when `until` is given.
+    """
+    slots = parse_days_of_week(days_of_week)
+    total_weeks = week_recurrences or (None if until is not None else DEFAULT_WEEK_RECURRENCES)
+    week_frequency = week_frequency or 1
+    after = _as_utc(after) if after is not None else None
+    until = _as_utc(until) if until is not None else None
+
+    occurrences = []
+    week_index = 0
+    while total_weeks is None or week_index < total_weeks:
+        base_week_start = start_date + timedelta(weeks=week_index)
+        # every occurrence in this week is later still
+        if until is not None and base_week_start.date() > until.date():
+            break
+        for weekday_index, start_time, duration in slots:
+            day_date = base_week_start + timedelta(days=(weekday_index - base_week_start.weekday()) % 7)
+            localized_dt = EASTERN.localize(datetime.combine(day_date.date(), start_time))
+            dt_utc = localized_dt.astimezone(pytz.utc)
+            if (after is None or dt_utc >= after) and (until is None or dt_utc < until):
+                occurrences.append((dt_utc, duration))
+        week_index += week_frequency
+    return occurrences
+
+def occurrence_rows(multiopp, occurrences):
+    """Column values for an Opportunity per (date, duration), ready for a bulk insert."""
+    shared = dict(
+        name=multiopp.name,
+        description=multiopp.description,
+        causes=multiopp.causes or [],
+        tags=multiopp.tags or [],
+        address=multiopp.address,
+        nonprofit=multiopp.nonprofit,
+        image=multiopp.image,
+        approved=multiopp.approved,
+        host_org_name=multiopp.host_org_name,
+        qualifications=multiopp.qualifications or [],
+        visibility=multiopp.visibility or [],
+        host_org_id=multiopp.host_org_id,
+        host_user_id=multiopp.host_user_id,
+        redirect_url=multiopp.redirect_url,
+        total_slots=multiopp.total_slots,
+        allow_carpool=multiopp.allow_carpool,
+
+        # Recurrence-specific fields
+        recurring="recurring",
+        comments=[],
+        attendance_marked=False,
+        actual_runtime=None,
+        registered_count=0,
+        attended_count=0,
+        multiopp_id=multiopp.id,
+    )
+    return [dict(shared, date=date, duration=duration) for date, duration in occurrences]
+
+def insert_occurrences(rows):
+    """
+    Insert the rows with one multi-row INSERT ... RETURNING (batched by the driver for
+    very long series) and return them as Opportunity objects, in row order.
+    """
+    if not rows:
+        return []
+    return db.session.scalars(
+        db.insert(Opportunity).returning(Opportunity, sort_by_parameter_order=True),
+        rows
+    ).all()
+
+def _materialize(multiopp, after, until):
+    occurrences = expand_occurrences(
+        multiopp.start_date, multiopp.days_of_week,
+        multiopp.week_recurrences, multiopp.week_frequency,
+        after=after, until=until
+    )
+    opps = insert_occurrences(occurrence_rows(multiopp, occurrences))
+
+    # one bulk insert each for the occurrences' jobs and carpools
+    add_emails(opps)
+    add_carpools([opp for opp in opps if opp.allow_carpool])
+
+    index_opportunities(opps)
+    sync_opportunity_filters(opps)
+    return opps
+
+def horizon_end(now=None):
+    """Where a rolling series' materialized occurrences stop"""
+    now = now or datetime.now(timezone.utc)
+    return _as_utc(now) + timedelta(weeks=MULTIOPP_HORIZON_WEEKS)
+
+def materialize_series(multiopp):
+    """
+    Write the series' occurrences as Opportunity rows: all of them, or for a rolling
+    series those up to horizon_end(). Runs in the caller's transaction; returns the new
+    Opportunities.
+    """
+    if not multiopp.rolling:
+        return _materialize(multiopp, None, None)
+
+    until = horizon_end()
+    after = multiopp.materialized_until
+    opps = _materialize(multiopp, after, until)
+    multiopp.materialized_until = until.replace(tzinfo=None)
+    return opps
+
+def _series_over(multiopp):
+    # a finite series has nothing left once the horizon has passed its last week
+    if not multiopp.week_recurrences or multiopp.materialized_until is None:
+        return False
+    last_week_end = multiopp.start_date + timedelta(weeks=multiopp.week_recurrences + 1)
+    return _as_utc(multiopp.materialized_until) > _as_utc(last_week_end)
+
+def materialize_due_series(now=None):
+    """
+    Extend every rolling series to horizon_end(now), committing one series at a time.
+    A series is claimed by moving materialized_until with a conditional UPDATE, so two
+    runners never write the same occurrences. Returns the number of occurrences created.
+    """
+    until = horizon_end(now).replace(tzinfo=None)
+    due = (
+        MultiOpportunity.query
+        .filter(
+            MultiOpportunity.rolling == True,
+            db.or_(MultiOpportunity.materialized_until.is_(None), MultiOpportunity.materialized_until < until)
+        )
+        .order_by(MultiOpportunity.id)
+        .all()
+    )
+
+    created = 0
+    for multiopp in due:
+        if _series_over(multiopp):
+            continue
+        after = multiopp.materialized_until
+        claimed = db.session.execute(
+            db.update(MultiOpportunity)
+            .where(
+                MultiOpportunity.id == multiopp.id,
+                MultiOpportunity.materialized_until.is_(None) if after is None
+                else MultiOpportunity.materialized_until == after
+            )
+            .values(materialized_until=until)
+            .execution_options(synchronize_session=False)
+        )
+        if claimed.rowcount != 1:
+            db.session.rollback()
+            continue
+        created += len(_materialize(multiopp, after, until))
+        db.session.commit()
+    return created
+
+def virtual_occurrences(multiopp, until):
+    """
+    The occurrences of a rolling series past its materialized rows and before `until`,
+    for display only: they have no id and can't be registered for until materialized.
+    """
+    if not multiopp.rolling:
+        return []
+    return [
+        {"date": date.replace(tzinfo=None), "duration": duration, "virtual": True}
+        for date, duration in expand_occurrences(
+            multiopp.start_date, multiopp.days_of_week,
+            multiopp.week_recurrences, multiopp.week_frequency,
+            after=multiopp.materialized_until, until=until
+        )
+    ]
@@ -0,0 +1,170 @@
+"""
+Full-text search over opportunities.
+
+On SQLite the index is an FTS5 table keyed by the opportunity's rowid and ranked with bm25().
+On Postgres it is a table of weighted tsvectors with a GIN index, ranked with ts_rank().
+Either way it is maintained explicitly: call index_opportunities() after creating or editing
+opportunities, and remove_from_index() when deleting them.
+"""
+import re
+from datetime import datetime
+from sqlalchemy import DDL, event
+from db import db, Opportunity, opportunity_load_options
+from services.opportunity_filters import _values
+from utils.helper import decode_cursor, encode_cursor, keyset_filter, page_size
+
+SEARCH_TABLE = "opportunity_search"
+# rows written per statement when rebuilding the whole index
+REINDEX_BATCH_SIZE = 500
+
+# bm25 column weights, in the FTS5 column order below
+SQLITE_WEIGHTS = (10.0, 1.0, 5.0, 5.0, 3.0, 3.0)
+SQLITE_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "name, description, nonprofit, host_org_name, tags, causes, tokenize='porter unicode61')"
+)
+POSTGRES_CREATE = (
+    f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+    "opportunity_id INTEGER PRIMARY KEY REFERENCES opportunity (id) ON DELETE CASCADE, "
+    "document TSVECTOR NOT NULL)"
+)
+POSTGRES_CREATE_INDEX = (
+    f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"
+)
+# A: name, B: tags and causes, C: nonprofit and host org, D: description
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', :name), 'A') || "
+    "setweight(to_tsvector('english', :tags || ' ' || :causes), 'B') || "
+    "setweight(to_tsvector('english', :nonprofit || ' ' || :host_org_name), 'C') || "
+    "setweight(to_tsvector('english', :description), 'D')"
+)
+
+# databases built with db.create_all() (setup scripts, staging) get the index too;
+# migrated databases get it from the migration
+event.listen(db.metadata, "after_create", DDL(SQLITE_CREATE).execute_if(dialect="sqlite"))
+event.listen(db.metadata, "after_create", DDL(POSTGRES_CREATE).execute_if(dialect="postgresql"))
+event.listen(db.metadata, "after_create", DDL(POSTGRES_CREATE_INDEX).execute_if(dialect="postgresql"))
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+def _document(opp):
+    return {
+        "id": opp.id,
+        "name": opp.name or "",
+        "description": opp.description or "",
+        "nonprofit": opp.nonprofit or "",
+        "host_org_name": opp.host_org_name or "",
+        # multipart creates store these as a JSON string, not a list
+        "tags": " ".join(_values(opp.tags)),
+        "causes": " ".join(_values(opp.causes)),
+    }
+
+def remove_from_index(opportunity_ids):
+    if not opportunity_ids:
+        return
+    key = "rowid" if _dialect() == "sqlite" else "opportunity_id"
+    db.session.execute(
+        db.text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} IN :ids")
+        .bindparams(db.bindparam("ids", expanding=True)),
+        {"ids": list(opportunity_ids)}
+    )
+
+def index_opportunities(opps):
+    """(Re)index the given opportunities. Runs in the caller's transaction; flush first so they have ids."""
+    documents = [_document(opp) for opp in opps]
+    if not documents:
+        return
+    remove_from_index([document["id"] for document in documents])
+    if _dialect() == "sqlite":
+        statement = db.text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, nonprofit, host_org_name, tags, causes) "
+            "VALUES (:id, :name, :description, :nonprofit, :host_org_name, :tags, :causes)"
+        )
+    else:
+        statement = db.text(f"INSERT INTO {SEARCH_TABLE} (opportunity_id, document) VALUES (:id, {POSTGRES_DOCUMENT})")
+    db.session.execute(statement, documents)
+
+def rebuild_search_index():
+    """Create the index if needed and rebuild it from every opportunity. Returns the number indexed."""
+    if _dialect() == "sqlite":
+        db.session.execute(db.text(SQLITE_CREATE))
+    else:
+        db.session.execute(db.text(POSTGRES_CREATE))
+        db.session.execute(db.text(POSTGRES_CREATE_INDEX))
+    db.session.execute(db.text(f"DELETE FROM {SEARCH_TABLE}"))
+
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = (
+            Opportunity.query
+            .filter(Opportunity.id > last_id)
+            .order_by(Opportunity.id)
+            .limit(REINDEX_BATCH_SIZE)
+            .all()
+        )
+        if not batch:
+            break
+        index_opportunities(batch)
+        indexed += len(batch)
+        last_id = batch[-1].id
+    db.session.commit()
+    return indexed
+
+def _search_terms(query):
+    # only word characters reach the match expression, so user input can't break its syntax
+    return re.findall(r"\w+", query.lower())
+
+def _hits(terms):
+    """Subquery of (opportunity_id, score) matching every term as a prefix; higher score ranks first"""
+    if _dialect() == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        weights = ", ".join(str(weight) for weight in SQLITE_WEIGHTS)
+        # bm25() is lower for better matches, so it is negated into a score
+        statement = db.text(
+            f"SELECT rowid AS opportunity_id, -bm25({SEARCH_TABLE}, {weights}) AS score "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match"
+        ).bindparams(match=match)
+    else:
+        match = " & ".join(f"{term}:*" for term in terms)
+        statement = db.text(
+            "SELECT opportunity_id, ts_rank(document, to_tsquery('english', :match)) AS score "
+            f"FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('english', :match)"
+        ).bindparams(match=match)
+    return statement.columns(
+        db.column("opportunity_id", db.Integer),
+        db.column("score", db.Float)
+    ).subquery("hits")
+
+def search_opportunities(query, args):
+    """
+    Opportunities matching `query`, best match first, keyset-paginated on (score, id) with the
+    same `limit`/`cursor` parameters as the list endpoints. Only upcoming opportunities are
+    searched unless `upcoming=false`. Returns (opportunities, pagination).
+    """
+    limit = page_size(args.get("limit"))
+    terms = _search_terms(query)
+    if not terms:
+        return [], {"limit": limit, "has_more": False, "next_cursor": None}
+
+    hits = _hits(terms)
+    keys = [(hits.c.score, "desc"), (Opportunity.id, "asc")]
+    results = (
+        db.session.query(Opportunity, hits.c.score)
+        .join(hits, hits.c.opportunity_id == Opportunity.id)
+        .options(*opportunity_load_options("list"))
+    )
+    if args.get("upcoming", "true").lower() != "false":
+        results = results.filter(Opportunity.date >= datetime.utcnow())
+    if args.get("cursor"):
+        results = results.filter(keyset_filter(keys, decode_cursor(args["cursor"], keys)))
+
+    rows = results.order_by(hits.c.score.desc(), Opportunity.id.asc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return [opp for opp, _ in rows], {
+        "limit": limit,
+        "has_more": has_more,
+        "next_cursor": encode_cursor([rows[-1][1], rows[-1][0].id]) if has_more else None
+    }
@@ -0,0 +1,83 @@
+"""
+Waitlists for full opportunities.
+
+Users join a per-opportunity FIFO queue (waitlist_entry). When a registration is removed,
+promote_waitlist() hands the freed slot to the head of the queue in the same transaction,
+stamps the entry's promoted_at and queues a "you're in" email and the calendar invite a
+direct registration gets in the outbox.
+"""
+import datetime
+from db import db, User, Opportunity, UserOpportunity, WaitlistEntry
+from services.email_service import queue_waitlist_promotion_email
+from services.gcal_service import queue_gcal_invite
+
+def waiting_entries(opportunity_id):
+    return WaitlistEntry.query.filter(
+        WaitlistEntry.opportunity_id == opportunity_id,
+        WaitlistEntry.promoted_at.is_(None)
+    )
+
+def waitlist_position(entry):
+    """
+    1-based place in the queue. Counts the entries ahead with a range scan of the
+    (opportunity_id, id) index, so it costs O(position), not O(log n); waitlists are a
+    handful of people per opportunity, which keeps that cheaper than maintaining a stored
+    rank that every promotion and departure would have to renumber.
+    """
+    ahead = db.session.scalar(
+        db.select(db.func.count())
+        .select_from(WaitlistEntry)
+        .where(
+            WaitlistEntry.opportunity_id == entry.opportunity_id,
+            WaitlistEntry.id < entry.id,
+            WaitlistEntry.promoted_at.is_(None)
+        )
+    )
+    return ahead + 1
+
+def find_entry(opportunity_id, user_id):
+    return waiting_entries(opportunity_id).filter(WaitlistEntry.user_id == user_id).first()
+
+def promote_waitlist(opportunity_id):
+    """
+    Register waiting users, oldest first, for as long as the opportunity has room. Runs in
+    the caller's transaction; the caller commits. Returns the promoted user ids.
+    """
+    promoted = []
+    while True:
+        # SKIP LOCKED so two concurrent unregisters promote different users (no-op on SQLite)
+        entry = (
+            waiting_entries(opportunity_id)
+            .order_by(WaitlistEntry.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if entry is None:
+            break
+        already_registered = UserOpportunity.query.filter_by(
+            user_id=entry.user_id, opportunity_id=opportunity_id
+        ).first()
+        if already_registered:
+            db.session.delete(entry)
+            db.session.flush()
+            continue
+        if not Opportunity.claim_slot(opportunity_id):
+            break
+        db.session.add(UserOpportunity(
+            user_id=entry.user_id,
+            opportunity_id=opportunity_id,
+            registered=True,
+            attended=False,
+            driving=False
+        ))
+        entry.promoted_at = datetime.datetime.utcnow()
+        db.session.flush()
+        promoted.append(entry.user_id)
+
+    if promoted:
+        opportunity = Opportunity.query.get(opportunity_id)
+        for user in User.query.filter(User.id.in_(promoted)):
+            if user.email:
+                queue_waitlist_promotion_email(user, opportunity)
+                queue_gcal_invite(opportunity, user)
+    return promoted
@@ -0,0 +1,113 @@
+"""
+Shared fixtures: the app on a throwaway SQLite database, emptied before every test,
+with the background drainer/runner threads off and staging auth (no token needed).
+"""
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("MY_ENV", "staging")
+os.environ.setdefault("FLASK_SECRET_KEY", "test")
+os.environ.setdefault("API_SECRET", "test")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["OUTBOX_DRAINER"] = "off"
+os.environ["JOB_RUNNER"] = "off"
+
+import contextlib
+import datetime
+import threading
+import pytest
+import requests
+from sqlalchemy import event
+import utils.cache
+from app import app as flask_app
+from db import db, User, Organization, Opportunity
+from services.search_service import rebuild_search_index
+from utils import http_client
+from utils.cache import MemoryCacheBackend
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        rebuild_search_index()
+        db.session.commit()
+        # table versions restart at 0 with the schema, so old cache keys could collide
+        utils.cache.response_cache = MemoryCacheBackend()
+        yield flask_app
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def user(app):
+    user = User(name="Host", email="host@example.com", phone="555-0100", admin=True)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def org(app, user):
+    org = Organization(name="Org", type="club", host_user_id=user.id, approved=True)
+    db.session.add(org)
+    db.session.commit()
+    return org
+
+@pytest.fixture
+def make_opp(app, user, org):
+    # ids rather than the objects, so tests may expunge the session between calls
+    host = dict(host_org_id=org.id, host_user_id=user.id, host_org_name=org.name)
+    def make_opp(**kwargs):
+        values = dict(
+            name="Opp", address="somewhere", duration=60, approved=True,
+            date=datetime.datetime.utcnow() + datetime.timedelta(days=7),
+            **host
+        )
+        values.update(kwargs)
+        opp = Opportunity(**values)
+        db.session.add(opp)
+        db.session.commit()
+        return opp
+    return make_opp
+
+@pytest.fixture
+def count_queries(app):
+    """count_queries() is a context manager collecting the SQL statements run inside it"""
+    @contextlib.contextmanager
+    def count_queries():
+        statements = []
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+    return count_queries
+
+class FakeMailgun:
+    """Stands in for http_client.post; records each request's data and fails for `failing` recipients"""
+    def __init__(self):
+        self.requests = []
+        self.failing = set()
+        self._lock = threading.Lock()
+
+    def post(self, url, **kwargs):
+        with self._lock:
+            self.requests.append(kwargs["data"])
+        to = kwargs["data"]["to"]
+        if set([to] if isinstance(to, str) else to) & self.failing:
+            raise requests.exceptions.ConnectionError("mailgun unreachable")
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+@pytest.fixture
+def mailgun_api(monkeypatch):
+    fake = FakeMailgun()
+    monkeypatch.setattr(http_client, "post", fake.post)
+    return fake
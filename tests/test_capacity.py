@@ -0,0 +1,43 @@
+import threading
+from db import db, Opportunity
+
+def _registered(opp_id):
+    db.session.expire_all()
+    return db.session.get(Opportunity, opp_id).registered_count
+
+def test_claim_slot_stops_at_total_slots(app, make_opp):
+    opp_id = make_opp(total_slots=2).id
+    assert [Opportunity.claim_slot(opp_id) for _ in range(3)] == [True, True, False]
+    db.session.commit()
+    assert _registered(opp_id) == 2
+
+def test_no_slot_limit_always_claims(app, make_opp):
+    opp_id = make_opp(total_slots=None).id
+    assert all(Opportunity.claim_slot(opp_id) for _ in range(5))
+    assert not Opportunity.claim_slot(999)
+
+def test_claim_slots_reports_any_full_opportunity(app, make_opp):
+    open_id, full_id = make_opp(total_slots=5).id, make_opp(total_slots=1, registered_count=1).id
+    assert not Opportunity.claim_slots([open_id, full_id])
+    db.session.rollback()
+    assert Opportunity.claim_slots([open_id])
+    db.session.commit()
+    assert (_registered(open_id), _registered(full_id)) == (1, 1)
+
+def test_concurrent_registrations_never_overbook(app, make_opp):
+    opp_id = make_opp(total_slots=3).id
+    results = []
+
+    def claim():
+        with app.app_context():
+            results.append(Opportunity.claim_slot(opp_id))
+            db.session.commit()
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 3
+    assert _registered(opp_id) == 3
@@ -0,0 +1,68 @@
+import threading
+import time
+import pytest
+from db import db, User, Car, Carpool, Ride, RideRider
+from services import event_emails
+from services.event_emails import send_carpool_emails
+
+@pytest.fixture
+def carpool_opp(app, make_opp):
+    """An opportunity with two rides: drivers d0 and d1, two riders each"""
+    opp = make_opp(name="Cleanup", allow_carpool=True)
+    carpool = Carpool(opportunity_id=opp.id)
+    db.session.add(carpool)
+    db.session.flush()
+    for d in range(2):
+        driver = User(name=f"Driver {d}", email=f"d{d}@example.com", phone="555-0100")
+        db.session.add(driver)
+        db.session.flush()
+        db.session.add(Car(user_id=driver.id, seats=4, color="blue", model="Civic", license_plate="ABC"))
+        ride = Ride(carpool_id=carpool.id, driver_id=driver.id)
+        db.session.add(ride)
+        db.session.flush()
+        for r in range(2):
+            rider = User(name=f"Rider {d}{r}", email=f"r{d}{r}@example.com", phone="555-0101")
+            db.session.add(rider)
+            db.session.flush()
+            db.session.add(RideRider(ride_id=ride.id, user_id=rider.id, pickup_location="Balch"))
+    db.session.commit()
+    return opp
+
+def test_every_driver_and_rider_is_emailed(carpool_opp, mailgun_api):
+    result = send_carpool_emails(carpool_opp.id)
+    assert result == {"emails_sent": 6, "failed_recipients": []}
+    assert sorted(request["to"] for request in mailgun_api.requests) == [
+        "d0@example.com", "d1@example.com",
+        "r00@example.com", "r01@example.com", "r10@example.com", "r11@example.com",
+    ]
+    assert all("Carpool Information for Cleanup" in request["subject"] for request in mailgun_api.requests)
+
+def test_failures_are_reported_per_recipient(carpool_opp, mailgun_api):
+    mailgun_api.failing = {"r01@example.com", "d1@example.com"}
+    result = send_carpool_emails(carpool_opp.id)
+    assert result["emails_sent"] == 4
+    assert sorted(result["failed_recipients"]) == ["d1@example.com", "r01@example.com"]
+
+def test_sends_are_bounded(carpool_opp, mailgun_api, monkeypatch):
+    monkeypatch.setattr(event_emails, "CARPOOL_EMAIL_CONCURRENCY", 2)
+    running, peak, lock = [0], [0], threading.Lock()
+    post = mailgun_api.post
+
+    def slow_post(url, **kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return post(url, **kwargs)
+
+    monkeypatch.setattr(event_emails.http_client, "post", slow_post)
+    assert send_carpool_emails(carpool_opp.id)["emails_sent"] == 6
+    assert peak[0] == 2
+
+def test_missing_opportunity_or_carpool(app, make_opp):
+    with pytest.raises(LookupError):
+        send_carpool_emails(999)
+    with pytest.raises(LookupError):
+        send_carpool_emails(make_opp().id)
@@ -0,0 +1,57 @@
+import datetime
+from db import db, UserOpportunity, Tombstone
+from services.opportunity_service import TOMBSTONE_RETENTION_DAYS, prune_tombstones
+from utils.helper import encode_cursor
+
+def _changes(client, token):
+    response = client.get("/api/opps/changes", query_string={"since": token})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def test_first_call_only_returns_a_token(client, make_opp):
+    make_opp()
+    body = client.get("/api/opps/changes").get_json()
+    assert body["opportunities"] == [] and body["deleted"] == [] and body["next_token"]
+
+def test_created_updated_and_deleted_since_the_token(client, make_opp, user):
+    kept, removed = make_opp(name="kept"), make_opp(name="removed")
+    # the overlap window re-sends recent rows, so start from well after they were written
+    kept.updated_at = removed.updated_at = datetime.datetime.utcnow() - datetime.timedelta(minutes=5)
+    db.session.commit()
+    token = encode_cursor([datetime.datetime.utcnow() - datetime.timedelta(minutes=1)])
+
+    created = make_opp(name="created")
+    db.session.add(UserOpportunity(user_id=user.id, opportunity_id=kept.id, registered=True))
+    db.session.delete(removed)
+    db.session.commit()
+
+    body = _changes(client, token)
+    assert sorted(opp["name"] for opp in body["opportunities"]) == ["created", "kept"]
+    assert body["deleted"] == [removed.id]
+
+def test_removed_registration_resends_the_opportunity(client, make_opp, user):
+    opp = make_opp()
+    registration = UserOpportunity(user_id=user.id, opportunity_id=opp.id, registered=True)
+    db.session.add(registration)
+    opp.updated_at = registration.updated_at = datetime.datetime.utcnow() - datetime.timedelta(minutes=5)
+    db.session.commit()
+    token = encode_cursor([datetime.datetime.utcnow() - datetime.timedelta(minutes=1)])
+    assert _changes(client, token)["opportunities"] == []
+
+    db.session.delete(registration)
+    db.session.commit()
+    assert [o["id"] for o in _changes(client, token)["opportunities"]] == [opp.id]
+
+def test_bad_and_expired_tokens(client):
+    assert client.get("/api/opps/changes", query_string={"since": "nope"}).status_code == 400
+    expired = encode_cursor([datetime.datetime.utcnow() - datetime.timedelta(days=TOMBSTONE_RETENTION_DAYS + 1)])
+    assert client.get("/api/opps/changes", query_string={"since": expired}).status_code == 410
+
+def test_prune_tombstones(app):
+    db.session.add_all([
+        Tombstone(table_name="opportunity", opportunity_id=1, deleted_at=datetime.datetime.utcnow() - datetime.timedelta(days=TOMBSTONE_RETENTION_DAYS + 1)),
+        Tombstone(table_name="opportunity", opportunity_id=2),
+    ])
+    db.session.commit()
+    assert prune_tombstones() == 1
+    assert [t.opportunity_id for t in Tombstone.query] == [2]
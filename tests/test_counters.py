@@ -0,0 +1,54 @@
+import pytest
+from db import db, User, Opportunity, UserOpportunity
+from services.opportunity_service import reconcile_opportunity_counts
+
+@pytest.fixture
+def volunteers(app):
+    users = [User(name=f"Volunteer {i}", email=f"v{i}@example.com", phone="555-0100") for i in range(3)]
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+def _counts(opp_id):
+    db.session.expire_all()
+    opp = db.session.get(Opportunity, opp_id)
+    return opp.registered_count, opp.attended_count
+
+def test_registration_and_attendance_move_the_counters(client, make_opp, volunteers):
+    opp_id = make_opp().id
+    for user_id in volunteers:
+        assert client.post("/api/register-opp", json={"user_id": user_id, "opportunity_id": opp_id}).status_code == 201
+    assert _counts(opp_id) == (3, 0)
+
+    response = client.put("/api/attendance", json={"user_ids": volunteers[:2], "opportunity_id": opp_id, "duration": 60})
+    assert response.status_code == 200
+    assert _counts(opp_id) == (3, 2)
+    # marking the same people again counts nobody twice
+    client.put("/api/attendance", json={"user_ids": volunteers[:2], "opportunity_id": opp_id, "duration": 60})
+    assert _counts(opp_id) == (3, 2)
+
+    assert client.post("/api/unregister-opp", json={"user_id": volunteers[0], "opportunity_id": opp_id}).status_code == 200
+    assert _counts(opp_id) == (2, 1)
+
+def test_deleting_a_user_releases_their_counts(client, make_opp, volunteers):
+    opp_ids = [make_opp().id for _ in range(2)]
+    for opp_id in opp_ids:
+        db.session.add_all(
+            UserOpportunity(user_id=user_id, opportunity_id=opp_id, registered=True, attended=True)
+            for user_id in volunteers
+        )
+        Opportunity.adjust_counts(opp_id, registered=3, attended=3)
+    db.session.commit()
+
+    assert client.delete(f"/api/users/{volunteers[0]}").status_code == 200
+    assert [_counts(opp_id) for opp_id in opp_ids] == [(2, 2), (2, 2)]
+
+def test_reconcile_fixes_drifted_counters(app, make_opp, volunteers):
+    drifted = make_opp(registered_count=7, attended_count=1)
+    correct = make_opp()
+    db.session.add(UserOpportunity(user_id=volunteers[0], opportunity_id=drifted.id, registered=True, attended=False))
+    db.session.commit()
+
+    assert reconcile_opportunity_counts() == 1
+    assert _counts(drifted.id) == (1, 0)
+    assert _counts(correct.id) == (0, 0)
@@ -0,0 +1,40 @@
+import datetime
+import pytest
+from jinja2 import UndefinedError
+from db import Opportunity
+from services import email_templates
+from services.email_service import create_waitlist_promotion_email, create_feedback_batch_email_body
+from services.email_templates import render_email
+
+def _opp(name):
+    return Opportunity(name=name, date=datetime.datetime(2026, 11, 2, 14, 0), duration=60, address="somewhere")
+
+class _User:
+    name = "Ada Lovelace"
+
+def test_every_email_has_an_html_and_text_template():
+    names = set(email_templates._templates)
+    assert names and all(name.rsplit(".", 1)[0] + ".txt" in names for name in names if name.endswith(".html"))
+    assert all(name.rsplit(".", 1)[0] + ".html" in names for name in names if name.endswith(".txt"))
+
+def test_html_is_escaped_and_text_is_not():
+    html, text = create_waitlist_promotion_email(_User(), _opp("Bake <sale> & more"))
+    assert "Bake &lt;sale&gt; &amp; more" in html
+    assert 'for "Bake <sale> & more"' in text
+    assert "Hi Ada," in text and "November 02, 2026 at 14:00 UTC" in text
+
+def test_feedback_batch_leaves_mailgun_placeholders():
+    html, text = create_feedback_batch_email_body(_opp("Cleanup"))
+    assert "Hi %recipient.name%," in html
+    assert "Hi %recipient.first_name%," in text
+
+def test_missing_context_is_an_error():
+    with pytest.raises(UndefinedError):
+        render_email("waitlist_promotion", greeting="Ada")
+
+def test_templates_are_compiled_once(monkeypatch):
+    loads = []
+    monkeypatch.setattr(email_templates._env.loader, "get_source", lambda *args: loads.append(args))
+    for _ in range(3):
+        create_waitlist_promotion_email(_User(), _opp("Cleanup"))
+    assert loads == []
@@ -0,0 +1,52 @@
+from db import db, Opportunity, TableVersion, table_versions
+
+def test_commits_bump_the_written_tables(app, make_opp):
+    before = table_versions("opportunity", "user")
+    opp = make_opp()
+    assert table_versions("opportunity", "user") == (before[0] + 1, before[1])
+
+    # bulk UPDATEs bypass the unit of work but still count
+    Opportunity.adjust_counts(opp.id, registered=1)
+    db.session.commit()
+    assert table_versions("opportunity")[0] == before[0] + 2
+
+    # a rolled-back write doesn't
+    Opportunity.adjust_counts(opp.id, registered=1)
+    db.session.rollback()
+    assert table_versions("opportunity")[0] == before[0] + 2
+    assert db.session.get(TableVersion, "table_version") is None
+
+def test_matching_if_none_match_is_a_304(client, make_opp, count_queries):
+    make_opp()
+    first = client.get("/api/opps/current")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag
+
+    with count_queries() as statements:
+        again = client.get("/api/opps/current", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.get_data() == b""
+    assert len(statements) == 1
+
+def test_a_write_changes_the_etag(client, make_opp, user):
+    opp = make_opp()
+    etag = client.get("/api/opps/current").headers["ETag"]
+
+    assert client.post("/api/register-opp", json={"user_id": user.id, "opportunity_id": opp.id}).status_code == 201
+    response = client.get("/api/opps/current", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_etag_depends_on_the_query_string(client, make_opp):
+    make_opp()
+    assert client.get("/api/opps/current").headers["ETag"] != client.get("/api/opps/current?limit=1").headers["ETag"]
+
+def test_unrelated_writes_keep_the_etag(client, user, make_opp):
+    etag = client.get("/api/users/minimal").headers["ETag"]
+    make_opp()
+    assert client.get("/api/users/minimal", headers={"If-None-Match": etag}).status_code == 304
+
+    user.name = "Renamed"
+    db.session.commit()
+    assert client.get("/api/users/minimal", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,64 @@
+import datetime
+import pytest
+from db import db, MultiOpportunity, FeedPosition
+from services.recurrence import materialize_series
+
+@pytest.fixture
+def series(app, user, org):
+    def series(name, start=None):
+        multiopp = MultiOpportunity(
+            name=name, address="somewhere", host_org_id=org.id, host_user_id=user.id,
+            start_date=start or datetime.datetime.utcnow() + datetime.timedelta(days=1),
+            days_of_week=[{"Monday": ["09:00"], "Thursday": ["09:00"]}], week_recurrences=2
+        )
+        db.session.add(multiopp)
+        db.session.flush()
+        materialize_series(multiopp)
+        db.session.commit()
+        return multiopp
+    return series
+
+def _feed(client, **args):
+    response = client.get("/api/feed", query_string=args)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def test_feed_merges_opportunities_and_series_in_feed_order(client, make_opp, series):
+    make_opp(name="first")
+    weekly = series("weekly")
+    make_opp(name="past", date=datetime.datetime.utcnow() - datetime.timedelta(days=3))
+    make_opp(name="last")
+
+    items = _feed(client)["items"]
+    # occurrences are not feed items of their own, past opportunities drop off
+    assert [item["name"] for item in items] == ["first", "weekly", "last"]
+    card = items[1]
+    assert card["is_multiopp"] and card["upcoming_count"] == 4 and card["next_date"]
+    assert FeedPosition.query.count() == 4
+
+def test_invisible_series_are_left_out(client, make_opp, series):
+    make_opp(name="opp")
+    hidden = series("hidden")
+    response = client.put("/api/feed-order/invisible-multiopps", json={"invisible_multiopps": [hidden.id]})
+    assert response.status_code == 200
+    assert [item["name"] for item in _feed(client)["items"]] == ["opp"]
+
+def test_feed_pages_with_a_fixed_number_of_queries(client, make_opp, series, count_queries):
+    for i in range(3):
+        make_opp(name=f"opp {i}")
+        series(f"series {i}")
+
+    with count_queries() as statements:
+        first = _feed(client, limit=4)
+    assert len(statements) == 6
+    assert first["pagination"]["has_more"]
+    rest = _feed(client, limit=4, cursor=first["pagination"]["next_cursor"])
+    names = [item["name"] for item in first["items"] + rest["items"]]
+    assert names == ["opp 0", "series 0", "opp 1", "series 1", "opp 2", "series 2"]
+
+def test_feed_is_conditional(client, make_opp):
+    make_opp()
+    etag = client.get("/api/feed").headers["ETag"]
+    assert client.get("/api/feed", headers={"If-None-Match": etag}).status_code == 304
+    make_opp()
+    assert client.get("/api/feed", headers={"If-None-Match": etag}).status_code == 200
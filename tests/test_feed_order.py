@@ -0,0 +1,70 @@
+import pytest
+from db import db, FeedPosition
+from services import feed_service
+from services.feed_service import move_feed_item, rebalance_feed, replace_feed_order
+
+OPP = FeedPosition.OPPORTUNITY
+
+@pytest.fixture
+def feed(make_opp):
+    """Ids of four opportunities, appended to the feed in order"""
+    return [make_opp(name=f"opp {i}").id for i in range(4)]
+
+def _order():
+    return [position.item_id for position in feed_service.ordered_feed_query()]
+
+def _move(client, item_id, **neighbours):
+    body = {"id": item_id, "is_multiopp": False}
+    body.update({key: {"id": value, "is_multiopp": False} for key, value in neighbours.items()})
+    return client.put("/api/feed-order/move", json=body)
+
+def test_move_only_writes_the_moved_row(client, feed, count_queries):
+    a, b, c, d = feed
+    with count_queries() as statements:
+        response = _move(client, d, after=a, before=b)
+    assert response.status_code == 200
+    assert [s for s in statements if s.startswith("UPDATE feed_position")] == [
+        "UPDATE feed_position SET position=? WHERE feed_position.item_type = ? AND feed_position.item_id = ?"
+    ]
+    assert _order() == [a, d, b, c]
+
+def test_move_with_one_neighbour(client, feed):
+    a, b, c, d = feed
+    assert _move(client, a, after=c).status_code == 200
+    assert _order() == [b, c, a, d]
+    assert _move(client, d, before=b).status_code == 200
+    assert _order() == [d, b, c, a]
+
+def test_bad_moves(client, feed):
+    a, b, c, d = feed
+    assert _move(client, a, after=d, before=b).status_code == 400
+    assert _move(client, a, after=999).status_code == 400
+    assert _move(client, 999, after=a).status_code == 404
+    assert client.put("/api/feed-order/move", json={"id": a, "is_multiopp": False}).status_code == 400
+    assert _order() == feed
+
+def test_repeated_halving_rebalances(app, feed, monkeypatch):
+    a, b, c, d = feed
+    calls = []
+    monkeypatch.setattr(feed_service, "rebalance_feed", lambda: calls.append(1) or rebalance_feed())
+    # keep squeezing an item between a and whatever is right after it
+    for item in [c, d] * 30:
+        after = _order()[0]
+        before = _order()[1] if _order()[1] != item else _order()[2]
+        move_feed_item(OPP, item, after=(OPP, after), before=(OPP, before))
+        db.session.flush()
+    assert calls
+    # every move still landed where asked, and no two items ever share a position
+    assert _order()[:2] == [a, d]
+    positions = [position.position for position in feed_service.ordered_feed_query()]
+    assert positions == sorted(set(positions))
+
+def test_replace_feed_order_keeps_unlisted_items_after(app, feed):
+    a, b, c, d = feed
+    replace_feed_order([(OPP, c), (OPP, 999), (OPP, a)])
+    assert _order() == [c, a, b, d]
+
+def test_deleted_opportunities_leave_the_feed(client, feed):
+    a, b, c, d = feed
+    assert client.delete(f"/api/opps/{b}").status_code == 200
+    assert _order() == [a, c, d]
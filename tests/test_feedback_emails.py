@@ -0,0 +1,39 @@
+import json
+from db import db, User, UserOpportunity
+from services import event_emails
+from services.event_emails import send_form_emails
+
+def _volunteers(opp, count, registered=True):
+    users = [User(name=f"Volunteer {i} Smith", email=f"v{i}@example.com", phone="555-0100") for i in range(count)]
+    db.session.add_all(users)
+    db.session.flush()
+    db.session.add_all(UserOpportunity(user_id=user.id, opportunity_id=opp.id, registered=registered) for user in users)
+    db.session.commit()
+    return users
+
+def test_feedback_goes_out_in_batches(app, make_opp, mailgun_api, monkeypatch):
+    monkeypatch.setattr(event_emails, "MAILGUN_BATCH_LIMIT", 2)
+    opp = make_opp()
+    _volunteers(opp, 3)
+
+    assert send_form_emails(opp.id) == {"emails_sent": 3, "failed_recipients": []}
+    assert [batch["to"] for batch in mailgun_api.requests] == [["v0@example.com", "v1@example.com"], ["v2@example.com"]]
+    variables = json.loads(mailgun_api.requests[0]["recipient-variables"])
+    assert variables["v1@example.com"] == {"first_name": "Volunteer", "name": "Volunteer 1 Smith"}
+    # one render, personalised by Mailgun
+    assert "%recipient.first_name%" in mailgun_api.requests[0]["text"]
+    assert mailgun_api.requests[0]["html"] == mailgun_api.requests[1]["html"]
+
+def test_failed_batch_reports_its_recipients(app, make_opp, mailgun_api, monkeypatch):
+    monkeypatch.setattr(event_emails, "MAILGUN_BATCH_LIMIT", 2)
+    opp = make_opp()
+    _volunteers(opp, 3)
+    mailgun_api.failing = {"v2@example.com"}
+
+    assert send_form_emails(opp.id) == {"emails_sent": 2, "failed_recipients": ["v2@example.com"]}
+
+def test_only_registered_volunteers_get_the_form(app, make_opp, mailgun_api):
+    opp = make_opp()
+    _volunteers(opp, 2, registered=False)
+    assert send_form_emails(opp.id) == {"emails_sent": 0, "failed_recipients": []}
+    assert mailgun_api.requests == []
@@ -0,0 +1,49 @@
+from db import db, opportunity_cause, opportunity_tag
+from services.opportunity_filters import _values, sync_opportunity_filters
+
+def _names(client, **args):
+    response = client.get("/api/opps/current", query_string=args)
+    assert response.status_code == 200
+    return sorted(opp["name"] for opp in response.get_json()["opportunities"])
+
+def test_values_normalizes_stored_forms():
+    assert _values(None) == []
+    assert _values(["Hunger", " Hunger ", "Education"]) == ["Hunger", "Education"]
+    assert _values('["Hunger", "Education"]') == ["Hunger", "Education"]
+    assert _values("Hunger, Education,") == ["Hunger", "Education"]
+
+def test_cause_and_tag_filters(client, make_opp):
+    opps = [
+        make_opp(name="pantry", causes=["Hunger"], tags=["indoors"]),
+        make_opp(name="garden", causes=["Hunger", "Environment"], tags=["outdoors"]),
+        make_opp(name="tutoring", causes=["Education"], tags='["indoors"]'),
+    ]
+    sync_opportunity_filters(opps)
+    db.session.commit()
+
+    assert _names(client, cause="Hunger") == ["garden", "pantry"]
+    assert _names(client, cause="Hunger,Environment") == ["garden"]
+    assert _names(client, cause=["Hunger", "Education"], match="any") == ["garden", "pantry", "tutoring"]
+    assert _names(client, cause="Hunger", tag="indoors") == ["pantry"]
+    assert _names(client, tag="indoors") == ["pantry", "tutoring"]
+    assert _names(client, cause="Nothing") == []
+
+def test_sync_rewrites_an_opportunitys_rows(app, make_opp):
+    opp = make_opp(causes=["Hunger"], tags=["indoors"])
+    sync_opportunity_filters([opp])
+    opp.causes, opp.tags = ["Education"], []
+    sync_opportunity_filters([opp])
+    db.session.commit()
+
+    assert db.session.execute(db.select(opportunity_cause.c.cause)).scalars().all() == ["Education"]
+    assert db.session.execute(db.select(opportunity_tag)).all() == []
+
+def test_edits_through_the_api_keep_filters_current(client, make_opp):
+    opp = make_opp(name="pantry", tags=["indoors"])
+    sync_opportunity_filters([opp])
+    db.session.commit()
+
+    response = client.put(f"/api/opps/{opp.id}", json={"tags": ["outdoors"]})
+    assert response.status_code == 200, response.get_json()
+    assert _names(client, tag="indoors") == []
+    assert _names(client, tag="outdoors") == ["pantry"]
@@ -0,0 +1,38 @@
+import threading
+import time
+from utils import http_client
+
+def test_requests_get_the_default_timeout(monkeypatch):
+    calls = []
+    monkeypatch.setattr(http_client._session, "request", lambda method, url, **kwargs: calls.append((method, url, kwargs)))
+    http_client.post("https://api.mailgun.net/v3/x/messages", data={})
+    http_client.get("https://example.com", timeout=1)
+    assert calls[0][:2] == ("POST", "https://api.mailgun.net/v3/x/messages")
+    assert calls[0][2]["timeout"] == http_client.HTTP_TIMEOUT
+    assert calls[1][2]["timeout"] == 1
+
+def test_posts_are_not_retried_once_sent():
+    retry = http_client._adapter.max_retries
+    assert "POST" not in retry.allowed_methods
+    assert retry.read == 0
+
+def test_concurrency_is_capped_per_host(monkeypatch):
+    monkeypatch.setitem(http_client.HOST_CONCURRENCY, "capped.example", 2)
+    monkeypatch.setattr(http_client, "_host_limits", {})
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def request(method, url, **kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    monkeypatch.setattr(http_client._session, "request", request)
+    threads = [threading.Thread(target=http_client.post, args=("https://capped.example/send",)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
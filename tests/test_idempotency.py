@@ -0,0 +1,53 @@
+import io
+from db import db, Opportunity, UserOpportunity, IdempotencyKey
+
+def _register(client, key, body):
+    return client.post("/api/register-opp", json=body, headers={"Idempotency-Key": key})
+
+def test_replay_returns_the_stored_response(client, make_opp, user):
+    opp_id = make_opp(total_slots=5, registered_count=0).id
+    body = {"user_id": user.id, "opportunity_id": opp_id}
+
+    first = _register(client, "k1", body)
+    assert first.status_code == 201
+    # the same request with its keys reordered is the same request
+    replay = client.post(
+        "/api/register-opp", data='{"user_id": %d, "opportunity_id": %d}' % (user.id, opp_id),
+        content_type="application/json", headers={"Idempotency-Key": "k1"}
+    )
+    assert replay.status_code == 201
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.get_json() == first.get_json()
+    assert db.session.get(Opportunity, opp_id).registered_count == 1
+
+def test_same_key_with_a_different_body_is_a_422(client, make_opp, user):
+    opp_id = make_opp().id
+    _register(client, "k1", {"user_id": user.id, "opportunity_id": opp_id})
+    response = _register(client, "k1", {"user_id": user.id, "opportunity_id": opp_id, "driving": True})
+    assert response.status_code == 422
+
+def test_server_errors_are_not_stored(client, user):
+    # an id that isn't an int breaks the slot UPDATE and the view answers 500
+    response = _register(client, "k1", {"user_id": user.id, "opportunity_id": {"id": 1}})
+    assert response.status_code == 500
+    assert db.session.get(IdempotencyKey, ("opps.register_user_for_opportunity:testuser", "k1")) is None
+
+def test_multipart_retry_with_a_new_boundary_replays(client, user, org):
+    def create():
+        form = {
+            "name": "Beach cleanup", "host_org_id": str(org.id), "host_user_id": str(user.id),
+            "date": "2026-11-02T09:00", "duration": "60", "address": "somewhere", "allow_carpool": "false",
+            "image_file": (io.BytesIO(b"not really a png"), "photo.png"),
+        }
+        # each multipart body gets a fresh random boundary, as a browser retry would
+        return client.post(
+            "/api/opps", data=form, content_type="multipart/form-data",
+            headers={"Idempotency-Key": "create-1"}
+        )
+
+    first = create()
+    assert first.status_code == 201, first.get_json()
+    second = create()
+    assert second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert Opportunity.query.count() == 1
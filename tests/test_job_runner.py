@@ -0,0 +1,90 @@
+import datetime
+import pytest
+from db import db, ScheduledJob
+from scheduler import schedule_form_email, schedule_carpool_email, cancel_scheduled_email, CARPOOL_EMAIL_LEAD_HOURS
+from services import job_runner
+from services.job_runner import run_due_jobs
+
+NOW = datetime.datetime.utcnow
+
+@pytest.fixture
+def handlers(monkeypatch):
+    calls = []
+    outcomes = {}
+
+    def handler(opportunity_id):
+        calls.append(opportunity_id)
+        outcome = outcomes.get(opportunity_id)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return {"emails_sent": 1}
+
+    monkeypatch.setitem(job_runner.JOB_HANDLERS, ScheduledJob.FORM_EMAIL, handler)
+    handler.calls, handler.outcomes = calls, outcomes
+    return handler
+
+def _job(opportunity_id, kind=ScheduledJob.FORM_EMAIL):
+    db.session.expire_all()
+    return ScheduledJob.query.filter_by(opportunity_id=opportunity_id, kind=kind).one()
+
+def test_only_due_jobs_run(app, make_opp, handlers):
+    due, later = make_opp().id, make_opp().id
+    schedule_form_email(due, NOW() - datetime.timedelta(minutes=1))
+    schedule_form_email(later, NOW() + datetime.timedelta(hours=1))
+    db.session.commit()
+
+    assert run_due_jobs() == 1
+    assert handlers.calls == [due]
+    assert (_job(due).status, _job(due).result, _job(due).attempts) == (ScheduledJob.DONE, {"emails_sent": 1}, 1)
+    assert _job(later).status == ScheduledJob.PENDING
+    # done jobs don't run again
+    assert run_due_jobs() == 0
+
+def test_failures_retry_then_fail(app, make_opp, handlers, monkeypatch):
+    monkeypatch.setattr(job_runner, "JOB_MAX_ATTEMPTS", 2)
+    opp_id = make_opp().id
+    handlers.outcomes[opp_id] = RuntimeError("mailgun down")
+    schedule_form_email(opp_id, NOW() - datetime.timedelta(minutes=1))
+    db.session.commit()
+
+    run_due_jobs()
+    job = _job(opp_id)
+    assert (job.status, job.attempts, job.last_error) == (ScheduledJob.PENDING, 1, "mailgun down")
+    assert job.run_at > NOW()
+
+    job.run_at = NOW() - datetime.timedelta(seconds=1)
+    db.session.commit()
+    run_due_jobs()
+    assert (_job(opp_id).status, _job(opp_id).attempts) == (ScheduledJob.FAILED, 2)
+
+def test_missing_opportunity_is_skipped_not_retried(app, make_opp, handlers):
+    opp_id = make_opp().id
+    handlers.outcomes[opp_id] = LookupError("Opportunity not found")
+    schedule_form_email(opp_id, NOW() - datetime.timedelta(minutes=1))
+    db.session.commit()
+
+    run_due_jobs()
+    assert (_job(opp_id).status, _job(opp_id).result) == (ScheduledJob.DONE, {"skipped": "Opportunity not found"})
+
+def test_stale_running_jobs_are_picked_up_again(app, make_opp, handlers):
+    opp_id = make_opp().id
+    job = schedule_form_email(opp_id, NOW() - datetime.timedelta(hours=2))
+    job.status = ScheduledJob.RUNNING
+    job.locked_at = NOW() - datetime.timedelta(seconds=job_runner.JOB_LOCK_SECONDS + 1)
+    db.session.commit()
+
+    assert run_due_jobs() == 1
+    assert _job(opp_id).status == ScheduledJob.DONE
+
+def test_rescheduling_and_cancelling(app, make_opp):
+    opp_id = make_opp().id
+    event = NOW() + datetime.timedelta(days=2)
+    schedule_carpool_email(opp_id, event)
+    schedule_carpool_email(opp_id, event + datetime.timedelta(hours=1))
+    db.session.commit()
+    job = _job(opp_id, ScheduledJob.CARPOOL_EMAIL)
+    assert job.run_at == event + datetime.timedelta(hours=1) - datetime.timedelta(hours=CARPOOL_EMAIL_LEAD_HOURS)
+
+    assert cancel_scheduled_email(opp_id) == 1
+    db.session.commit()
+    assert ScheduledJob.query.count() == 0
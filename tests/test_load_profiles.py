@@ -0,0 +1,47 @@
+from db import db, User, Opportunity, UserOpportunity, Carpool, opportunity_load_options
+
+def _opps_with_volunteers(make_opp, count):
+    volunteers = [User(name=f"Volunteer {i}", email=f"v{i}@example.com", phone="555-0100") for i in range(3)]
+    db.session.add_all(volunteers)
+    for _ in range(count):
+        opp = make_opp(allow_carpool=True)
+        db.session.add(Carpool(opportunity_id=opp.id))
+        db.session.add_all(UserOpportunity(user_id=user.id, opportunity_id=opp.id, registered=True) for user in volunteers)
+    db.session.commit()
+    db.session.expunge_all()
+
+def _serialize_list(count_queries):
+    with count_queries() as statements:
+        opps = Opportunity.query.options(*opportunity_load_options("list")).all()
+        serialized = [opp.serialize() for opp in opps]
+    db.session.expunge_all()
+    return serialized, len(statements)
+
+def test_list_profile_query_count_does_not_grow_with_rows(app, make_opp, count_queries):
+    _opps_with_volunteers(make_opp, 2)
+    few, few_queries = _serialize_list(count_queries)
+    _opps_with_volunteers(make_opp, 8)
+    many, many_queries = _serialize_list(count_queries)
+
+    assert len(few) == 2 and len(many) == 10
+    assert many_queries == few_queries
+    assert all(len(opp["involved_users"]) == 3 and opp["carpool_id"] for opp in many)
+
+def test_lazy_loading_serializes_the_same(app, make_opp):
+    _opps_with_volunteers(make_opp, 2)
+    eager = [opp.serialize() for opp in Opportunity.query.options(*opportunity_load_options("list"))]
+    db.session.expunge_all()
+    lazy = [opp.serialize() for opp in Opportunity.query]
+    assert eager == lazy
+
+def test_detail_profile_is_one_query(client, make_opp, count_queries):
+    _opps_with_volunteers(make_opp, 1)
+    opp_id = Opportunity.query.one().id
+    db.session.expunge_all()
+
+    with count_queries() as statements:
+        opp = Opportunity.query.options(*opportunity_load_options("detail")).filter_by(id=opp_id).one()
+        serialized = opp.serialize()
+    assert len(statements) == 1
+    assert len(serialized["involved_users"]) == 3
+    assert client.get(f"/api/opps/{opp_id}").get_json()["involved_users"] == serialized["involved_users"]
@@ -0,0 +1,62 @@
+import datetime
+import pytest
+from db import db, User, MultiOpportunity, Opportunity, UserOpportunity, OutboundMessage
+from services.recurrence import materialize_series
+
+@pytest.fixture
+def occurrence_ids(app, user, org):
+    multiopp = MultiOpportunity(
+        name="weekly", address="somewhere", host_org_id=org.id, host_user_id=user.id, total_slots=1,
+        start_date=datetime.datetime.utcnow() + datetime.timedelta(days=1),
+        days_of_week=[{"Monday": ["09:00"]}], week_recurrences=3
+    )
+    db.session.add(multiopp)
+    db.session.flush()
+    ids = [opp.id for opp in materialize_series(multiopp)]
+    db.session.commit()
+    return multiopp.id, ids
+
+@pytest.fixture
+def volunteer(app):
+    volunteer = User(name="Volunteer", email="v@example.com", phone="555-0100")
+    db.session.add(volunteer)
+    db.session.commit()
+    return volunteer.id
+
+def _register(client, multiopp_id, user_id, opportunity_ids):
+    return client.post(f"/api/multiopps/{multiopp_id}/register", json={"user_id": user_id, "opportunity_ids": opportunity_ids})
+
+def test_registers_for_every_selected_occurrence(client, occurrence_ids, volunteer):
+    multiopp_id, ids = occurrence_ids
+    response = _register(client, multiopp_id, volunteer, ids[:2])
+    assert response.status_code == 201
+    assert sorted(response.get_json()["registered"]) == ids[:2]
+    assert [db.session.get(Opportunity, opp_id).registered_count for opp_id in ids] == [1, 1, 0]
+
+    invites = OutboundMessage.query.all()
+    assert len(invites) == 1
+    assert invites[0].payload["attachments"][0][1].count("BEGIN:VEVENT") == 2
+
+    # only the new occurrence is registered on a repeat
+    again = _register(client, multiopp_id, volunteer, ids)
+    assert again.status_code == 201 and again.get_json()["registered"] == [ids[2]]
+
+def test_one_full_occurrence_registers_nothing(client, occurrence_ids, volunteer, user):
+    multiopp_id, ids = occurrence_ids
+    assert _register(client, multiopp_id, user.id, [ids[1]]).status_code == 201
+
+    response = _register(client, multiopp_id, volunteer, ids)
+    assert response.status_code == 409
+    assert response.get_json()["opportunity_ids"] == [ids[1]]
+    assert UserOpportunity.query.filter_by(user_id=volunteer).count() == 0
+    assert [db.session.get(Opportunity, opp_id).registered_count for opp_id in ids] == [0, 1, 0]
+
+def test_rejects_bad_requests(client, occurrence_ids, volunteer, make_opp):
+    multiopp_id, ids = occurrence_ids
+    assert _register(client, multiopp_id, volunteer, []).status_code == 400
+    assert _register(client, multiopp_id, volunteer, ["x"]).status_code == 400
+    assert _register(client, 999, volunteer, ids).status_code == 404
+    assert _register(client, multiopp_id, 999, ids).status_code == 404
+    other = make_opp().id
+    response = _register(client, multiopp_id, volunteer, [ids[0], other])
+    assert response.status_code == 404 and response.get_json()["opportunity_ids"] == [other]
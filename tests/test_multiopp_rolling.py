@@ -0,0 +1,90 @@
+import datetime
+from db import db, MultiOpportunity, Opportunity, Carpool
+from services.recurrence import (
+    series_week_recurrences, materialize_due_series, virtual_occurrences, horizon_end, DEFAULT_WEEK_RECURRENCES
+)
+
+def _create_series(client, user, org, **fields):
+    body = {
+        "name": "weekly", "address": "somewhere", "host_org_id": org.id, "host_user_id": user.id,
+        "start_date": "2026-11-02T00:00:00", "days_of_week": [{"Monday": ["09:00"]}],
+        "week_recurrences": 2,
+    }
+    body.update(fields)
+    response = client.post("/api/multiopps", json=body)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()["multiopp"]["id"]
+
+def test_series_week_recurrences():
+    assert series_week_recurrences(None, rolling=True) is None
+    assert series_week_recurrences(None, rolling=False) == DEFAULT_WEEK_RECURRENCES
+    assert series_week_recurrences(12, rolling=True) == 12
+
+def test_rolling_series_persists_null_week_recurrences(app):
+    multiopp = MultiOpportunity(
+        name="rolling", address="somewhere", start_date=datetime.datetime(2026, 11, 2),
+        days_of_week=[{"Monday": ["09:00"]}], rolling=True,
+        week_recurrences=series_week_recurrences(None, rolling=True)
+    )
+    db.session.add(multiopp)
+    db.session.commit()
+    multiopp_id = multiopp.id
+    db.session.expunge_all()
+
+    assert db.session.get(MultiOpportunity, multiopp_id).week_recurrences is None
+
+def _this_monday():
+    today = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return (today - datetime.timedelta(days=today.weekday())).isoformat()
+
+def test_rolling_series_materializes_up_to_the_horizon(client, user, org):
+    multiopp_id = _create_series(client, user, org, start_date=_this_monday(), rolling=True, week_recurrences=None)
+
+    multiopp = db.session.get(MultiOpportunity, multiopp_id)
+    dates = [opp.date for opp in Opportunity.query.filter_by(multiopp_id=multiopp_id)]
+    assert multiopp.materialized_until is not None
+    assert dates and max(dates) < multiopp.materialized_until
+
+    # the rest of the series is listed, but not stored
+    response = client.get(f"/api/multiopps/{multiopp_id}?virtual_weeks=12")
+    assert len(response.get_json()["virtual_occurrences"]) == 4
+    assert all(occurrence["date"] >= multiopp.materialized_until for occurrence in virtual_occurrences(multiopp, horizon_end() + datetime.timedelta(weeks=4)))
+
+def test_materialize_due_series_extends_each_series_once(client, user, org):
+    multiopp_id = _create_series(client, user, org, start_date=_this_monday(), rolling=True, week_recurrences=None)
+    materialized = Opportunity.query.filter_by(multiopp_id=multiopp_id).count()
+    later = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(weeks=2)
+
+    assert materialize_due_series(later) == 2
+    # already claimed up to the same horizon
+    assert materialize_due_series(later) == 0
+    assert Opportunity.query.filter_by(multiopp_id=multiopp_id).count() == materialized + 2
+    assert db.session.get(MultiOpportunity, multiopp_id).materialized_until == horizon_end(later).replace(tzinfo=None)
+
+def test_materialize_due_series_skips_finished_series(client, user, org):
+    multiopp_id = _create_series(client, user, org, start_date=_this_monday(), rolling=True, week_recurrences=2)
+    later = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(weeks=20)
+
+    assert materialize_due_series(later) == 0
+    assert Opportunity.query.filter_by(multiopp_id=multiopp_id).count() == 2
+
+def test_update_without_allow_carpool_leaves_it_off(client, user, org):
+    multiopp_id = _create_series(client, user, org)
+
+    assert client.put(f"/api/multiopps/{multiopp_id}", json={"name": "renamed"}).status_code == 200
+    # a form body sends booleans as strings
+    assert client.put(f"/api/multiopps/{multiopp_id}", data={"allow_carpool": "false"}).status_code == 200
+
+    assert not db.session.get(MultiOpportunity, multiopp_id).allow_carpool
+    assert [opp.allow_carpool for opp in Opportunity.query.filter_by(multiopp_id=multiopp_id)] == [False, False]
+    assert Carpool.query.count() == 0
+
+def test_update_turns_on_carpool_for_every_occurrence(client, user, org):
+    multiopp_id = _create_series(client, user, org)
+
+    assert client.put(f"/api/multiopps/{multiopp_id}", data={"allow_carpool": "true"}).status_code == 200
+
+    assert db.session.get(MultiOpportunity, multiopp_id).allow_carpool
+    opp_ids = [opp.id for opp in Opportunity.query.filter_by(multiopp_id=multiopp_id, allow_carpool=True)]
+    assert len(opp_ids) == 2
+    assert sorted(carpool.opportunity_id for carpool in Carpool.query) == sorted(opp_ids)
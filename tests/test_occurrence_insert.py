@@ -0,0 +1,49 @@
+import datetime
+from sqlalchemy import event
+from db import db, MultiOpportunity
+from services.recurrence import expand_occurrences, occurrence_rows, insert_occurrences
+
+def _series(user, org):
+    multiopp = MultiOpportunity(
+        name="Series", description="weekly", address="somewhere", host_org_id=org.id, host_user_id=user.id,
+        total_slots=5, allow_carpool=True, tags=["outdoors"],
+        start_date=datetime.datetime(2026, 11, 2), days_of_week=[{"Monday": ["09:00"], "Wednesday": [["18:30", 45]]}],
+        week_recurrences=6
+    )
+    db.session.add(multiopp)
+    db.session.flush()
+    return multiopp
+
+def test_series_is_inserted_in_one_execution(app, user, org):
+    multiopp = _series(user, org)
+    occurrences = expand_occurrences(multiopp.start_date, multiopp.days_of_week, multiopp.week_recurrences)
+
+    executions = []
+    def record(conn, clauseelement, *args):
+        executions.append(clauseelement)
+    event.listen(db.engine, "before_execute", record)
+    try:
+        opps = insert_occurrences(occurrence_rows(multiopp, occurrences))
+    finally:
+        event.remove(db.engine, "before_execute", record)
+
+    assert len(executions) == 1
+    assert len(opps) == 12
+    assert all(opp.id is not None for opp in opps)
+    # returned in the order the rows were given
+    assert [(opp.date, opp.duration) for opp in opps] == [(date.replace(tzinfo=None), duration) for date, duration in occurrences]
+
+def test_rows_copy_the_series(app, user, org):
+    multiopp = _series(user, org)
+    opp, = insert_occurrences(occurrence_rows(multiopp, [(datetime.datetime(2026, 11, 2, 14), 45)]))
+    db.session.commit()
+
+    assert (opp.name, opp.description, opp.address, opp.tags) == ("Series", "weekly", "somewhere", ["outdoors"])
+    assert (opp.host_org_id, opp.host_user_id, opp.multiopp_id) == (org.id, user.id, multiopp.id)
+    assert (opp.total_slots, opp.allow_carpool, opp.recurring) == (5, True, "recurring")
+    assert (opp.registered_count, opp.attended_count, opp.attendance_marked) == (0, 0, False)
+
+def test_no_rows_inserts_nothing(app, count_queries):
+    with count_queries() as statements:
+        assert insert_occurrences([]) == []
+    assert statements == []
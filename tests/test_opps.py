@@ -0,0 +1,27 @@
+from db import db, Opportunity, OutboundMessage, UserOpportunity
+
+def _form(user, org, **fields):
+    form = {
+        "name": "Beach cleanup", "host_org_id": str(org.id), "host_user_id": str(user.id),
+        "date": "2026-11-02T09:00", "duration": "90", "total_slots": "5",
+        "address": "somewhere", "allow_carpool": "false", "visibility": "[]",
+    }
+    form.update(fields)
+    return form
+
+def test_multipart_create_queues_invite(client, user, org):
+    response = client.post("/api/opps", data=_form(user, org), content_type="multipart/form-data")
+    assert response.status_code == 201, response.get_json()
+
+    opp = db.session.get(Opportunity, response.get_json()["id"])
+    assert opp.duration == 90
+    assert opp.total_slots == 5
+    assert opp.registered_count == 1
+    assert UserOpportunity.query.filter_by(opportunity_id=opp.id, user_id=user.id).one().registered
+    invite = OutboundMessage.query.filter(OutboundMessage.payload["data"]["subject"].as_string() == "Invitation: Beach cleanup").one()
+    assert "DTEND:20261102T153000Z" in invite.payload["attachments"][0][1]
+
+def test_multipart_create_rejects_bad_duration(client, user, org):
+    response = client.post("/api/opps", data=_form(user, org, duration="an hour"), content_type="multipart/form-data")
+    assert response.status_code == 400
+    assert Opportunity.query.count() == 0
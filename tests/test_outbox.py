@@ -0,0 +1,62 @@
+import datetime
+import pytest
+from db import db, OutboundMessage
+from services import outbox
+from services.outbox import enqueue_email, drain_outbox
+
+class FakeMailgun:
+    def __init__(self):
+        self.delivered = []
+        self.down = False
+
+    def deliver(self, payload):
+        if self.down:
+            raise RuntimeError("mailgun down")
+        self.delivered.append(payload)
+
+@pytest.fixture
+def mailgun(app, monkeypatch):
+    fake = FakeMailgun()
+    monkeypatch.setattr(outbox, "deliver", fake.deliver)
+    return fake
+
+def _make_due(message):
+    message.next_attempt_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+    db.session.commit()
+
+def test_failed_delivery_is_retried_with_backoff(mailgun):
+    message = enqueue_email(to=["a@example.com"], subject="hi", text="hello")
+    db.session.commit()
+
+    mailgun.down = True
+    assert drain_outbox() == (0, 1)
+    assert message.status == OutboundMessage.PENDING
+    assert message.attempts == 1
+    assert message.last_error == "mailgun down"
+    assert message.next_attempt_at > datetime.datetime.utcnow()
+
+    # backing off: not due yet even once mailgun is back
+    mailgun.down = False
+    assert drain_outbox() == (0, 0)
+
+    _make_due(message)
+    assert drain_outbox() == (1, 0)
+    assert message.status == OutboundMessage.SENT
+    assert message.attempts == 2
+    assert [payload["data"]["subject"] for payload in mailgun.delivered] == ["hi"]
+
+def test_message_is_dead_after_max_attempts(mailgun, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 2)
+    message = enqueue_email(to=["a@example.com"], subject="hi", text="hello")
+    db.session.commit()
+
+    mailgun.down = True
+    drain_outbox()
+    _make_due(message)
+    drain_outbox()
+    assert message.status == OutboundMessage.DEAD
+
+    mailgun.down = False
+    _make_due(message)
+    assert drain_outbox() == (0, 0)
+    assert mailgun.delivered == []
@@ -0,0 +1,69 @@
+import datetime
+import pytest
+from db import db, Opportunity
+from utils.helper import PaginationError, decode_cursor, encode_cursor, page_size, MAX_PAGE_SIZE
+
+def _pages(client, url, key, **args):
+    pages, cursor = [], None
+    while True:
+        query = dict(args, cursor=cursor) if cursor else args
+        response = client.get(url, query_string=query)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        pages.append([item["id"] for item in body[key]])
+        cursor = body["pagination"]["next_cursor"]
+        if not body["pagination"]["has_more"]:
+            assert cursor is None
+            return pages
+
+def test_cursor_round_trip():
+    when = datetime.datetime(2026, 11, 2, 9, 30)
+    cursor = encode_cursor([when, 7])
+    assert decode_cursor(cursor, [(Opportunity.date, "asc"), (Opportunity.id, "asc")]) == [when, 7]
+
+def test_page_size_is_clamped():
+    assert page_size(None) == page_size("")
+    assert page_size("0") == 1
+    assert page_size(str(MAX_PAGE_SIZE + 1)) == MAX_PAGE_SIZE
+    with pytest.raises(PaginationError):
+        page_size("ten")
+
+def test_streamed_list_walks_every_row_once(client, make_opp):
+    ids = [make_opp(name=f"opp {i}").id for i in range(5)]
+
+    pages = _pages(client, "/api/opps", "opportunities", limit=2)
+    assert pages == [sorted(ids, reverse=True)[i:i + 2] for i in range(0, 5, 2)]
+
+def test_keyset_list_orders_by_date_then_id(client, make_opp):
+    base = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+    # two share a date, so the id breaks the tie across a page boundary
+    opps = [make_opp(date=base + datetime.timedelta(hours=hours)) for hours in (2, 1, 1, 0)]
+
+    pages = _pages(client, "/api/opps/current", "opportunities", limit=2, include_total="true")
+    assert sum(pages, []) == [opps[3].id, opps[1].id, opps[2].id, opps[0].id]
+
+def test_keyset_page_ignores_rows_inserted_before_the_cursor(client, make_opp):
+    first = [make_opp().id for _ in range(3)]
+    response = client.get("/api/opps/approved", query_string={"limit": 2})
+    cursor = response.get_json()["pagination"]["next_cursor"]
+
+    make_opp()
+    second = client.get("/api/opps/approved", query_string={"limit": 2, "cursor": cursor}).get_json()
+    assert [opp["id"] for opp in second["opportunities"]] == [min(first)]
+
+def test_legacy_page_parameters(client, make_opp):
+    ids = [make_opp().id for _ in range(3)]
+    body = client.get("/api/opps/approved", query_string={"page": 2, "per_page": 2}).get_json()
+    assert [opp["id"] for opp in body["opportunities"]] == [min(ids)]
+    assert body["pagination"] == {"page": 2, "per_page": 2, "total": 3}
+
+@pytest.mark.parametrize("url", ["/api/opps", "/api/opps/current", "/api/opps/approved", "/api/orgs", "/api/users"])
+@pytest.mark.parametrize("args", [{"cursor": "not-a-cursor"}, {"cursor": encode_cursor([1, 2, 3])}, {"limit": "lots"}, {"page": "x"}])
+def test_bad_pagination_is_a_400(client, url, args):
+    response = client.get(url, query_string=args)
+    assert response.status_code == 400
+    assert response.get_json()["message"]
+
+def test_bad_search_cursor_is_a_400(client):
+    response = client.get("/api/opps/search", query_string={"q": "garden", "cursor": "%%%"})
+    assert response.status_code == 400
@@ -0,0 +1,49 @@
+from db import db, Opportunity
+from services.opportunity_filters import sync_opportunity_filters
+from utils.cache import OPPS_CACHE, invalidate_cache
+
+def _current(client):
+    response = client.get("/api/opps/current")
+    assert response.status_code == 200
+    return [opp["name"] for opp in response.get_json()["opportunities"]]
+
+def test_current_feed_is_served_from_cache(client, make_opp, count_queries):
+    make_opp(name="first")
+    assert _current(client) == ["first"]
+
+    with count_queries() as statements:
+        assert _current(client) == ["first"]
+    # only the ETag's table_version lookup
+    assert len(statements) == 1
+
+def test_invalidate_drops_cached_responses(client, make_opp, monkeypatch):
+    opp = make_opp(name="first")
+    assert _current(client) == ["first"]
+
+    # a write the table versions can't see: only invalidate_cache reveals it
+    monkeypatch.setattr("utils.cache._etag_for", lambda tables, max_age: "fixed")
+    _current(client)
+    db.session.execute(db.text("UPDATE opportunity SET name = 'renamed' WHERE id = :id"), {"id": opp.id})
+    db.session.commit()
+    assert _current(client) == ["first"]
+    invalidate_cache(OPPS_CACHE)
+    assert _current(client) == ["renamed"]
+
+def test_writes_that_skip_invalidation_still_show(client, make_opp):
+    opp = make_opp(name="first")
+    assert _current(client) == ["first"]
+
+    # e.g. the job runner: an ORM commit bumps the table version, which is part of the key
+    opp.name = "renamed"
+    db.session.commit()
+    assert _current(client) == ["renamed"]
+
+def test_cache_keys_include_the_query_string(client, make_opp):
+    make_opp(name="garden", causes=["Environment"], tags=[])
+    make_opp(name="tutoring", causes=["Education"], tags=[])
+    sync_opportunity_filters(Opportunity.query.all())
+    db.session.commit()
+
+    assert sorted(_current(client)) == ["garden", "tutoring"]
+    response = client.get("/api/opps/current", query_string={"cause": "Education"})
+    assert [opp["name"] for opp in response.get_json()["opportunities"]] == ["tutoring"]
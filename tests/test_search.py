@@ -0,0 +1,46 @@
+from db import db
+from services.search_service import index_opportunities, rebuild_search_index
+
+def _search(client, q, **args):
+    response = client.get("/api/opps/search", query_string=dict(q=q, **args))
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def _names(body):
+    return [opp["name"] for opp in body["opportunities"]]
+
+def test_search_ranks_name_matches_first(client, make_opp):
+    make_opp(name="Tutoring", description="help with garden homework")
+    make_opp(name="Community garden", description="planting")
+    make_opp(name="Food bank", description="sorting cans")
+    rebuild_search_index()
+
+    assert _names(_search(client, "garden")) == ["Community garden", "Tutoring"]
+    assert _names(_search(client, "gardening")) == ["Community garden", "Tutoring"]
+    assert _search(client, "zebra")["opportunities"] == []
+
+def test_search_indexes_string_encoded_tags(client, make_opp):
+    # what a multipart create stores
+    opp = make_opp(name="Saturday shift", tags='["animals", "outdoors"]', causes="Hunger,Environment")
+    index_opportunities([opp])
+    db.session.commit()
+
+    assert _names(_search(client, "animals")) == ["Saturday shift"]
+    assert _names(_search(client, "hunger")) == ["Saturday shift"]
+    assert db.session.execute(
+        db.text("SELECT tags, causes FROM opportunity_search WHERE rowid = :id"), {"id": opp.id}
+    ).one() == ("animals outdoors", "Hunger Environment")
+
+def test_search_pages_with_cursor(client, make_opp):
+    for i in range(3):
+        make_opp(name=f"Cleanup {i}")
+    rebuild_search_index()
+
+    first = _search(client, "cleanup", limit=2)
+    assert len(first["opportunities"]) == 2 and first["pagination"]["has_more"]
+    second = _search(client, "cleanup", limit=2, cursor=first["pagination"]["next_cursor"])
+    assert not second["pagination"]["has_more"]
+    assert sorted(_names(first) + _names(second)) == ["Cleanup 0", "Cleanup 1", "Cleanup 2"]
+
+def test_search_requires_query(client):
+    assert client.get("/api/opps/search").status_code == 400
@@ -0,0 +1,42 @@
+import datetime
+from collections import Counter
+from db import db, MultiOpportunity, Opportunity, ScheduledJob, Carpool
+from scheduler import CARPOOL_EMAIL_LEAD_HOURS
+from services.recurrence import materialize_series
+
+def _materialize(user, org, weeks, count_queries):
+    multiopp = MultiOpportunity(
+        name=f"{weeks} weeks", address="somewhere", host_org_id=org.id, host_user_id=user.id, allow_carpool=True,
+        start_date=datetime.datetime(2026, 11, 2), days_of_week=[{"Monday": ["09:00"], "Friday": [["17:00", 90]]}],
+        week_recurrences=weeks
+    )
+    db.session.add(multiopp)
+    db.session.flush()
+    with count_queries() as statements:
+        opps = materialize_series(multiopp)
+    db.session.commit()
+    return opps, Counter(" ".join(statement.split()[:3]) for statement in statements)
+
+def test_statement_count_does_not_grow_with_the_series(app, user, org, count_queries):
+    few, few_statements = _materialize(user, org, 1, count_queries)
+    many, many_statements = _materialize(user, org, 12, count_queries)
+
+    assert (len(few), len(many)) == (2, 24)
+    # SQLite can't order a multi-row INSERT ... RETURNING, so SQLAlchemy sends the
+    # occurrences themselves one row at a time there; everything else is batched
+    del few_statements["INSERT INTO opportunity"], many_statements["INSERT INTO opportunity"]
+    assert few_statements == many_statements
+    assert many_statements["INSERT INTO scheduled_job"] == 2
+    assert many_statements["INSERT INTO carpool"] == 1
+
+def test_every_occurrence_gets_its_jobs_and_carpool(app, user, org, count_queries):
+    opps, _ = _materialize(user, org, 2, count_queries)
+    ids = {opp.id for opp in opps}
+    assert {carpool.opportunity_id for carpool in Carpool.query} == ids
+
+    for opp in Opportunity.query.filter(Opportunity.id.in_(ids)):
+        jobs = {job.kind: job.run_at for job in ScheduledJob.query.filter_by(opportunity_id=opp.id)}
+        assert jobs == {
+            ScheduledJob.FORM_EMAIL: opp.date + datetime.timedelta(minutes=opp.duration),
+            ScheduledJob.CARPOOL_EMAIL: opp.date - datetime.timedelta(hours=CARPOOL_EMAIL_LEAD_HOURS),
+        }
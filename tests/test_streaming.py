@@ -0,0 +1,47 @@
+import json
+from db import db, User, Friendship, Opportunity
+from utils import helper
+from utils.helper import iter_keyset, stream_json_response
+
+def test_list_streams_in_batches(client, make_opp, monkeypatch):
+    monkeypatch.setattr(helper, "STREAM_BATCH_SIZE", 2)
+    ids = [make_opp().id for _ in range(5)]
+
+    response = client.get("/api/opps", query_string={"limit": 4}, buffered=False)
+    assert response.is_streamed
+    body = json.loads(response.get_data())
+    assert [opp["id"] for opp in body["opportunities"]] == sorted(ids, reverse=True)[:4]
+    assert body["pagination"]["has_more"]
+    rest = client.get("/api/opps", query_string={"limit": 4, "cursor": body["pagination"]["next_cursor"]}).get_json()
+    assert [opp["id"] for opp in rest["opportunities"]] == [min(ids)]
+
+def test_iter_keyset_visits_every_row_once(app, make_opp, monkeypatch):
+    monkeypatch.setattr(helper, "STREAM_BATCH_SIZE", 2)
+    ids = [make_opp().id for _ in range(5)]
+    assert [opp.id for opp in iter_keyset(Opportunity.query, [(Opportunity.id, "asc")])] == ids
+    assert [opp.id for opp in iter_keyset(Opportunity.query, [(Opportunity.id, "asc")], after=[ids[1]], limit=2)] == ids[2:4]
+
+def test_stream_json_response_shapes(app):
+    with app.test_request_context():
+        bare = stream_json_response(iter([1, 2]), lambda n: {"n": n})
+        assert json.loads("".join(bare.response)) == [{"n": 1}, {"n": 2}]
+        empty = stream_json_response(iter([]), str, "items", lambda: {"pagination": {"has_more": False}})
+        assert json.loads("".join(empty.response)) == {"items": [], "pagination": {"has_more": False}}
+
+def test_users_list_streams_with_friends(client, user):
+    friend = User(name="Friend", email="friend@example.com", phone="555-0101")
+    db.session.add(friend)
+    db.session.flush()
+    friendship = Friendship(accepted=True)
+    friendship.requester_id, friendship.receiver_id = user.id, friend.id
+    db.session.add(friendship)
+    db.session.commit()
+
+    body = client.get("/api/users").get_json()
+    assert [u["name"] for u in body["users"]] == ["Friend", "Host"]
+    assert body["pagination"]["has_more"] is False
+
+def test_multiopps_stream_as_a_bare_array(client):
+    response = client.get("/api/multiopps")
+    assert response.status_code == 200
+    assert response.get_json() == []
@@ -0,0 +1,58 @@
+import pytest
+from db import db, User, Organization
+from services.opportunity_filters import sync_opportunity_filters
+
+@pytest.fixture
+def viewer(app):
+    # the staging auth bypass signs requests in as test@example.com
+    viewer = User(name="Viewer", email="test@example.com", phone="555-0101")
+    db.session.add(viewer)
+    db.session.commit()
+    return viewer
+
+def _visible(client, user_id):
+    return client.get(f"/api/users/{user_id}/visible-opps")
+
+def _restricted(make_opp, name, *orgs):
+    opp = make_opp(name=name, visibility=[org.id for org in orgs])
+    sync_opportunity_filters([opp])
+    db.session.commit()
+    return opp
+
+def test_lists_public_member_and_hosted_opportunities(client, make_opp, viewer, org):
+    other_org = Organization(name="Other", type="club")
+    db.session.add(other_org)
+    viewer.organizations.append(org)
+    db.session.commit()
+    _restricted(make_opp, "public")
+    _restricted(make_opp, "members", org)
+    _restricted(make_opp, "others", other_org)
+    hosted = _restricted(make_opp, "hosted", other_org)
+    hosted.host_user_id = viewer.id
+    db.session.commit()
+
+    response = _visible(client, viewer.id)
+    assert response.status_code == 200
+    assert sorted(opp["name"] for opp in response.get_json()["opportunities"]) == ["hosted", "members", "public"]
+
+def test_another_users_list_is_forbidden(client, make_opp, viewer, user):
+    assert _visible(client, user.id).status_code == 403
+
+def test_admin_may_list_for_anyone(client, make_opp, viewer, org):
+    viewer.admin = True
+    member = User(name="Member", email="member@example.com", phone="555-0102")
+    member.organizations.append(org)
+    db.session.add(member)
+    db.session.commit()
+    _restricted(make_opp, "members", org)
+    other_org = Organization(name="Other", type="club")
+    db.session.add(other_org)
+    db.session.commit()
+    _restricted(make_opp, "others", other_org)
+
+    response = _visible(client, member.id)
+    assert response.status_code == 200
+    assert [opp["name"] for opp in response.get_json()["opportunities"]] == ["members"]
+
+def test_unknown_caller_is_forbidden(client, user):
+    assert _visible(client, user.id).status_code == 403
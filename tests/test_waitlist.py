@@ -0,0 +1,80 @@
+import pytest
+from db import db, User, Opportunity, UserOpportunity, WaitlistEntry, OutboundMessage
+
+@pytest.fixture
+def volunteers(app):
+    users = [User(name=f"Volunteer {i}", email=f"v{i}@example.com", phone="555-0100") for i in range(4)]
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+def _register(client, user_id, opp_id):
+    return client.post("/api/register-opp", json={"user_id": user_id, "opportunity_id": opp_id})
+
+def _unregister(client, user_id, opp_id):
+    return client.post("/api/unregister-opp", json={"user_id": user_id, "opportunity_id": opp_id})
+
+def _join(client, user_id, opp_id):
+    return client.post(f"/api/opps/{opp_id}/waitlist", json={"user_id": user_id})
+
+def test_full_opportunity_is_a_409(client, make_opp, volunteers):
+    opp_id = make_opp(total_slots=1).id
+    assert _register(client, volunteers[0], opp_id).status_code == 201
+
+    response = _register(client, volunteers[1], opp_id)
+    assert response.status_code == 409
+    assert response.get_json()["full"]
+    assert db.session.get(Opportunity, opp_id).registered_count == 1
+    assert UserOpportunity.query.filter_by(opportunity_id=opp_id).count() == 1
+
+def test_register_for_missing_opportunity_is_a_404(client, volunteers):
+    assert _register(client, volunteers[0], 999).status_code == 404
+
+def test_join_waitlist_only_when_full(client, make_opp, volunteers):
+    opp_id = make_opp(total_slots=1).id
+    assert _join(client, volunteers[0], opp_id).status_code == 409
+
+    _register(client, volunteers[0], opp_id)
+    assert _join(client, volunteers[0], opp_id).get_json() == {"message": "User already registered"}
+    assert _join(client, volunteers[1], opp_id).get_json()["position"] == 1
+    assert _join(client, volunteers[2], opp_id).get_json()["position"] == 2
+    # joining again keeps the original place
+    again = _join(client, volunteers[1], opp_id)
+    assert again.status_code == 200 and again.get_json()["position"] == 1
+
+def test_freed_slots_go_to_the_waitlist_in_order(client, make_opp, volunteers):
+    opp_id = make_opp(total_slots=1).id
+    first, second, third, fourth = volunteers
+    _register(client, first, opp_id)
+    for user_id in (second, third, fourth):
+        assert _join(client, user_id, opp_id).status_code == 201
+    # leaving the queue moves everyone behind up
+    assert client.delete(f"/api/opps/{opp_id}/waitlist/{third}").status_code == 200
+    assert client.get(f"/api/opps/{opp_id}/waitlist/{fourth}").get_json()["position"] == 2
+
+    assert _unregister(client, first, opp_id).status_code == 200
+    registered = [row.user_id for row in UserOpportunity.query.filter_by(opportunity_id=opp_id)]
+    assert registered == [second]
+    assert db.session.get(Opportunity, opp_id).registered_count == 1
+    assert client.get(f"/api/opps/{opp_id}/waitlist/{fourth}").get_json()["position"] == 1
+    invited = [
+        message.payload["data"]["to"] for message in OutboundMessage.query
+        if message.payload["data"]["subject"] == "Invitation: Opp"
+    ]
+    assert invited == [["v0@example.com"], ["v1@example.com"]]
+
+    assert _unregister(client, second, opp_id).status_code == 200
+    assert [row.user_id for row in UserOpportunity.query.filter_by(opportunity_id=opp_id)] == [fourth]
+    assert WaitlistEntry.query.filter(WaitlistEntry.promoted_at.is_(None)).count() == 0
+
+def test_promoted_user_can_rejoin_after_unregistering(client, make_opp, volunteers):
+    opp_id = make_opp(total_slots=1).id
+    first, second, third = volunteers[:3]
+    _register(client, first, opp_id)
+    _join(client, second, opp_id)
+    _unregister(client, first, opp_id)
+    _unregister(client, second, opp_id)
+    _register(client, third, opp_id)
+
+    # second's promoted entry is still stored
+    assert _join(client, second, opp_id).status_code == 201
@@ -3,6 +3,7 @@ from flask import request, jsonify
 import firebase_admin
 from firebase_admin import auth, credentials, initialize_app
 import os
+from db import User
 
 env = os.environ.get("MY_ENV", "production")
 API_SECRET = os.environ["API_SECRET"]
@@ -103,4 +104,11 @@ def require_api_key(f):
             return jsonify({'error': 'Invalid API key'}), 401
         
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+def authenticated_user():
+    """The User behind the verified token in request.user (matched by email), or None"""
+    email = (getattr(request, "user", None) or {}).get("email")
+    if not email:
+        return None
+    return User.query.filter_by(email=email).first()
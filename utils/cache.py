@@ -0,0 +1,154 @@
+"""Server-side response cache and conditional GET support for hot, polled endpoints"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from functools import wraps
+from cachetools import TTLCache
+from flask import g, request, make_response, Response
+from db import table_versions
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", 30))
+RESPONSE_CACHE_MAXSIZE = int(os.environ.get("RESPONSE_CACHE_MAXSIZE", 512))
+# "memory" (in-process LRU with TTL) or "redis" (falls back to memory when REDIS_URL is unset)
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+# every ETag rolls over at least this often, bounding how long a write that bypasses the
+# session hooks (raw SQL, a migration) can be hidden behind 304s
+ETAG_MAX_AGE_SECONDS = int(os.environ.get("ETAG_MAX_AGE_SECONDS", 60 * 60))
+
+# cache namespaces, invalidated as a whole when the underlying data changes
+OPPS_CACHE = "opps"
+
+class MemoryCacheBackend:
+    """In-process LRU cache with a per-entry TTL"""
+    def __init__(self, maxsize=RESPONSE_CACHE_MAXSIZE, ttl=RESPONSE_CACHE_TTL_SECONDS):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+class RedisCacheBackend:
+    """Redis-backed cache, shared between workers and machines"""
+    def __init__(self, client, ttl=RESPONSE_CACHE_TTL_SECONDS):
+        self._client = client
+        self._ttl = ttl
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value):
+        self._client.set(key, value, ex=self._ttl)
+
+    def generation(self, namespace):
+        return int(self._client.get(f"cache-gen:{namespace}") or 0)
+
+    def bump(self, namespace):
+        self._client.incr(f"cache-gen:{namespace}")
+
+def make_cache_backend(kind=RESPONSE_CACHE_BACKEND):
+    redis_url = os.environ.get("REDIS_URL")
+    if kind == "redis" and redis_url:
+        import redis
+        return RedisCacheBackend(redis.Redis.from_url(redis_url))
+    if kind == "redis":
+        logger.warning("RESPONSE_CACHE_BACKEND=redis but REDIS_URL is unset, using in-process cache")
+    return MemoryCacheBackend()
+
+response_cache = make_cache_backend()
+
+def invalidate_cache(namespace):
+    """Drop every cached response in `namespace`. Call after committing a change it depends on."""
+    try:
+        response_cache.bump(namespace)
+    except Exception as e:
+        logger.exception("Failed to invalidate %s cache: %s", namespace, e)
+
+def _cache_key(namespace):
+    args = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    # under etag_response the key carries the same table versions as the ETag, so a
+    # write that skips invalidate_cache (e.g. the job runner) can't leave an old body
+    # behind a new tag
+    etag = g.get("etag", "")
+    return f"resp:{namespace}:{response_cache.generation(namespace)}:{etag}:{request.path}?{args}"
+
+def cached_response(namespace):
+    """
+    Cache successful JSON responses of a GET view, keyed by path and query parameters.
+    Entries expire after RESPONSE_CACHE_TTL_SECONDS or when `namespace` is invalidated.
+    Put it under etag_response, which also keys entries on the ETag's table versions.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                # read the generation before running the view, so a write that lands
+                # mid-request can't leave its stale result under the new generation
+                key = _cache_key(namespace)
+                cached = response_cache.get(key)
+            except Exception as e:
+                logger.exception("Response cache unavailable: %s", e)
+                return f(*args, **kwargs)
+
+            if cached is not None:
+                return Response(cached, status=200, mimetype="application/json")
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and response.mimetype == "application/json":
+                try:
+                    response_cache.set(key, response.get_data())
+                except Exception as e:
+                    logger.exception("Failed to store cached response: %s", e)
+            return response
+        return decorated_function
+    return decorator
+
+def _etag_for(tables, max_age):
+    parts = [request.path, request.query_string.decode()]
+    parts += [f"{table}={version}" for table, version in zip(tables, table_versions(*tables))]
+    # views that filter relative to "now" change without any write, so the tag rolls over
+    parts.append(str(int(time.time() // (max_age or ETAG_MAX_AGE_SECONDS))))
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+
+def etag_response(*tables, max_age=None):
+    """
+    Conditional GET for a view whose output only depends on `tables` (and the query string).
+    The strong ETag comes from the per-table version rows in db.py, so a matching
+    If-None-Match is answered with a 304 after one small query instead of running the view.
+    Pass `max_age` (seconds) for views that also depend on the current time; every tag
+    expires after ETAG_MAX_AGE_SECONDS regardless.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag = _etag_for(tables, max_age)
+            # cached_response below keys on it too
+            g.etag = etag
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return decorated_function
+    return decorator
@@ -1,14 +1,239 @@
 from services.s3_client import s3, S3_BUCKET
 import pytz
+import base64
+import itertools
+import json
+import threading
 from datetime import timedelta, datetime
+from cachetools import TTLCache
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import and_, or_
 
 # File upload configuration
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
+# Pagination configuration
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+TOTAL_COUNT_TTL_SECONDS = 60
+# rows fetched per round trip when streaming a list response
+STREAM_BATCH_SIZE = 200
+
+_total_count_cache = TTLCache(maxsize=256, ttl=TOTAL_COUNT_TTL_SECONDS)
+_total_count_lock = threading.Lock()
+
+class PaginationError(ValueError):
+    """A malformed `limit`, `page`, `per_page` or `cursor`; list endpoints answer it with a 400"""
+
 # Helper function to handle pagination
 def paginate(query, page=1, per_page=20):
     return query.paginate(page=page, per_page=per_page, error_out=False)
 
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a page size query parameter, clamped to [1, MAX_PAGE_SIZE]"""
+    if value in (None, ''):
+        return default
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise PaginationError(f'Invalid page size: {value!r}')
+
+def page_number(value):
+    if value in (None, ''):
+        return 1
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        raise PaginationError(f'Invalid page: {value!r}')
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page into an opaque cursor string"""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, keys=None):
+    """
+    Decode a cursor produced by encode_cursor back into values for `keys`.
+    Without `keys` the raw JSON values are returned as-is.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+    if not isinstance(values, list):
+        raise PaginationError('Invalid cursor')
+    if keys is None:
+        return values
+    if len(values) != len(keys):
+        raise PaginationError('Invalid cursor')
+
+    decoded = []
+    for (column, _), value in zip(keys, values):
+        if value is not None and column.type.python_type is datetime:
+            try:
+                value = datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                raise PaginationError('Invalid cursor')
+        decoded.append(value)
+    return decoded
+
+def keyset_filter(keys, values):
+    """
+    Build the WHERE clause selecting rows strictly after `values` in the order given by
+    `keys`, a list of (column, "asc" | "desc") pairs. Expanded into ORs rather than a row
+    value comparison so mixed directions work on both SQLite and Postgres.
+    """
+    clauses = []
+    for i, (column, direction) in enumerate(keys):
+        after = column < values[i] if direction == 'desc' else column > values[i]
+        ties = [keys[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*ties, after))
+    return or_(*clauses)
+
+def order_by_keys(query, keys):
+    return query.order_by(*[column.desc() if direction == 'desc' else column.asc() for column, direction in keys])
+
+def cached_count(query):
+    """
+    COUNT(*) for `query`, cached for TOTAL_COUNT_TTL_SECONDS. Datetime parameters are
+    bucketed to the minute so "now"-relative filters can share a cached total.
+    """
+    count_query = query.order_by(None)
+    compiled = count_query.statement.compile()
+    params = []
+    for name, value in sorted(compiled.params.items()):
+        if isinstance(value, datetime):
+            value = value.replace(second=0, microsecond=0)
+        params.append((name, repr(value)))
+    key = (str(compiled), tuple(params))
+
+    with _total_count_lock:
+        if key in _total_count_cache:
+            return _total_count_cache[key]
+    total = count_query.count()
+    with _total_count_lock:
+        _total_count_cache[key] = total
+    return total
+
+def paginate_request(query, keys, args):
+    """
+    Paginate a list endpoint, returns (items, pagination).
+
+    Requests that pass `page` keep the legacy OFFSET pagination. Everything else is keyset
+    paginated over `keys` ([(column, "asc" | "desc"), ...], ending in a unique column) using
+    an opaque `cursor` and a `limit`. The total is only counted when `include_total=true`.
+    """
+    if 'page' in args:
+        paginated = paginate(order_by_keys(query, keys), page_number(args.get('page')), page_size(args.get('per_page')))
+        return paginated.items, {
+            'page': paginated.page,
+            'per_page': paginated.per_page,
+            'total': paginated.total
+        }
+
+    limit = page_size(args.get('limit'))
+    page_query = order_by_keys(query, keys)
+    if args.get('cursor'):
+        page_query = page_query.filter(keyset_filter(keys, decode_cursor(args['cursor'], keys)))
+
+    rows = page_query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    pagination = {
+        'limit': limit,
+        'has_more': has_more,
+        'next_cursor': encode_cursor([getattr(rows[-1], column.key) for column, _ in keys]) if has_more else None
+    }
+    if args.get('include_total', '').lower() == 'true':
+        pagination['total'] = cached_count(query)
+    return rows, pagination
+
+def stream_json_response(items, serialize, key=None, trailer=None):
+    """
+    Stream a JSON response one serialized row at a time instead of building the whole
+    list (and then one giant string) in memory. Without `key` the body is a bare array.
+    With `key` it is {key: [...], **trailer()}, where `trailer` is called once the last row
+    has been written, so it can report things only known at the end (like the next cursor).
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        yield '{%s:[' % dumps(key) if key else '['
+        for i, item in enumerate(items):
+            yield (',' if i else '') + dumps(serialize(item))
+        yield ']'
+        if key:
+            for name, value in (trailer() if trailer else {}).items():
+                yield ',%s:%s' % (dumps(name), dumps(value))
+            yield '}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def iter_keyset(query, keys, after=None, limit=None):
+    """
+    Yield rows of `query` in `keys` order, starting after the key values `after`, fetching
+    STREAM_BATCH_SIZE rows per query. Each batch runs the query's eager loads on its own,
+    and nothing holds on to rows already yielded, so memory stays bounded by one batch.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = STREAM_BATCH_SIZE if remaining is None else min(STREAM_BATCH_SIZE, remaining)
+        batch_query = order_by_keys(query, keys)
+        if after is not None:
+            batch_query = batch_query.filter(keyset_filter(keys, after))
+        batch = batch_query.limit(size).all()
+        yield from batch
+        if len(batch) < size:
+            return
+        after = [getattr(batch[-1], column.key) for column, _ in keys]
+        if remaining is not None:
+            remaining -= len(batch)
+
+def stream_paginated(query, keys, args, key, serialize):
+    """
+    Streaming counterpart of paginate_request(): same query parameters and response shape
+    ({key: [...], "pagination": {...}}), but rows are fetched in keyset batches and written
+    out as they arrive, so memory stays flat however large `limit` is.
+    """
+    if 'page' in args:
+        items, pagination = paginate_request(query, keys, args)
+        return stream_json_response(items, serialize, key, lambda: {'pagination': pagination})
+
+    limit = page_size(args.get('limit'))
+    after = decode_cursor(args['cursor'], keys) if args.get('cursor') else None
+
+    # run the first batch before handing off to the stream so errors still surface as a 500
+    rows = iter_keyset(query, keys, after, limit + 1)
+    first = next(rows, None)
+    state = {'last': None, 'has_more': False}
+
+    def page_rows():
+        if first is None:
+            return
+        for count, row in enumerate(itertools.chain([first], rows)):
+            if count == limit:
+                state['has_more'] = True
+                break
+            state['last'] = row
+            yield row
+
+    def trailer():
+        pagination = {
+            'limit': limit,
+            'has_more': state['has_more'],
+            'next_cursor': (
+                encode_cursor([getattr(state['last'], column.key) for column, _ in keys])
+                if state['has_more'] else None
+            )
+        }
+        if args.get('include_total', '').lower() == 'true':
+            pagination['total'] = cached_count(query)
+        return {'pagination': pagination}
+
+    return stream_json_response(page_rows(), serialize, key, trailer)
+
 # Helper functions for file uploads
 def allowed_file(filename):
     return '.' in filename and \
@@ -0,0 +1,71 @@
+"""
+Shared HTTP client for outbound integrations (Mailgun, the Cloudflare scheduling Worker).
+
+One pooled requests.Session per process keeps TLS connections alive between calls, every
+request gets a connect/read timeout unless the caller passes one, idempotent methods are
+retried with backoff on connection errors and 5xx responses, and a per-host semaphore caps
+how many requests run against one provider at a time.
+"""
+import os
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds
+HTTP_TIMEOUT = (
+    float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5)),
+    float(os.environ.get("HTTP_READ_TIMEOUT", 30)),
+)
+# kept-alive connections per host; also the default per-host concurrency cap
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 10))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+# concurrency caps for specific hosts, on top of HTTP_POOL_SIZE
+HOST_CONCURRENCY = {
+    "api.mailgun.net": int(os.environ.get("MAILGUN_CONCURRENCY", HTTP_POOL_SIZE)),
+}
+
+# POSTs are only retried when the connection failed before anything was sent, so an
+# email is never delivered twice because its response was lost
+_retry = Retry(
+    total=HTTP_MAX_RETRIES,
+    connect=HTTP_MAX_RETRIES,
+    read=0,
+    status=HTTP_MAX_RETRIES,
+    backoff_factor=0.5,
+    status_forcelist=(429, 502, 503, 504),
+    allowed_methods=frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"]),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=_retry)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+def _host_limit(url):
+    host = urlsplit(url).hostname or ""
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(HOST_CONCURRENCY.get(host, HTTP_POOL_SIZE))
+        return _host_limits[host]
+
+def request(method, url, **kwargs):
+    """requests.request() through the shared session, with the default timeout and host cap"""
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    with _host_limit(url):
+        return _session.request(method, url, **kwargs)
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
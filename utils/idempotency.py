@@ -0,0 +1,135 @@
+"""Idempotency keys for POST endpoints whose side effects must not run twice"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+from functools import wraps
+from flask import request, jsonify, make_response, Response
+from sqlalchemy.exc import IntegrityError
+from db import db, IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# stored keys older than this are pruned and no longer deduplicate
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+
+def _request_hash():
+    """
+    Hash of what the request means rather than its bytes: a multipart retry gets a new
+    boundary each time, and a JSON client may reorder keys.
+    """
+    digest = hashlib.sha256(request.method.encode() + b" " + request.path.encode() + b"\n")
+    payload = request.get_json(silent=True) if request.is_json else None
+    if payload is not None:
+        digest.update(json.dumps(payload, sort_keys=True).encode())
+    elif request.form or request.files:
+        digest.update(json.dumps(sorted(request.form.items(multi=True))).encode())
+        for field, file in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"\n{field}:{file.filename}:".encode())
+            digest.update(hashlib.sha256(file.read()).digest())
+            # leave the upload readable for the view
+            file.seek(0)
+    else:
+        # cache=True keeps the body readable for the view
+        digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def _scope():
+    user = getattr(request, "user", None) or {}
+    return f"{request.endpoint}:{user.get('uid', '')}"
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status, mimetype="application/json")
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+def idempotent(default_key=None):
+    """
+    Run the view at most once per Idempotency-Key header. A repeat with the same key and
+    body gets the stored response; the same key with a different body is a 422, and a
+    repeat while the first is still running is a 409. 5xx responses are not stored, so
+    the request can be retried. `default_key(data)` supplies a key from the JSON body
+    for callers that can't send the header.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key and default_key:
+                key = default_key(request.get_json(silent=True) or {})
+            if not key:
+                return f(*args, **kwargs)
+            key = str(key)[:255]
+
+            scope = _scope()
+            request_hash = _request_hash()
+            cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+            # an expired key may be reused
+            IdempotencyKey.query.filter(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.created_at < cutoff
+            ).delete(synchronize_session=False)
+            db.session.add(IdempotencyKey(scope=scope, key=key, request_hash=request_hash))
+            try:
+                # committed before the view runs, so a concurrent duplicate sees the claim
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                record = db.session.get(IdempotencyKey, (scope, key))
+                if record is None:
+                    return jsonify({"error": "Request with this Idempotency-Key is in progress, retry shortly"}), 409
+                if record.request_hash != request_hash:
+                    return jsonify({"error": "Idempotency-Key was already used with a different request"}), 422
+                if record.status != IdempotencyKey.COMPLETED:
+                    return jsonify({"error": "Request with this Idempotency-Key is in progress, retry shortly"}), 409
+                return _replay(record)
+
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                db.session.rollback()
+                _release(scope, key)
+                raise
+
+            db.session.rollback()
+            if response.status_code >= 500 or response.mimetype != "application/json":
+                _release(scope, key)
+                return response
+            try:
+                db.session.execute(
+                    db.update(IdempotencyKey)
+                    .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+                    .values(
+                        status=IdempotencyKey.COMPLETED,
+                        response_status=response.status_code,
+                        response_body=response.get_data(as_text=True)
+                    )
+                )
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("Failed to store idempotent response: %s", e)
+            return response
+        return decorated_function
+    return decorator
+
+def _release(scope, key):
+    """Forget a claim whose request failed, so it can be retried"""
+    try:
+        db.session.execute(
+            db.delete(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Failed to release idempotency key: %s", e)
+
+def prune_idempotency_keys():
+    """Delete keys past IDEMPOTENCY_KEY_TTL_HOURS. Returns the number removed."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    result = db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+    db.session.commit()
+    return result.rowcount